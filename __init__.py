@@ -1,13 +1,24 @@
-import bpy
 import os
 
-from . import bulk_undo
-from . import make_model
-from . import mesh_actions
-from . import mesh_generator
-from . import save_tool
-from . import ui
-from . import view_ops
+try:
+    import bpy
+except ImportError:
+    # Outside Blender, as in the tests of the core package, only the
+    # bpy-free core is importable
+    bpy = None
+
+if bpy is not None:
+    from . import bulk_undo
+    from . import checkpoints
+    from . import dependencies
+    from . import instrument
+    from . import make_model
+    from . import mesh_actions
+    from . import mesh_generator
+    from . import save_tool
+    from . import scatter
+    from . import thumbnail_farm
+    from . import ui
 
 
 bl_info = {
@@ -26,23 +37,31 @@ bl_info = {
 
 
 def register():
+    dependencies.register()
     bulk_undo.register()
+    checkpoints.register()
     make_model.register()
     mesh_actions.register()
     mesh_generator.register()
     save_tool.register()
+    scatter.register()
+    thumbnail_farm.register()
     ui.register()
-    view_ops.register()
+    instrument.register()
     
 
 def unregister():
+    dependencies.unregister()
     bulk_undo.unregister()
+    checkpoints.unregister()
     make_model.unregister()
     mesh_actions.unregister()
     mesh_generator.unregister()
     save_tool.unregister()
+    scatter.unregister()
+    thumbnail_farm.unregister()
     ui.unregister()
-    view_ops.unregister()
+    instrument.unregister()
     
 
 if __name__ == '__main__':
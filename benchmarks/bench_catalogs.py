@@ -0,0 +1,126 @@
+"""Compare the catalog parser and tree against the original get_catalogs.
+
+Runs with plain Python, no Blender needed:
+
+    python benchmarks/bench_catalogs.py [--lines 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import catalogs  # noqa: E402
+
+
+def legacy_get_catalogs(cat_paths):
+    '''The original utils.get_catalogs loop, minus the bpy preferences lookup'''
+    all_catalogs = []
+
+    for libname, libpath in cat_paths:
+        cat_path = os.path.join(libpath, 'blender_assets.cats.txt')
+
+        if os.path.exists(cat_path):
+            with open(cat_path) as f:
+                lines = f.readlines()
+
+            for line in lines:
+                if line != '\n' and not any([line.startswith(skip) for skip in [
+                                            '#', 'VERSION']]) and len(line.split(':')) == 3:
+                    all_catalogs.append(
+                        line[:-1].split(':') + [libname, libpath])
+
+    result = {}
+
+    for uid, catalog, simple_name, libname, libpath in all_catalogs:
+        if catalog not in result:
+            result[catalog] = {'uuid': uid,
+                               'simple_name': simple_name,
+                               'libname': libname,
+                               'libpath': libpath}
+
+    return result
+
+
+def write_synthetic_catalog(libpath, lines, fanout=12):
+    '''Write a catalog file with a three to four level deep tree'''
+    with open(os.path.join(libpath, catalogs.CATALOG_FILENAME), 'w') as f:
+        f.write('# This is an Asset Catalog Definition file for Blender.\n')
+        f.write('VERSION 1\n\n')
+        for i in range(lines):
+            parts = ['Cat%d' % (i % fanout),
+                     'Sub%d' % (i // fanout % fanout),
+                     'Leaf%d' % (i // fanout ** 2 % fanout)]
+            if i >= fanout ** 3:
+                parts.append('Item%d' % i)
+            path = '/'.join(parts)
+            f.write('%s:%s:%s\n' % (uuid.uuid4(), path, path.replace('/', '-')))
+
+
+def best_of(repeat, func, *args):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as libpath:
+        write_synthetic_catalog(libpath, args.lines)
+        libraries = [('Synthetic', libpath)]
+
+        t_legacy, legacy = best_of(args.repeat, legacy_get_catalogs, libraries)
+
+        def parse_and_merge():
+            index = catalogs.CatalogIndex()
+            index.update(libraries)
+            return index, index.catalogs(libraries)
+
+        t_new, (index, flat) = best_of(args.repeat, parse_and_merge)
+        assert flat == legacy
+
+        def build_trie():
+            index._trie_key = None
+            return index.trie(libraries)
+
+        t_trie, trie = best_of(args.repeat, build_trie)
+        assert len(trie) == len(legacy)
+
+        def cached_call():
+            index.update(libraries)
+            return index.catalogs(libraries)
+
+        t_cached, _ = best_of(args.repeat, cached_call)
+
+        # Resolve the UUID of every catalog, then list one subtree
+        paths = list(legacy)
+        t_uuid, _ = best_of(args.repeat, lambda: [trie.uuid(p) for p in paths])
+        t_prefix_scan, scanned = best_of(
+            args.repeat, lambda: [p for p in paths if p.startswith('Cat3/')])
+        t_prefix_trie, walked = best_of(
+            args.repeat, lambda: [n.path for n in trie.walk('Cat3')])
+        assert set(scanned) == set(walked) - {'Cat3'}
+
+    print('catalog lines        %d' % args.lines)
+    print('legacy get_catalogs  %8.2f ms' % (t_legacy * 1000))
+    print('parse + merge        %8.2f ms' % (t_new * 1000))
+    print('build trie           %8.2f ms' % (t_trie * 1000))
+    print('unchanged library    %8.2f ms' % (t_cached * 1000))
+    print('uuid lookups (all)   %8.2f ms' % (t_uuid * 1000))
+    print('prefix, linear scan  %8.2f ms' % (t_prefix_scan * 1000))
+    print('prefix, trie walk    %8.2f ms' % (t_prefix_trie * 1000))
+
+
+if __name__ == '__main__':
+    main()
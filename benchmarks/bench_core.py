@@ -0,0 +1,90 @@
+"""Time the core algorithms on stand-in scenes, without Blender.
+
+Builds scenes of core.standin objects (parent groups, a boolean and
+mirror modifier web, drivers) and times graph building,
+objects_to_assemble, bounds and catalog merging on them.
+
+Runs with plain Python:
+
+    python benchmarks/bench_core.py [--counts 1000 10000 50000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_catalogs import write_synthetic_catalog  # noqa: E402
+from core import bounds, catalogs, graph, standin  # noqa: E402
+
+
+def make_scene(count, group=10):
+    '''count meshes, every group of them under an empty, each cutting the
+    next with a boolean, mirrored over the one before and driven by a
+    third'''
+    objects = []
+    parent = None
+
+    for i in range(count):
+        if i % group == 0:
+            parent = standin.Object('group', type='EMPTY', location=(i, 0, 0))
+            objects.append(parent)
+        objects.append(standin.Object('part', parent=parent, location=(i, i % 7, i % 3)))
+
+    meshes = [obj for obj in objects if obj.type == 'MESH']
+    for i, obj in enumerate(meshes):
+        obj.modifiers.append(standin.Modifier('BOOLEAN', object=meshes[(i + 1) % len(meshes)]))
+        obj.modifiers.append(standin.Modifier('MIRROR', mirror_object=meshes[i - 1]))
+        if i % 3 == 0:
+            standin.add_driver(obj, meshes[(i * 7) % len(meshes)])
+
+    return standin.Scene(objects)
+
+
+def best_of(repeat, func, *args):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--lines', type=int, default=100000)
+    args = parser.parse_args()
+
+    for count in args.counts:
+        scene = make_scene(count)
+        selected = scene.objects[1:2]
+
+        t_build, dependency_graph = best_of(args.repeat, graph.DependencyGraph, scene.objects)
+        t_assemble, (objects, controller, roots) = best_of(
+            args.repeat, graph.objects_to_assemble, dependency_graph, selected)
+        t_bounds, model_bounds = best_of(args.repeat, bounds.object_bounds, objects)
+
+        print('%6d objects  graph %8.1f ms (%d edges)  assemble %7.1f ms (%d objects)  '
+              'bounds %6.1f ms' % (
+                  len(scene.objects), t_build * 1000, dependency_graph.edge_count,
+                  t_assemble * 1000, len(objects), t_bounds * 1000))
+
+    with tempfile.TemporaryDirectory() as libpath:
+        write_synthetic_catalog(libpath, args.lines)
+        libraries = [('bench', libpath)]
+        t_cold, result = best_of(args.repeat, lambda: catalogs.library_catalogs(
+            catalogs.CatalogIndex(), libraries))
+        index = catalogs.CatalogIndex()
+        t_warm, result = best_of(args.repeat, catalogs.library_catalogs, index, libraries)
+        print('%6d catalogs  cold %8.1f ms  warm %6.3f ms' % (
+            len(result), t_cold * 1000, t_warm * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Parameter sweep of the mesh generator.
+
+Times the NumPy array build and the foreach_set load of every shape over
+growing sizes, and from_pydata on the same data for comparison. Exits
+with status 1 when a grid of about 1M vertices takes longer than
+--budget seconds.
+
+Run inside Blender with the add-on installed:
+
+    blender -b --factory-startup --python benchmarks/bench_generator.py -- [--counts 100 316 1000] [--budget 1.0]
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import bpy
+
+
+def get_addon():
+    '''Import the add-on package this script lives in'''
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    return importlib.import_module(os.path.basename(addon_dir))
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[100, 316, 1000],
+                        help="Cells per side, the grid gets (count + 1) ** 2 vertices")
+    parser.add_argument('--shapes', nargs='+', default=['GRID', 'FLOOR', 'STAIRS', 'PANELS'])
+    parser.add_argument('--pydata-limit', type=int, default=300000,
+                        help="Skip from_pydata above this many vertices")
+    parser.add_argument('--budget', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    generator = get_addon().mesh_generator
+    ok = True
+
+    print('%-7s %6s %9s %9s %10s %10s %12s' % (
+        'shape', 'count', 'vertices', 'faces', 'arrays ms', 'load ms', 'pydata ms'))
+
+    for shape in args.shapes:
+        for count in args.counts:
+            # Stairs have count steps of count cells width
+            start = time.perf_counter()
+            data = generator.build_shape(shape, count, count, 0.5, 0.005, 0.02, 0.18)
+            built = time.perf_counter()
+            generator.load_mesh(bpy.data.meshes.new(shape), data)
+            loaded = time.perf_counter()
+
+            t_pydata = float('nan')
+            if len(data.co) <= args.pydata_limit:
+                mesh = bpy.data.meshes.new(shape)
+                start_pydata = time.perf_counter()
+                mesh.from_pydata(data.co.tolist(), [], data.faces.tolist())
+                mesh.update()
+                t_pydata = time.perf_counter() - start_pydata
+
+            total = loaded - start
+            print('%-7s %6d %9d %9d %10.1f %10.1f %12.1f' % (
+                shape, count, len(data.co), len(data.faces), (built - start) * 1000,
+                (loaded - built) * 1000, t_pydata * 1000))
+
+            if shape == 'GRID' and len(data.co) >= 1000000 and total > args.budget:
+                print('GRID with %d vertices took %.2f s, over the %.2f s budget' % (
+                    len(data.co), total, args.budget))
+                ok = False
+
+            for mesh in list(bpy.data.meshes):
+                bpy.data.meshes.remove(mesh)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Check that operator polls cost the same on small and huge meshes.
+
+Times the poll of every mops.* operator on grids of growing size in edit
+mode, and of the object mode operators with growing selections. Exits
+with status 1 when the largest case is more than --ratio times slower
+than the smallest one.
+
+Run inside Blender with the add-on installed:
+
+    blender -b --factory-startup --python benchmarks/bench_poll.py -- [--sizes 100 500 1414] [--ratio 3]
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import bpy
+
+
+def get_addon():
+    '''Import the add-on package this script lives in'''
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    return importlib.import_module(os.path.basename(addon_dir))
+
+
+def time_polls(operators, repeat):
+    '''Best of three, seconds per poll() call over all operators'''
+    best = float('inf')
+
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for op in operators:
+                op.poll()
+        best = min(best, time.perf_counter() - start)
+
+    return best / (repeat * len(operators))
+
+
+def edit_mode_grid(size):
+    '''A size x size vertex grid in edit mode, everything selected'''
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.ops.mesh.primitive_grid_add(x_subdivisions=size - 1, y_subdivisions=size - 1)
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.select_all(action='SELECT')
+
+    return len(bpy.context.active_object.data.vertices)
+
+
+def selected_empties(count):
+    bpy.ops.wm.read_homefile(use_empty=True)
+    coll = bpy.context.scene.collection
+
+    for i in range(count):
+        obj = bpy.data.objects.new('part%d' % i, None)
+        coll.objects.link(obj)
+        obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    bpy.context.view_layer.update()
+
+    return count
+
+
+def report(label, timings, ratio):
+    for size, seconds in timings:
+        print('%-12s %9d  %8.2f us per poll' % (label, size, seconds * 1e6))
+
+    slowdown = timings[-1][1] / timings[0][1]
+    ok = slowdown <= ratio
+    print('%-12s largest / smallest %.2fx (limit %.1fx) %s' % (
+        label, slowdown, ratio, 'ok' if ok else 'FAILED'))
+
+    return ok
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1414],
+                        help="Grid side lengths, 1414 is about 2M vertices")
+    parser.add_argument('--counts', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="Selected object counts")
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--ratio', type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    addon = get_addon()
+    addon.register()
+
+    ops = bpy.ops.mops
+    edit_ops = [ops.separate_select_object]
+    object_ops = [ops.make_model, ops.make_models, ops.make_asset]
+
+    edit_timings = [(edit_mode_grid(size), time_polls(edit_ops, args.repeat))
+                    for size in args.sizes]
+    object_timings = [(selected_empties(count), time_polls(object_ops, args.repeat))
+                      for count in args.counts]
+
+    ok = report('edit mesh', edit_timings, args.ratio)
+    ok = report('selection', object_timings, args.ratio) and ok
+
+    addon.unregister()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
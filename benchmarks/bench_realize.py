@@ -0,0 +1,98 @@
+"""Time and memory of mops.unpack_asset on a 3 level nested asset.
+
+The asset instances a collection of branch instances, each instancing a
+collection of branch instances of a collection of parts that share one
+mesh, so parts * branch^2 objects get realized. For every branch size
+the unpack is timed and the time per realized object printed, which
+should stay flat as the asset grows.
+
+Run inside Blender with the add-on installed:
+
+    blender -b --factory-startup --python benchmarks/bench_realize.py -- [--parts 10] [--branches 10 20 40]
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import bpy
+
+
+def get_addon():
+    '''Import the add-on package this script lives in'''
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    return importlib.import_module(os.path.basename(addon_dir))
+
+
+def instancer(name, collection, location):
+    obj = bpy.data.objects.new(name, None)
+    obj.instance_type = 'COLLECTION'
+    obj.instance_collection = collection
+    obj.location = location
+    return obj
+
+
+def make_nested_asset(parts, branch):
+    '''An instance empty of a 3 level nested asset, and the realized count'''
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.ops.mesh.primitive_cube_add(size=0.2)
+    cube = bpy.context.active_object
+    bpy.context.scene.collection.objects.unlink(cube)
+
+    leaf = bpy.data.collections.new('leaf')
+    for i in range(parts):
+        part = bpy.data.objects.new('part', cube.data)
+        part.location = (i * 0.3, 0, 0)
+        leaf.objects.link(part)
+
+    mid = bpy.data.collections.new('mid')
+    for i in range(branch):
+        mid.objects.link(instancer('leaf', leaf, (0, i, 0)))
+
+    top = bpy.data.collections.new('top')
+    for i in range(branch):
+        top.objects.link(instancer('mid', mid, (0, 0, i)))
+
+    instance = instancer('asset', top, (0, 0, 0))
+    bpy.context.scene.collection.objects.link(instance)
+    bpy.context.view_layer.objects.active = instance
+    instance.select_set(True)
+
+    return instance, branch + branch * branch + parts * branch * branch
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parts', type=int, default=10)
+    parser.add_argument('--branches', type=int, nargs='+', default=[10, 20, 40])
+    args = parser.parse_args(argv)
+
+    addon = get_addon()
+    addon.register()
+    memory_usage = addon.utils.memory_usage
+
+    for branch in args.branches:
+        instance, count = make_nested_asset(args.parts, branch)
+        meshes = len(bpy.data.meshes)
+        before = memory_usage()
+        start = time.perf_counter()
+
+        bpy.ops.mops.unpack_asset()
+
+        elapsed = time.perf_counter() - start
+        after = memory_usage()
+        realized = len(bpy.context.scene.collection.all_objects) - 1
+        print('branch %4d  %8d objects  %9.1f ms  %6.2f us/object  %+8.1f MiB%s' % (
+            branch, realized, elapsed * 1000, elapsed * 1e6 / max(realized, 1),
+            (after - before) / 1024 / 1024 if before and after else float('nan'),
+            '' if realized == count and len(bpy.data.meshes) == meshes
+            else '  (expected %d objects sharing one mesh)' % count))
+
+    addon.unregister()
+
+
+if __name__ == '__main__':
+    main()
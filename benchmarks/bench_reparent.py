@@ -0,0 +1,84 @@
+"""Compare per-object utils.parent against transforms.parent_objects on the
+same list of objects.
+
+Run inside Blender with the add-on installed:
+
+    blender -b --factory-startup --python benchmarks/bench_reparent.py -- [--counts 1000 10000 100000]
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import bpy
+from mathutils import Euler, Matrix, Vector
+
+
+def get_addon():
+    '''Import the add-on package this script lives in'''
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    return importlib.import_module(os.path.basename(addon_dir))
+
+
+def make_scene(count):
+    '''count loose empties spread around, plus one rotated and scaled parent each 100'''
+    bpy.ops.wm.read_homefile(use_empty=True)
+    coll = bpy.context.scene.collection
+
+    parents = []
+    for i in range(max(1, count // 100)):
+        p = bpy.data.objects.new('parent%d' % i, None)
+        p.matrix_world = Matrix.LocRotScale(
+            Vector((i, 0, 1)), Euler((0.3, 0.2, i * 0.1)), Vector((1, 2, 0.5)))
+        coll.objects.link(p)
+        parents.append(p)
+
+    objects = []
+    for i in range(count):
+        o = bpy.data.objects.new('part%d' % i, None)
+        o.location = (i % 97, i % 89, i % 7)
+        coll.objects.link(o)
+        objects.append(o)
+
+    bpy.context.view_layer.update()
+
+    return objects, [parents[i % len(parents)] for i in range(count)]
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    args = parser.parse_args(argv)
+
+    addon = get_addon()
+    utils = addon.utils
+    transforms = addon.transforms
+
+    for count in args.counts:
+        objects, parents = make_scene(count)
+        start = time.perf_counter()
+        for obj, parent in zip(objects, parents):
+            utils.parent(obj, parent)
+        t_loop = time.perf_counter() - start
+
+        objects, parents = make_scene(count)
+        start = time.perf_counter()
+        transforms.parent_objects(objects, parents)
+        t_batch = time.perf_counter() - start
+
+        world = transforms.read_matrices(objects)
+        start = time.perf_counter()
+        transforms.inverted_safe(world)
+        t_math = time.perf_counter() - start
+
+        print('%7d objects  utils.parent %9.1f ms  parent_objects %9.1f ms'
+              '  (batch inverse %.1f ms)' % (
+                  count, t_loop * 1000, t_batch * 1000, t_math * 1000))
+
+
+if __name__ == '__main__':
+    main()
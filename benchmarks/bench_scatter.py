@@ -0,0 +1,80 @@
+"""Time and memory of mops.scatter in both modes.
+
+Scatters a small collection over grids of growing size, once as
+instance empties and once as vertex instancing, and prints creation
+time and resident memory growth.
+
+Run inside Blender with the add-on installed:
+
+    blender -b --factory-startup --python benchmarks/bench_scatter.py -- [--counts 10000 100000]
+"""
+import argparse
+import importlib
+import math
+import os
+import sys
+import time
+
+import bpy
+
+
+def get_addon():
+    '''Import the add-on package this script lives in'''
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    return importlib.import_module(os.path.basename(addon_dir))
+
+
+def make_asset():
+    '''A collection with one cube, and an instance empty of it'''
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.ops.mesh.primitive_cube_add(size=0.5)
+    cube = bpy.context.active_object
+
+    asset = bpy.data.collections.new('asset')
+    asset.objects.link(cube)
+    bpy.context.scene.collection.objects.unlink(cube)
+
+    instance = bpy.data.objects.new('asset', None)
+    instance.instance_type = 'COLLECTION'
+    instance.instance_collection = asset
+    bpy.context.scene.collection.objects.link(instance)
+
+    return instance
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args(argv)
+
+    addon = get_addon()
+    scatter = addon.scatter
+    memory_usage = addon.utils.memory_usage
+
+    for count in args.counts:
+        side = int(math.ceil(math.sqrt(count)))
+        for mode in ('EMPTIES', 'VERTS'):
+            instance = make_asset()
+            target = bpy.context.scene.collection
+            before = memory_usage()
+            start = time.perf_counter()
+
+            points, normals = scatter.grid_points(side, side, 1.0)
+            if mode == 'EMPTIES':
+                matrices = scatter.instance_matrices(points, scale_min=0.8, scale_max=1.2)
+                scatter.scatter_empties(instance.instance_collection, target, matrices, 'bench')
+            else:
+                scatter.scatter_verts(instance.instance_collection, target, points, 'bench')
+            bpy.context.view_layer.update()
+
+            elapsed = time.perf_counter() - start
+            after = memory_usage()
+            print('%-8s %7d instances  %9.1f ms  %+8.1f MiB' % (
+                mode, len(points), elapsed * 1000,
+                (after - before) / 1024 / 1024 if before and after else float('nan')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Compare Blender's separate against mesh_split.
+
+Builds one mesh of N disconnected cubes, spread over four materials with
+every other cube selected, and splits it both ways by loose parts,
+material or selection, from edit mode, the way
+mops.separate_select_object is used.
+
+Run inside Blender with the add-on installed:
+
+    blender -b --factory-startup --python benchmarks/bench_split.py -- [--islands 1000 10000] [--method LOOSE] [--skip-blender]
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import bpy
+import numpy as np
+
+CUBE_VERTS = np.array([(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)],
+                      dtype=np.float32)
+CUBE_FACES = np.array([(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1),
+                       (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)])
+
+
+def get_addon():
+    '''Import the add-on package this script lives in'''
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    return importlib.import_module(os.path.basename(addon_dir))
+
+
+def make_islands(count):
+    '''An object in edit mode holding count separate cubes with a UV map'''
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+    offsets = np.zeros((count, 3), dtype=np.float32)
+    offsets[:, 0] = np.arange(count) * 2
+    co = (CUBE_VERTS[None] + offsets[:, None]).reshape(-1, 3)
+    faces = (CUBE_FACES[None] + (np.arange(count) * 8)[:, None, None]).reshape(-1)
+
+    mesh = bpy.data.meshes.new('islands')
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set('co', co.ravel())
+    mesh.loops.add(len(faces))
+    mesh.loops.foreach_set('vertex_index', faces)
+    mesh.polygons.add(count * 6)
+    mesh.polygons.foreach_set('loop_start', np.arange(count * 6) * 4)
+    if not bpy.types.MeshPolygon.bl_rna.properties['loop_total'].is_readonly:
+        mesh.polygons.foreach_set('loop_total', np.full(count * 6, 4))
+    mesh.polygons.foreach_set('material_index', np.repeat(np.arange(count) % 4, 6))
+    mesh.polygons.foreach_set('select', np.repeat(np.arange(count) % 2 == 0, 6))
+    mesh.vertices.foreach_set('select', np.repeat(np.arange(count) % 2 == 0, 8))
+    mesh.update(calc_edges=True)
+    mesh.uv_layers.new(name='UVMap')
+    for i in range(4):
+        mesh.materials.append(bpy.data.materials.new('mat%d' % i))
+
+    obj = bpy.data.objects.new('islands', mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+    obj.select_set(True)
+    bpy.ops.object.mode_set(mode='EDIT')
+
+    return obj
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--islands', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--method', default='LOOSE',
+                        choices=('LOOSE', 'MATERIAL', 'SELECTED'))
+    parser.add_argument('--skip-blender', action='store_true',
+                        help="Only time mesh_split, mesh.separate is very slow on big counts")
+    args = parser.parse_args(argv)
+
+    mesh_split = get_addon().mesh_split
+
+    for count in args.islands:
+        t_blender = float('nan')
+        if not args.skip_blender:
+            make_islands(count)
+            start = time.perf_counter()
+            bpy.ops.mesh.separate(type=args.method)
+            t_blender = time.perf_counter() - start
+
+        obj = make_islands(count)
+        start = time.perf_counter()
+        new_objects = mesh_split.split_objects([obj], args.method)
+        t_split = time.perf_counter() - start
+
+        print('%s %7d islands  mesh.separate %9.1f ms  mesh_split %9.1f ms  (%d objects)' % (
+            args.method, count, t_blender * 1000, t_split * 1000, len(new_objects) + 1))
+
+
+if __name__ == '__main__':
+    main()
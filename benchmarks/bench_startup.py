@@ -0,0 +1,71 @@
+"""Time to import and register the add-on, against a budget.
+
+Imports the add-on package, registers and unregisters it, and prints
+the time of each step and whether NumPy or the lazily imported
+submodules got loaded on the way. Exits with status 1 when import plus
+register() take longer than the budget, so farm scripts and CI can
+catch a slow startup.
+
+Run inside Blender, in a fresh process for a cold import:
+
+    blender -b --factory-startup --python benchmarks/bench_startup.py -- [--budget 0.1]
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+
+def get_addon():
+    '''Import the add-on package this script lives in'''
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    return importlib.import_module(os.path.basename(addon_dir))
+
+
+def loaded(name):
+    '''True when a module is imported and not waiting on first use'''
+    module = sys.modules.get(name)
+    return module is not None and type(module).__name__ != '_LazyModule'
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=float, default=0.1,
+                        help="Seconds allowed for import plus register()")
+    args = parser.parse_args(argv)
+
+    numpy_before = loaded('numpy')
+
+    start = time.perf_counter()
+    addon = get_addon()
+    imported = time.perf_counter()
+    addon.register()
+    registered = time.perf_counter()
+    addon.unregister()
+    unregistered = time.perf_counter()
+
+    startup = registered - start
+    print('import      %7.1f ms' % ((imported - start) * 1000))
+    print('register    %7.1f ms' % ((registered - imported) * 1000))
+    print('unregister  %7.1f ms' % ((unregistered - registered) * 1000))
+
+    deferred = [name for name in sys.modules
+                if name.startswith(addon.__name__ + '.') and not loaded(name)]
+    print('deferred    %s' % (', '.join(sorted(deferred)) or '-'))
+    print('numpy       %s' % ('already loaded by Blender' if numpy_before
+                              else 'loaded' if loaded('numpy') else 'deferred'))
+
+    if startup > args.budget:
+        print('FAIL: startup %.1f ms over the %.1f ms budget' % (
+            startup * 1000, args.budget * 1000))
+        sys.exit(1)
+
+    print('OK: startup %.1f ms within the %.1f ms budget' % (
+        startup * 1000, args.budget * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+"""Headless benchmark suite.
+
+Builds synthetic scenes (1k, 10k and 50k objects, a deep parent chain, a
+web of boolean and mirror modifiers, meshes of millions of vertices in
+loose parts, a three level nested collection instance and a large asset
+catalog) and times the MTools entry points on them. Every case runs
+--repeat times, on a freshly built scene when the operation changes it,
+and the results are written as JSON with min, median and p95 seconds.
+
+With --baseline the medians are compared against an earlier result file,
+cases that got slower than --tolerance are flagged and the run exits
+with status 1. Cases that cannot run in this session, an operator whose
+poll fails or undo without a window, are skipped. Any other error is
+recorded for its case, printed, and also makes the run exit with status 1.
+
+Run inside Blender:
+
+    blender -b --factory-startup --python benchmarks/run.py -- [--quick] [--only unpack]
+        [--repeat 5] [--output results.json] [--baseline baseline.json] [--tolerance 0.25]
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+import types
+from collections import namedtuple
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_catalogs  # noqa: E402
+import bench_realize  # noqa: E402
+import bench_split  # noqa: E402
+
+# build() returns the state run(state) works on, only run is timed.
+# Cases that change their scene are rebuilt before every run.
+Case = namedtuple('Case', 'name build run rebuild')
+
+
+class Skip(Exception):
+    '''A case that cannot run in this Blender session'''
+
+
+def run_operator(op, *args, **kwargs):
+    '''Call an operator, skipping the case when its poll fails'''
+    if not op.poll():
+        raise Skip('%s.poll() failed' % op.idname_py())
+    op(*args, **kwargs)
+
+
+def get_addon():
+    '''Import the add-on package this script lives in'''
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    return importlib.import_module(os.path.basename(addon_dir))
+
+
+def select_only(objects):
+    for obj in bpy.context.view_layer.objects:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    bpy.context.view_layer.objects.active = objects[0] if objects else None
+
+
+def scene_objects(count, group=10):
+    '''count cubes sharing one mesh, every group of them under a parent cube'''
+    bpy.ops.wm.read_homefile(use_empty=True)
+    mesh = bpy.data.meshes.new('cube')
+    mesh.from_pydata([(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)], [],
+                     [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1),
+                      (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)])
+
+    # A fresh collection makes every link a cheap append
+    collection = bpy.data.collections.new('objects')
+    bpy.context.scene.collection.children.link(collection)
+    side = int(math.ceil(math.sqrt(count)))
+    objects = []
+    parent = None
+
+    for i in range(count):
+        obj = bpy.data.objects.new('part', mesh)
+        obj.location = (i % side * 2, i // side * 2, 0)
+        if i % group:
+            obj.parent = parent
+        else:
+            parent = obj
+        collection.objects.link(obj)
+        objects.append(obj)
+
+    bpy.context.view_layer.update()
+    select_only(objects)
+
+    return objects
+
+
+def scene_chain(depth):
+    '''A chain of depth empties, each parented to the one before'''
+    bpy.ops.wm.read_homefile(use_empty=True)
+    collection = bpy.context.scene.collection
+    objects = []
+    parent = None
+
+    for i in range(depth):
+        obj = bpy.data.objects.new('link', None)
+        obj.location = (0, 0, 1)
+        obj.parent = parent
+        collection.objects.link(obj)
+        objects.append(obj)
+        parent = obj
+
+    bpy.context.view_layer.update()
+    # The tip, everything else comes in as dependency
+    select_only(objects[-1:])
+
+    return objects
+
+
+def scene_modifier_web(count):
+    '''count cubes, each cutting the next with a boolean and mirrored over
+    the one before'''
+    objects = scene_objects(count, group=1)
+
+    for i, obj in enumerate(objects):
+        boolean = obj.modifiers.new('cut', 'BOOLEAN')
+        boolean.object = objects[(i + 1) % count]
+        mirror = obj.modifiers.new('mirror', 'MIRROR')
+        mirror.mirror_object = objects[i - 1]
+
+    select_only(objects[:1])
+
+    return objects
+
+
+def scene_islands(count):
+    '''A mesh of count loose cubes in edit mode, 8 vertices each'''
+    bench_split.make_islands(count)
+
+
+def stats(times):
+    '''min, median and p95 (nearest rank) of a list of seconds'''
+    ordered = sorted(times)
+    rank = max(0, int(math.ceil(0.95 * len(ordered))) - 1)
+
+    return {
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p95': ordered[rank],
+        'runs': len(ordered),
+    }
+
+
+def measure(case, repeat):
+    times = []
+    state = None
+
+    for i in range(repeat):
+        if case.rebuild or i == 0:
+            state = case.build()
+        start = time.perf_counter()
+        case.run(state)
+        times.append(time.perf_counter() - start)
+
+    return stats(times)
+
+
+def build_cases(addon, quick):
+    '''All cases, smaller scenes with quick'''
+    make_model = addon.make_model
+    dependencies = addon.dependencies
+    utils = addon.utils
+
+    object_counts = (1000, 10000) if quick else (1000, 10000, 50000)
+    chain_depth = 500 if quick else 5000
+    web_count = 500 if quick else 5000
+    # 8 vertices per island, the full run splits 2 million vertices
+    island_counts = (10000,) if quick else (10000, 250000)
+    nested_branch = 10 if quick else 30
+    catalog_lines = 10000 if quick else 100000
+
+    def assemble(state):
+        # Cold, the scene cache is dropped before every run
+        dependencies.invalidate_graph()
+        make_model.MTools_OT_MakeModel.get_objects_to_assemble(
+            types.SimpleNamespace(), bpy.context)
+
+    def assemble_warm(state):
+        make_model.MTools_OT_MakeModel.get_objects_to_assemble(
+            types.SimpleNamespace(), bpy.context)
+
+    def make(state):
+        run_operator(bpy.ops.mops.make_model, 'EXEC_DEFAULT',
+                     mod_name='bench', empty_loc='AVG')
+
+    def unpack(state):
+        run_operator(bpy.ops.mops.unpack_asset, 'EXEC_DEFAULT')
+
+    def separate(method):
+        return lambda state: run_operator(
+            bpy.ops.mops.separate_select_object, separate_method=method)
+
+    cases = []
+
+    for count in object_counts:
+        label = '%dk' % (count // 1000)
+        cases.append(Case('get_objects_to_assemble/objects_%s' % label,
+                          lambda count=count: scene_objects(count), assemble, False))
+        cases.append(Case('make_model/objects_%s' % label,
+                          lambda count=count: scene_objects(count), make, True))
+    cases.append(Case('get_objects_to_assemble/objects_%dk_warm' % (object_counts[-1] // 1000),
+                      lambda: (scene_objects(object_counts[-1]), assemble_warm(None)),
+                      assemble_warm, False))
+    cases.append(Case('get_objects_to_assemble/chain_%d' % chain_depth,
+                      lambda: scene_chain(chain_depth), assemble, False))
+    cases.append(Case('get_objects_to_assemble/modifier_web_%d' % web_count,
+                      lambda: scene_modifier_web(web_count), assemble, False))
+
+    cases.append(Case('unpack_asset/nested_%d' % nested_branch,
+                      lambda: bench_realize.make_nested_asset(10, nested_branch),
+                      unpack, True))
+
+    for count in island_counts:
+        for method in ('LOOSE', 'MATERIAL'):
+            cases.append(Case('separate_select_object/%s_%dk_verts' % (
+                method.lower(), count * 8 // 1000),
+                lambda count=count: scene_islands(count), separate(method), True))
+
+    cases.append(Case('get_catalogs/cold_%d' % catalog_lines,
+                      lambda: catalog_library(catalog_lines),
+                      lambda state: catalogs_cold(utils), False))
+    cases.append(Case('get_catalogs/warm_%d' % catalog_lines,
+                      lambda: catalog_library(catalog_lines),
+                      lambda state: utils.get_catalogs(bpy.context), False))
+
+    cases.append(Case('bulk_undo/20_steps', undo_history, bulk_undo, True))
+
+    return cases
+
+
+_library_dir = None
+
+
+def catalog_library(lines):
+    '''Register a temporary asset library holding a synthetic catalog file'''
+    global _library_dir
+
+    if _library_dir is None:
+        _library_dir = tempfile.mkdtemp(prefix='mtools_bench_lib_')
+        bench_catalogs.write_synthetic_catalog(_library_dir, lines)
+        bpy.ops.preferences.asset_library_add(directory=_library_dir)
+
+    return _library_dir
+
+
+def remove_catalog_library():
+    global _library_dir
+
+    if _library_dir is None:
+        return
+
+    libraries = bpy.context.preferences.filepaths.asset_libraries
+    for i, library in enumerate(libraries):
+        if os.path.normpath(bpy.path.abspath(library.path)) == os.path.normpath(_library_dir):
+            bpy.ops.preferences.asset_library_remove(index=i)
+            break
+    shutil.rmtree(_library_dir, ignore_errors=True)
+    _library_dir = None
+
+
+def catalogs_cold(utils):
+    utils._catalog_index = None
+    utils.get_catalogs(bpy.context)
+
+
+def undo_history():
+    '''30 undo steps, each moving a cube'''
+    # Background sessions have no window and keep no undo steps
+    if bpy.context.window is None:
+        raise Skip('undo needs a window')
+
+    objects = scene_objects(1)
+    bpy.ops.ed.undo_push(message='start')
+    for i in range(30):
+        objects[0].location.x += 1
+        bpy.ops.ed.undo_push(message='move %d' % i)
+
+
+def bulk_undo(state):
+    run_operator(bpy.ops.mops.bulk_undo, undo_steps=20)
+
+
+def compare(results, baseline, tolerance, min_delta):
+    '''Cases whose median got slower than the baseline by more than
+    tolerance, and by more than min_delta seconds'''
+    regressions = []
+
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None or 'median' not in result:
+            continue
+        ratio = result['median'] / max(before['median'], 1e-9)
+        result['baseline_median'] = before['median']
+        result['ratio'] = ratio
+        if ratio > 1 + tolerance and result['median'] - before['median'] > min_delta:
+            regressions.append(name)
+
+    return regressions
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="Smaller scenes")
+    parser.add_argument('--only', nargs='+', default=[],
+                        help="Run the cases whose name contains any of these")
+    parser.add_argument('--output', help="Write the JSON here instead of stdout")
+    parser.add_argument('--baseline', help="Earlier JSON output to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed median slowdown, 0.25 is 25%%")
+    parser.add_argument('--min-delta', type=float, default=0.001,
+                        help="Slowdowns under this many seconds are noise")
+    args = parser.parse_args(argv)
+
+    addon = get_addon()
+    addon.register()
+
+    results = {}
+    errors = []
+    for case in build_cases(addon, args.quick):
+        if args.only and not any(part in case.name for part in args.only):
+            continue
+        try:
+            results[case.name] = measure(case, args.repeat)
+        except Skip as e:
+            results[case.name] = {'skipped': str(e)}
+        except Exception as e:
+            # Blender exits 0 on script errors, so failures are counted here
+            traceback.print_exc()
+            results[case.name] = {'error': '%s: %s' % (type(e).__name__, e)}
+            errors.append(case.name)
+        result = results[case.name]
+        if 'median' in result:
+            print('%-50s min %9.2f ms  median %9.2f ms  p95 %9.2f ms' % (
+                case.name, result['min'] * 1000, result['median'] * 1000,
+                result['p95'] * 1000), file=sys.stderr)
+        elif 'skipped' in result:
+            print('%-50s skipped: %s' % (case.name, result['skipped']), file=sys.stderr)
+        else:
+            print('%-50s FAILED: %s' % (case.name, result['error']), file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for name in regressions:
+            print('REGRESSION %-50s %.2fx the baseline median' % (
+                name, results[name]['ratio']), file=sys.stderr)
+
+    report = {
+        'blender': bpy.app.version_string,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': args.repeat,
+        'quick': args.quick,
+        'results': results,
+        'regressions': regressions,
+        'errors': errors,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    remove_catalog_library()
+    addon.unregister()
+
+    if regressions or errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
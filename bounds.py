@@ -0,0 +1,96 @@
+"""Bounds engine for controller placement.
+
+Reads the world-space bound box corners, or the evaluated mesh vertices,
+of many objects into NumPy arrays and reduces them with core.bounds to a
+centroid, an axis aligned bounding box and a floor point. Per-object
+results are cached on the world matrix and the geometry version from
+dependencies.
+"""
+import numpy as np
+from mathutils import Vector
+
+from . import dependencies
+from . import transforms
+from .core import bounds as core_bounds
+from .core.bounds import Bounds
+
+# (obj, mode) -> (matrix, geometry version, stats row)
+# A stats row is [sum x, sum y, sum z, count, min xyz, max xyz]
+_cache = {}
+_cache_generation = None
+
+
+def _local_points(obj, mode, depsgraph):
+    if mode == 'VERTICES' and obj.type == 'MESH' and depsgraph is not None:
+        mesh = obj.evaluated_get(depsgraph).data
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', co)
+        return co.reshape(-1, 3)
+
+    return np.array(obj.bound_box, dtype=np.float32)
+
+
+def object_bounds(objects, mode='BOUND_BOX', depsgraph=None):
+    '''Return the Bounds of a group of objects, empties excluded, or None.
+
+    mode 'BOUND_BOX' uses the eight world-space corners of every object,
+    'VERTICES' the evaluated mesh vertices (needs a depsgraph), which
+    gives the exact lowest point of rotated parts.
+    '''
+    global _cache_generation
+
+    if _cache_generation != dependencies.file_generation:
+        _cache.clear()
+        _cache_generation = dependencies.file_generation
+
+    objects = [obj for obj in objects if obj.type != 'EMPTY']
+
+    if not objects:
+        return None
+
+    matrices = transforms.read_matrices(objects)
+    rows = np.zeros((len(objects), 10))
+    valid = np.ones(len(objects), dtype=bool)
+    stale = []
+
+    for i, obj in enumerate(objects):
+        entry = _cache.get((obj, mode))
+        if entry is not None and entry[1] == dependencies.geometry_version(obj) \
+                and np.array_equal(entry[0], matrices[i]):
+            if entry[2] is None:
+                valid[i] = False
+            else:
+                rows[i] = entry[2]
+        else:
+            stale.append(i)
+
+    # Bound boxes all have eight corners, so stale ones go through one batch
+    if mode == 'BOUND_BOX' and stale:
+        corners = np.array([objects[i].bound_box for i in stale])
+        rows[stale] = core_bounds.corner_stats(matrices[stale], corners)
+        for i in stale:
+            _cache[(objects[i], mode)] = (
+                matrices[i], dependencies.geometry_version(objects[i]),
+                rows[i].copy())
+
+    elif stale:
+        for i in stale:
+            obj = objects[i]
+            row = core_bounds.point_stats(core_bounds.to_world(
+                _local_points(obj, mode, depsgraph), matrices[i]))
+            if row is None:
+                valid[i] = False
+            else:
+                rows[i] = row
+            _cache[(obj, mode)] = (
+                matrices[i], dependencies.geometry_version(obj), row)
+
+    result = core_bounds.combine(rows[valid])
+    if result is None:
+        return None
+
+    return Bounds(*(Vector(v) for v in result))
+
+
+def clear_cache():
+    _cache.clear()
@@ -1,12 +1,89 @@
 import bpy
+import ctypes
+import os
+import sys
+import tempfile
+import time
+
+
+from bpy.props import IntProperty
+from bpy.types import Operator
+
+from .core import undo as core_undo
+
+
+def _flush_c_stdout():
+    for name in (None, 'ucrtbase', 'msvcrt'):
+        try:
+            libc = ctypes.CDLL(name) if name else ctypes.CDLL(None)
+            libc.fflush(None)
+            return
+        except (OSError, AttributeError, TypeError):
+            continue
+
+
+def _capture_c_stdout(func):
+    '''Return what a C function prints to stdout, by redirecting file descriptor 1'''
+    sys.stdout.flush()
+    fd = sys.__stdout__.fileno()
+    saved = os.dup(fd)
+
+    with tempfile.TemporaryFile() as tmp:
+        _flush_c_stdout()
+        os.dup2(tmp.fileno(), fd)
+        try:
+            func()
+            _flush_c_stdout()
+        finally:
+            os.dup2(saved, fd)
+            os.close(saved)
+        tmp.seek(0)
+        return tmp.read().decode('utf-8', 'replace')
+
+
+def undo_history(context):
+    '''Return (active index, skip flags) of the undo stack, or None if unreadable.
+
+    Python has no direct access to the undo stack, but the window manager
+    can print it. The capture takes anything written to stdout meanwhile,
+    also from other threads, so the result is only trusted when the step
+    lines match the header's count, index for index, with one active step.
+    '''
+    try:
+        text = _capture_c_stdout(context.window_manager.print_undo_steps)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+    return core_undo.parse_undo_steps(text)
+
+
+def jump_history(operator, context, steps):
+    '''Undo (steps < 0) or redo (steps > 0) with a single history jump'''
+    start = time.perf_counter()
+    history = undo_history(context)
+
+    if history is None:
+        # Fall back to stepping one memfile restore at a time
+        step = bpy.ops.ed.redo if steps > 0 else bpy.ops.ed.undo
+        for i in range(abs(steps)):
+            step()
+        skipped = abs(steps)
+    else:
+        active, skips = history
+        target = core_undo.history_target(active, skips, steps)
+        skipped = abs(target - active)
+        if skipped:
+            bpy.ops.ed.undo_history(item=target)
+
+    elapsed = time.perf_counter() - start
+    print('MTools: %s %d steps in %.1f ms%s' % (
+        'redo' if steps > 0 else 'undo', skipped, elapsed * 1000,
+        ' (stepwise fallback)' if history is None else ''))
+    operator.report(
+        {'INFO'}, '%s steps: %u in %.0f ms' % (
+            'Redo' if steps > 0 else 'Undo', skipped, elapsed * 1000))
 
 
-from bpy.types import (
-    IntProperty,
-    Operator,
-    
-)
-
 class MTools_OT_BulkUndo(Operator):
     """Execute a predefined number of undo steps"""
     bl_label = "Undo"
@@ -19,13 +96,7 @@ class MTools_OT_BulkUndo(Operator):
         row.prop(self, "undo_steps", text="?")
 
     def execute(self, context):
-        u = self.undo_steps
-        self.report(
-            {'INFO'}, 'Undo steps: %u' %
-            (u)
-        )
-        for i in range(u):
-            bpy.ops.ed.undo()
+        jump_history(self, context, -self.undo_steps)
 
         return {'FINISHED'}
 
@@ -42,13 +113,7 @@ class MTools_OT_BulkRedo(Operator):
         row.prop(self, "redo_steps", text="?")
 
     def execute(self, context):
-        u = self.redo_steps
-        self.report(
-            {'INFO'}, 'Redo steps: %u' %
-            (u)
-        )
-        for i in range(u):
-            bpy.ops.ed.redo()
+        jump_history(self, context, self.redo_steps)
 
         return {'FINISHED'}
     
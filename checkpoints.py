@@ -0,0 +1,291 @@
+"""Named scene-state checkpoints.
+
+Lightweight snapshots of what layout artists change: transforms,
+visibility, selection and parent links of the selected or of all objects.
+They live in Python memory as compact NumPy arrays, outside Blender's
+global undo stack, and are restored with bulk foreach_set calls. The
+store keeps to a memory budget by evicting the least recently used
+checkpoint.
+"""
+import time
+from collections import OrderedDict
+
+import bpy
+from bpy.props import EnumProperty, IntProperty, StringProperty
+from bpy.types import Operator, WindowManager
+from mathutils import Matrix
+
+from . import lazy
+
+np = lazy.lazy_import('numpy')
+
+checkpoint_scopes = [
+    ('SELECTED', 'Selected', 'Only the selected objects'),
+    ('ALL', 'All', 'Every object of the view layer'),
+]
+
+
+class Checkpoint:
+    '''State of a set of objects, one array row per object'''
+
+    def __init__(self, name, objects):
+        # Keep the collection around, it can be read with foreach_get
+        source = objects
+        objects = list(objects)
+        n = len(objects)
+
+        self.name = name
+        self.created = time.time()
+        self.names = [o.name_full for o in objects]
+        self.pointers = np.fromiter(
+            (o.as_pointer() for o in objects), dtype=np.uint64, count=n)
+        self.matrix_basis = _read_matrix(source, 'matrix_basis')
+        self.matrix_parent_inverse = _read_matrix(source, 'matrix_parent_inverse')
+        self.parents = np.fromiter(
+            (o.parent.as_pointer() if o.parent else 0 for o in objects),
+            dtype=np.uint64, count=n)
+        self.hide_viewport = np.fromiter(
+            (o.hide_viewport for o in objects), dtype=bool, count=n)
+        self.hide = np.fromiter((o.hide_get() for o in objects), dtype=bool, count=n)
+        self.select = np.fromiter((o.select_get() for o in objects), dtype=bool, count=n)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        arrays = (self.pointers, self.matrix_basis, self.matrix_parent_inverse,
+                  self.parents, self.hide_viewport, self.hide, self.select)
+        return sum(a.nbytes for a in arrays) + sum(len(n) for n in self.names)
+
+    def resolve(self, view_layer):
+        '''Match the stored rows to live objects, by pointer and then by name.
+
+        Returns (objects, rows, by_pointer); objects that no longer exist
+        are left out.
+        '''
+        live = view_layer.objects
+        by_pointer = {o.as_pointer(): o for o in live}
+        objects = []
+        rows = []
+
+        for row, (pointer, name) in enumerate(zip(self.pointers.tolist(), self.names)):
+            obj = by_pointer.get(pointer) or bpy.data.objects.get(name)
+            if obj is not None:
+                objects.append(obj)
+                rows.append(row)
+
+        return objects, np.array(rows, dtype=np.int64), by_pointer
+
+    def restore(self, view_layer):
+        '''Put the stored state back, returns the number of objects restored'''
+        objects, rows, by_pointer = self.resolve(view_layer)
+
+        # Parents first, matrices are relative to them
+        for obj, pointer in zip(objects, self.parents[rows].tolist()):
+            parent = by_pointer.get(pointer) if pointer else None
+            if obj.parent != parent:
+                obj.parent = parent
+
+        # The inverse can change under the same parent, with Clear Parent
+        # Inverse for one, so it is always written back
+        live = view_layer.objects
+        if len(rows) == len(live) and np.array_equal(
+                self.pointers[rows],
+                np.fromiter((o.as_pointer() for o in live), dtype=np.uint64,
+                            count=len(live))):
+            # Same objects in the same order, one C level pass per property
+            live.foreach_set('matrix_parent_inverse',
+                             self.matrix_parent_inverse[rows].ravel())
+            live.foreach_set('matrix_basis', self.matrix_basis[rows].ravel())
+            live.foreach_set('hide_viewport', self.hide_viewport[rows])
+        else:
+            for obj, inverse, matrix, hidden in zip(
+                    objects, self.matrix_parent_inverse[rows],
+                    self.matrix_basis[rows], self.hide_viewport[rows].tolist()):
+                if obj.parent is not None:
+                    obj.matrix_parent_inverse = Matrix(inverse.reshape(4, 4).T.tolist())
+                obj.matrix_basis = Matrix(matrix.reshape(4, 4).T.tolist())
+                obj.hide_viewport = hidden
+
+        for obj, hidden, selected in zip(objects, self.hide[rows].tolist(),
+                                         self.select[rows].tolist()):
+            obj.hide_set(hidden, view_layer=view_layer)
+            obj.select_set(selected, view_layer=view_layer)
+
+        return len(objects)
+
+
+def _read_matrix(objects, attr):
+    '''(n, 16) float32 array in Blender's column major foreach layout'''
+    flat = np.empty(len(objects) * 16, dtype=np.float32)
+
+    if hasattr(objects, 'foreach_get'):
+        objects.foreach_get(attr, flat)
+    else:
+        matrices = flat.reshape(-1, 4, 4)
+        for i, obj in enumerate(objects):
+            matrices[i] = getattr(obj, attr)
+        # Matrix rows came in row major, store columns like foreach_get
+        matrices[:] = matrices.transpose(0, 2, 1)
+
+    return flat.reshape(-1, 16)
+
+
+class CheckpointStore:
+    '''Checkpoints by name, least recently used first'''
+
+    def __init__(self, budget=256 * 1024 * 1024):
+        self.budget = budget
+        self.checkpoints = OrderedDict()
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self.checkpoints.values())
+
+    def add(self, checkpoint):
+        self.checkpoints.pop(checkpoint.name, None)
+        self.checkpoints[checkpoint.name] = checkpoint
+        return self.evict()
+
+    def get(self, name):
+        checkpoint = self.checkpoints.get(name)
+        if checkpoint is not None:
+            self.checkpoints.move_to_end(name)
+        return checkpoint
+
+    def remove(self, name):
+        self.checkpoints.pop(name, None)
+
+    def evict(self):
+        '''Drop old checkpoints until the store fits its budget, returns their names'''
+        evicted = []
+
+        # Never evict the newest one, even if it alone is over budget
+        while len(self.checkpoints) > 1 and self.nbytes > self.budget:
+            name, checkpoint = self.checkpoints.popitem(last=False)
+            evicted.append(name)
+
+        return evicted
+
+
+store = CheckpointStore()
+
+
+def update_budget(self, context):
+    store.budget = context.window_manager.mtools_checkpoint_budget * 1024 * 1024
+    store.evict()
+
+
+class MTools_OT_CheckpointSave(Operator):
+    """Store transforms, visibility, selection and parents under a name"""
+    bl_label = "Save checkpoint"
+    bl_idname = "mops.checkpoint_save"
+
+    scope: EnumProperty(
+        name="Objects",
+        items=checkpoint_scopes,
+        default='SELECTED'
+    )
+
+    def execute(self, context):
+        start = time.perf_counter()
+        name = context.window_manager.mtools_checkpoint_name.strip() or \
+            'Checkpoint %d' % (len(store.checkpoints) + 1)
+
+        if self.scope == 'ALL':
+            objects = context.view_layer.objects
+        else:
+            objects = context.selected_objects
+
+        checkpoint = Checkpoint(name, objects)
+        evicted = store.add(checkpoint)
+
+        self.report({'INFO'}, "Saved %s: %d objects, %.1f KiB in %.1f ms%s" % (
+            name, len(checkpoint), checkpoint.nbytes / 1024,
+            (time.perf_counter() - start) * 1000,
+            ", evicted " + ", ".join(evicted) if evicted else ""))
+
+        return {'FINISHED'}
+
+
+class MTools_OT_CheckpointRestore(Operator):
+    """Restore a checkpoint. This is not an undo step of its own"""
+    bl_label = "Restore checkpoint"
+    bl_idname = "mops.checkpoint_restore"
+
+    name: StringProperty(name="Checkpoint")
+
+    def execute(self, context):
+        checkpoint = store.get(self.name)
+
+        if checkpoint is None:
+            self.report({'WARNING'}, "No checkpoint named %s" % self.name)
+            return {'CANCELLED'}
+
+        start = time.perf_counter()
+        count = checkpoint.restore(context.view_layer)
+        self.report({'INFO'}, "Restored %s: %d of %d objects in %.1f ms" % (
+            self.name, count, len(checkpoint),
+            (time.perf_counter() - start) * 1000))
+
+        return {'FINISHED'}
+
+
+class MTools_OT_CheckpointDelete(Operator):
+    """Forget a checkpoint"""
+    bl_label = "Delete checkpoint"
+    bl_idname = "mops.checkpoint_delete"
+
+    name: StringProperty(name="Checkpoint")
+
+    def execute(self, context):
+        store.remove(self.name)
+
+        return {'FINISHED'}
+
+
+def draw_checkpoints(layout, context):
+    wm = context.window_manager
+    row = layout.row(align=True)
+    row.prop(wm, 'mtools_checkpoint_name', text="")
+    row.operator('mops.checkpoint_save', text="", icon='ADD').scope = 'SELECTED'
+    row.operator('mops.checkpoint_save', text="", icon='SCENE_DATA').scope = 'ALL'
+
+    col = layout.column(align=True)
+    for name, checkpoint in reversed(store.checkpoints.items()):
+        row = col.row(align=True)
+        row.operator('mops.checkpoint_restore', text="%s (%d)" % (
+            name, len(checkpoint)), icon='RECOVER_LAST').name = name
+        row.operator('mops.checkpoint_delete', text="", icon='X').name = name
+
+    layout.label(text="%.1f of %d MiB" % (
+        store.nbytes / 1024 / 1024, wm.mtools_checkpoint_budget))
+    layout.prop(wm, 'mtools_checkpoint_budget', text="Budget (MiB)")
+
+
+classes = (
+    MTools_OT_CheckpointSave,
+    MTools_OT_CheckpointRestore,
+    MTools_OT_CheckpointDelete,
+)
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+    WindowManager.mtools_checkpoint_name = StringProperty(
+        name="Checkpoint name", default="")
+    WindowManager.mtools_checkpoint_budget = IntProperty(
+        name="Checkpoint memory budget", default=256, min=1,
+        description="Memory in MiB the checkpoints may use before old ones are dropped",
+        update=update_budget)
+
+
+def unregister():
+    del WindowManager.mtools_checkpoint_name
+    del WindowManager.mtools_checkpoint_budget
+
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,8 @@
+"""The algorithms behind the operators, free of bpy and mathutils.
+
+Everything in this package works on plain Python objects, NumPy arrays
+and anything shaped like the bpy types it reads, so it runs in a plain
+Python process against the stand-ins in core.standin, which is how the
+tests in tests/ run it with plain pytest. The modules in the add-on's top
+level are the adapters that feed it Blender data.
+"""
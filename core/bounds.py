@@ -0,0 +1,94 @@
+"""Bounds math for controller placement.
+
+Points are reduced to stats rows, [sum x, sum y, sum z, count, min xyz,
+max xyz], which combine into a centroid, an axis aligned bounding box
+and a floor point without going back to the points.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Bounds = namedtuple('Bounds', ('centroid', 'minimum', 'maximum', 'floor'))
+
+
+def point_stats(points):
+    '''Stats row of (n, 3) points, None without points'''
+    if not len(points):
+        return None
+
+    return np.concatenate((points.sum(axis=0), (len(points),),
+                           points.min(axis=0), points.max(axis=0)))
+
+
+def to_world(points, matrix):
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def corner_stats(matrices, corners):
+    '''Stats rows of (n, 8, 3) local bound box corners under (n, 4, 4) matrices'''
+    world = np.einsum('nij,nkj->nki', matrices[:, :3, :3], corners) + \
+        matrices[:, None, :3, 3]
+    rows = np.empty((len(world), 10))
+    rows[:, :3] = world.sum(axis=1)
+    rows[:, 3] = corners.shape[1]
+    rows[:, 4:7] = world.min(axis=1)
+    rows[:, 7:10] = world.max(axis=1)
+
+    return rows
+
+
+def combine(rows):
+    '''Bounds of the points behind some stats rows, None without rows'''
+    if not len(rows):
+        return None
+
+    centroid = rows[:, :3].sum(axis=0) / rows[:, 3].sum()
+    minimum = rows[:, 4:7].min(axis=0)
+    maximum = rows[:, 7:10].max(axis=0)
+    floor = np.array((centroid[0], centroid[1], minimum[2]))
+
+    return Bounds(centroid, minimum, maximum, floor)
+
+
+def object_bounds(objects):
+    '''Bounds of the world space bound boxes of objects, empties excluded.
+
+    Reads matrix_world and bound_box of anything shaped like an object,
+    without the caching of the add-on's bounds module.
+    '''
+    objects = [obj for obj in objects if obj.type != 'EMPTY']
+
+    if not objects:
+        return None
+
+    matrices = np.array([obj.matrix_world for obj in objects], dtype=np.float64)
+    corners = np.array([obj.bound_box for obj in objects], dtype=np.float64)
+
+    return combine(corner_stats(matrices, corners))
+
+
+def empty_location(model_bounds, empty_loc, floor_bounds=None):
+    '''Where a controller goes for an empty_loc mode, None for the origin.
+
+    AVGFLOOR goes right under the AVG centroid, at the lowest z of
+    floor_bounds when given, like the bounds of the evaluated vertices,
+    else of model_bounds.
+    '''
+    if model_bounds is None:
+        return None
+
+    if empty_loc == 'AVGFLOOR':
+        lowest = (model_bounds if floor_bounds is None else floor_bounds).minimum[2]
+        return np.array((model_bounds.centroid[0], model_bounds.centroid[1], lowest))
+    if empty_loc == 'AVG':
+        return np.array(model_bounds.centroid)
+
+    return None
+
+
+def average_locations(locations, size=3):
+    '''Mean of a list of locations'''
+    if not len(locations):
+        return np.zeros(size)
+
+    return np.asarray(locations, dtype=np.float64)[:, :size].mean(axis=0)
@@ -0,0 +1,489 @@
+"""Asset catalog index.
+
+Keeps the parsed contents of every asset library's ``blender_assets.cats.txt``
+in memory and on disk. Each library entry is keyed on the library path and
+the catalog file's mtime and size, so an unchanged library only costs a
+``stat`` call. This module does not import bpy.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+CATALOG_FILENAME = 'blender_assets.cats.txt'
+INDEX_FILENAME = 'catalog_index.json'
+INDEX_VERSION = 1
+SKIP_PREFIXES = ('#', 'VERSION')
+# Signature of a library the index has never seen
+UNKNOWN = object()
+
+
+def parse_catalog_file(cat_path):
+    '''Return the (uuid, catalog path, simple name) entries of a catalog file'''
+    entries = []
+
+    with open(cat_path) as f:
+        # Iterate the file object so huge catalog files are streamed
+        for line in f:
+            if line.startswith(SKIP_PREFIXES):
+                continue
+            parts = line.rstrip('\n').split(':')
+            if len(parts) == 3:
+                entries.append(parts)
+
+    return entries
+
+
+def stat_catalog_file(libpath):
+    '''Return the (mtime, size) signature of a library's catalog file, or None'''
+    try:
+        st = os.stat(os.path.join(libpath, CATALOG_FILENAME))
+    except OSError:
+        return None
+
+    return [st.st_mtime_ns, st.st_size]
+
+
+CATALOG_HEADER = (
+    '# This is an Asset Catalog Definition file for Blender.\n'
+    '#\n'
+    '# Empty lines and lines starting with `#` will be ignored.\n'
+    '# The first non-ignored line should be the version indicator.\n'
+    '# Other lines are of the format "UUID:catalog/path/for/assets:simple catalog name"\n'
+    '\n'
+    'VERSION 1\n'
+    '\n'
+)
+
+
+def merge_catalog_file(libpath, entries):
+    '''Add the (uuid, catalog path, simple name) entries whose path a
+    library's catalog file lacks. The file is rewritten through a temporary
+    file and os.replace, so Blender never reads half of it.
+
+    Returns {catalog path: uuid} as the file has it afterwards.
+    '''
+    cat_path = os.path.join(libpath, CATALOG_FILENAME)
+
+    try:
+        with open(cat_path) as f:
+            text = f.read()
+        existing = parse_catalog_file(cat_path)
+    except FileNotFoundError:
+        text = CATALOG_HEADER
+        existing = []
+
+    by_path = {}
+    for uuid, catalog, simple_name in existing:
+        by_path.setdefault(catalog, uuid)
+
+    lines = []
+    for uuid, catalog, simple_name in entries:
+        if catalog not in by_path:
+            by_path[catalog] = uuid
+            lines.append('%s:%s:%s\n' % (uuid, catalog, simple_name))
+
+    if lines:
+        if text and not text.endswith('\n'):
+            text += '\n'
+        tmp_path = cat_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(text + ''.join(lines))
+        os.replace(tmp_path, cat_path)
+
+    return by_path
+
+
+def read_library(libpath, known_signature=UNKNOWN):
+    '''Stat a library's catalog file and parse it if its signature changed.
+
+    Returns (signature, entries) where entries is None if the signature
+    still matches. Touches no shared state, so it is safe to run in a
+    worker thread.
+    '''
+    signature = stat_catalog_file(libpath)
+
+    if signature == known_signature:
+        return signature, None
+
+    entries = []
+    if signature is not None:
+        try:
+            entries = parse_catalog_file(
+                os.path.join(libpath, CATALOG_FILENAME))
+        except OSError as e:
+            print('MTools: could not read catalogs of', libpath, e)
+            signature = None
+
+    return signature, entries
+
+
+class CatalogNode:
+    '''One path component of the catalog tree'''
+    __slots__ = ('name', 'path', 'uuid', 'simple_name',
+                 'libname', 'libpath', 'children')
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        # Intermediate components that are not catalogs themselves
+        # keep uuid None
+        self.uuid = None
+        self.simple_name = None
+        self.libname = None
+        self.libpath = None
+        self.children = {}
+
+
+class CatalogTrie:
+    '''Catalog paths as a tree, with a reverse map from UUID to path.
+
+    Lookups, child listing and prefix walks cost O(depth) rather than a
+    scan over all catalogs. Paths with a leading or trailing '/' are not
+    normalised, Blender never writes them.
+    '''
+
+    def __init__(self):
+        self.root = CatalogNode('', '')
+        # Every node by full path, so deep inserts share their parents
+        self.nodes = {'': self.root}
+        self.by_uuid = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, path):
+        node = self.nodes.get(path)
+        return node is not None and node.uuid is not None
+
+    def _ensure(self, path):
+        node = self.nodes.get(path)
+
+        if node is None:
+            parent_path, _, name = path.rpartition('/')
+            parent = self._ensure(parent_path)
+            node = parent.children[name] = CatalogNode(name, path)
+            self.nodes[path] = node
+
+        return node
+
+    def insert(self, uuid, path, simple_name, libname=None, libpath=None):
+        '''Add a catalog, keeping the first entry for duplicate paths'''
+        node = self._ensure(path)
+
+        if node.uuid is not None:
+            return node
+
+        node.uuid = uuid
+        node.simple_name = simple_name
+        node.libname = libname
+        node.libpath = libpath
+        self.by_uuid.setdefault(uuid, path)
+        self.count += 1
+
+        return node
+
+    def find(self, path):
+        return self.nodes.get(path)
+
+    def uuid(self, path):
+        '''Return the UUID of a catalog path, or None'''
+        node = self.find(path)
+        return node.uuid if node else None
+
+    def path(self, uuid):
+        '''Return the catalog path of a UUID, or None'''
+        return self.by_uuid.get(uuid)
+
+    def children(self, path=''):
+        '''Return the direct child nodes of a path'''
+        node = self.find(path)
+        return list(node.children.values()) if node else []
+
+    def walk(self, prefix=''):
+        '''Yield every catalog node at or below a path, depth first'''
+        node = self.find(prefix)
+        if node is None:
+            return
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.uuid is not None:
+                yield node
+            stack.extend(reversed(list(node.children.values())))
+
+
+class CatalogIndex:
+    '''Catalogs of all asset libraries, re-read only when a catalog file changed'''
+
+    def __init__(self, cache_dir=None):
+        self.cache_path = os.path.join(
+            cache_dir, INDEX_FILENAME) if cache_dir else None
+        # libpath -> {'libname', 'signature', 'entries'}
+        self.libraries = {}
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._loaded = False
+        self._catalogs = None
+        self._catalogs_key = None
+        self._trie = None
+        self._trie_key = None
+
+    def load(self):
+        '''Read the on-disk index once, ignoring missing or outdated files'''
+        self._loaded = True
+
+        if not self.cache_path:
+            return
+
+        try:
+            with open(self.cache_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') == INDEX_VERSION:
+            self.libraries = data.get('libraries', {})
+
+    def save(self):
+        if not self.cache_path:
+            return
+
+        data = {'version': INDEX_VERSION, 'libraries': self.libraries}
+        tmp_path = self.cache_path + '.tmp'
+
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print('MTools: could not write catalog index:', e)
+
+    def signature(self, libpath):
+        entry = self.libraries.get(libpath)
+        return entry['signature'] if entry else UNKNOWN
+
+    def merge(self, libname, libpath, signature, entries):
+        '''Store a read_library result, returns True if the index changed'''
+        if entries is None:
+            self.hits += 1
+            entry = self.libraries[libpath]
+            if entry['libname'] != libname:
+                entry['libname'] = libname
+                return True
+            return False
+
+        self.misses += 1
+        self.libraries[libpath] = {'libname': libname,
+                                   'signature': signature,
+                                   'entries': entries}
+        return True
+
+    def prune(self, libraries):
+        '''Drop libraries that are no longer registered'''
+        wanted = {libpath for libname, libpath in libraries}
+        dropped = [libpath for libpath in self.libraries if libpath not in wanted]
+
+        for libpath in dropped:
+            del self.libraries[libpath]
+
+        return bool(dropped)
+
+    def update(self, libraries, debug=False):
+        '''Bring the index in line with a list of (libname, libpath) pairs.
+
+        Only libraries whose catalog file signature changed are re-parsed.
+        Returns True if anything was re-read or dropped.
+        '''
+        if not self._loaded:
+            self.load()
+
+        changed = False
+
+        for libname, libpath in libraries:
+            signature, entries = read_library(libpath, self.signature(libpath))
+
+            if debug and entries is not None:
+                print('MTools: read catalogs of', libname, libpath)
+
+            changed |= self.merge(libname, libpath, signature, entries)
+
+        changed |= self.prune(libraries)
+
+        if changed:
+            self.generation += 1
+            self.save()
+
+        return changed
+
+    def catalogs(self, libraries):
+        '''Merge the catalogs of the given libraries, first library wins'''
+        key = (self.generation, tuple(libraries))
+
+        if self._catalogs_key == key:
+            return self._catalogs
+
+        catalogs = {}
+
+        for libname, libpath in libraries:
+            entry = self.libraries.get(libpath)
+            if not entry:
+                continue
+
+            for uuid, catalog, simple_name in entry['entries']:
+                if catalog not in catalogs:
+                    catalogs[catalog] = {'uuid': uuid,
+                                         'simple_name': simple_name,
+                                         'libname': libname,
+                                         'libpath': libpath}
+
+        self._catalogs = catalogs
+        self._catalogs_key = key
+
+        return catalogs
+
+    def trie(self, libraries):
+        '''Return the catalog tree of the given libraries, first library wins'''
+        key = (self.generation, tuple(libraries))
+
+        if self._trie_key != key:
+            trie = CatalogTrie()
+            for libname, libpath in libraries:
+                entry = self.libraries.get(libpath)
+                if not entry:
+                    continue
+                for uuid, catalog, simple_name in entry['entries']:
+                    trie.insert(uuid, catalog, simple_name, libname, libpath)
+            self._trie = trie
+            self._trie_key = key
+
+        return self._trie
+
+    def stats(self):
+        return {'libraries': len(self.libraries),
+                'hits': self.hits,
+                'misses': self.misses}
+
+    def clear(self):
+        self.libraries = {}
+        self.generation += 1
+        self.hits = 0
+        self.misses = 0
+        self.save()
+
+
+class CatalogScan:
+    '''Read the catalog files of many libraries concurrently.
+
+    Libraries are read by a few daemon worker threads. poll() merges finished
+    libraries into the index from the calling thread and gives up on the
+    ones that did not answer within timeout seconds, so one slow mount
+    does not hold back the others. Libraries that time out keep whatever
+    the index already knew about them.
+    '''
+
+    def __init__(self, index, libraries, timeout=10.0, max_workers=8):
+        self.index = index
+        self.libraries = list(libraries)
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.pending = {}
+        self.finished = []
+        self.timed_out = []
+        self.started = None
+        self._changed = False
+
+    @property
+    def done(self):
+        return self.started is not None and not self.pending
+
+    def start(self):
+        if not self.index._loaded:
+            self.index.load()
+
+        self.started = time.monotonic()
+
+        if not self.libraries:
+            return
+
+        jobs = queue.SimpleQueue()
+        for libname, libpath in self.libraries:
+            future = Future()
+            self.pending[future] = (libname, libpath)
+            jobs.put((future, libpath, self.index.signature(libpath)))
+
+        # Daemon threads, unlike executor workers the interpreter does not
+        # join them at exit, so a hung mount cannot keep Blender from quitting
+        for i in range(min(self.max_workers, len(self.libraries))):
+            threading.Thread(target=self._work, args=(jobs,),
+                             name='mtools_catalogs_%d' % i, daemon=True).start()
+
+    @staticmethod
+    def _work(jobs):
+        while True:
+            try:
+                future, libpath, signature = jobs.get_nowait()
+            except queue.Empty:
+                return
+
+            # Cancelled by a timed out poll()
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(read_library(libpath, signature))
+            except Exception as e:
+                future.set_exception(e)
+
+    def poll(self):
+        '''Merge the libraries that finished, returns True if the index changed'''
+        changed = False
+
+        for future in [f for f in self.pending if f.done()]:
+            libname, libpath = self.pending.pop(future)
+            try:
+                signature, entries = future.result()
+            except Exception as e:
+                print('MTools: catalog scan of', libname, 'failed:', e)
+                continue
+
+            changed |= self.index.merge(libname, libpath, signature, entries)
+            self.finished.append(libpath)
+
+        if self.pending and time.monotonic() - self.started > self.timeout:
+            for future, (libname, libpath) in self.pending.items():
+                future.cancel()
+                self.timed_out.append(libpath)
+                print('MTools: catalog scan of', libname, 'timed out')
+            self.pending.clear()
+
+        if not self.pending:
+            changed |= self.index.prune(self.libraries)
+
+        if changed:
+            self.index.generation += 1
+            self._changed = True
+
+        if self.done and self._changed:
+            self._changed = False
+            self.index.save()
+
+        return changed
+
+
+def library_catalogs(index, libraries, debug=False):
+    '''Bring index up to date with (libname, libpath) pairs and return
+    their merged catalogs, first library wins'''
+    index.update(libraries, debug=debug)
+    all_catalogs = index.catalogs(libraries)
+
+    if debug:
+        print(index.stats())
+        print(all_catalogs)
+
+    return all_catalogs
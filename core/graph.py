@@ -0,0 +1,303 @@
+"""Object dependency graph.
+
+Indexes the relationships between objects once: parents and children,
+every Object or Collection pointer of modifiers and constraints, object
+inputs of geometry nodes modifiers and driver targets. Transitive
+closures over that index cost O(V+E). Objects are read through their RNA
+description, so bpy objects and core.standin objects work alike.
+"""
+from collections import deque
+
+# RNA struct identifier -> (object pointer names, collection pointer names)
+_pointer_props = {}
+
+
+def pointer_properties(struct):
+    '''Names of the Object and Collection pointers of a modifier or constraint'''
+    key = struct.bl_rna.identifier
+    props = _pointer_props.get(key)
+
+    if props is None:
+        objects = []
+        collections = []
+        for prop in struct.bl_rna.properties:
+            if prop.type != 'POINTER':
+                continue
+            if prop.fixed_type.identifier == 'Object':
+                objects.append(prop.identifier)
+            elif prop.fixed_type.identifier == 'Collection':
+                collections.append(prop.identifier)
+        props = _pointer_props[key] = (tuple(objects), tuple(collections))
+
+    return props
+
+
+def is_object(value):
+    '''True for a Blender object, or a stand-in of one'''
+    rna = getattr(value, 'bl_rna', None)
+    return rna is not None and rna.identifier == 'Object'
+
+
+def struct_targets(struct):
+    '''Yield the objects a modifier or constraint points at'''
+    objects, collections = pointer_properties(struct)
+
+    for name in objects:
+        target = getattr(struct, name)
+        if target is not None:
+            yield target
+
+    for name in collections:
+        collection = getattr(struct, name)
+        if collection is not None:
+            yield from collection.all_objects
+
+
+def driver_targets(id_data):
+    '''Yield the objects used by the drivers of an ID'''
+    anim = getattr(id_data, 'animation_data', None)
+
+    if anim is None:
+        return
+
+    for fcurve in anim.drivers:
+        for var in fcurve.driver.variables:
+            for target in var.targets:
+                if is_object(target.id):
+                    yield target.id
+
+
+def object_targets(obj):
+    '''Yield every object obj depends on, its parent excluded'''
+    for mod in obj.modifiers:
+        yield from struct_targets(mod)
+
+        # Geometry nodes inputs live in ID properties, not RNA pointers
+        if mod.type == 'NODES':
+            for value in mod.values():
+                if is_object(value):
+                    yield value
+
+    for con in obj.constraints:
+        yield from struct_targets(con)
+        # Armature constraints keep a list of targets
+        for target in getattr(con, 'targets', ()):
+            if getattr(target, 'target', None) is not None:
+                yield target.target
+
+    yield from driver_targets(obj)
+
+    if obj.data is not None:
+        yield from driver_targets(obj.data)
+
+
+class DependencyGraph:
+    '''Adjacency index over objects, built once and queried many times.
+
+    Objects referenced by indexed objects but missing from the initial
+    list are indexed too, so closures never stop at a scene boundary.
+    relink() and remove() patch single objects in O(degree).
+    '''
+
+    def __init__(self, objects=()):
+        self.objects = []
+        self.index = {}
+        self.parents = []
+        self.children = []
+        self.targets = []
+        self.users = []
+        self.instance_of = []
+        self.instancers = {}
+        # Indices that came from the object list rather than as a target
+        self.members = set()
+        self._unlinked = []
+
+        for obj in objects:
+            self.members.add(self._add(obj))
+
+        self._flush()
+
+    def _add(self, obj):
+        i = self.index.get(obj)
+
+        if i is None:
+            i = self.index[obj] = len(self.objects)
+            self.objects.append(obj)
+            self.parents.append(-1)
+            self.children.append(set())
+            self.targets.append([])
+            self.users.append(set())
+            self.instance_of.append(None)
+            self._unlinked.append(i)
+
+        return i
+
+    def _flush(self):
+        # _link may add newly found targets, which get linked in turn
+        while self._unlinked:
+            self._link(self._unlinked.pop())
+
+    def _link(self, i):
+        obj = self.objects[i]
+
+        if obj.parent is not None:
+            p = self._add(obj.parent)
+            self.parents[i] = p
+            self.children[p].add(i)
+
+        targets = self.targets[i]
+        for target in object_targets(obj):
+            j = self._add(target)
+            if j != i and i not in self.users[j]:
+                self.users[j].add(i)
+                targets.append(j)
+
+        collection = obj.instance_collection if obj.instance_type == 'COLLECTION' else None
+        if collection is not None:
+            self.instance_of[i] = collection
+            self.instancers.setdefault(collection, set()).add(i)
+
+    def _unlink(self, i):
+        '''Drop the outgoing edges of node i'''
+        p = self.parents[i]
+        if p >= 0:
+            self.children[p].discard(i)
+            self.parents[i] = -1
+
+        for j in self.targets[i]:
+            self.users[j].discard(i)
+        self.targets[i] = []
+
+        collection = self.instance_of[i]
+        if collection is not None:
+            instancers = self.instancers.get(collection)
+            if instancers is not None:
+                instancers.discard(i)
+                if not instancers:
+                    del self.instancers[collection]
+            self.instance_of[i] = None
+
+    def relink(self, obj, member=True):
+        '''Re-read the relationships of one object, adding it if needed'''
+        i = self._add(obj)
+        if member:
+            self.members.add(i)
+
+        if i in self._unlinked:
+            self._flush()
+            return
+
+        self._unlink(i)
+        self._link(i)
+        self._flush()
+
+    def remove(self, obj):
+        '''Forget an object and every edge that touches it'''
+        i = self.index.pop(obj, None)
+
+        if i is None:
+            return
+
+        self._unlink(i)
+
+        for c in self.children[i]:
+            self.parents[c] = -1
+        self.children[i] = set()
+
+        for u in self.users[i]:
+            self.targets[u].remove(i)
+        self.users[i] = set()
+
+        self.objects[i] = None
+        self.members.discard(i)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, obj):
+        return obj in self.index
+
+    @property
+    def edge_count(self):
+        return sum(len(t) for t in self.targets) + \
+            sum(len(c) for c in self.children)
+
+    def dependencies(self, obj):
+        '''Objects obj points at through a modifier, constraint or driver'''
+        return [self.objects[j] for j in self.targets[self.index[obj]]]
+
+    def instances_of(self, collection):
+        '''Empties that instance the given collection'''
+        return [self.objects[i] for i in self.instancers.get(collection, ())]
+
+    def closure(self, roots, children=True):
+        '''Return every object the roots need, in breadth first order.
+
+        The hierarchies of the roots come along whole with children=True,
+        a root's parent chain and every child below it. Of modifier,
+        constraint and driver targets only the target, its parent chain and
+        in turn their targets are needed, not the target's other children.
+        '''
+        return self.parts(roots, children)[0]
+
+    def parts(self, roots, children=True):
+        '''Return (closure, hierarchy), the closure of the roots and those of
+        its objects that are in the roots' own hierarchies, both in breadth
+        first order. Objects only needed as targets are left out of the
+        hierarchy, a model reparents its hierarchy and leaves them be.
+        '''
+        # 0 not reached, 1 needed as a dependency, 2 part of a hierarchy
+        state = bytearray(len(self.objects))
+        queue = deque()
+        result = []
+
+        def reach(j, level):
+            if state[j] < level:
+                if not state[j]:
+                    result.append(self.objects[j])
+                state[j] = level
+                queue.append(j)
+
+        for obj in roots:
+            i = self.index.get(obj)
+            if i is not None:
+                reach(i, 2 if children else 1)
+
+        while queue:
+            i = queue.popleft()
+            level = state[i]
+
+            if self.parents[i] >= 0:
+                reach(self.parents[i], level)
+            if level == 2:
+                for j in self.children[i]:
+                    reach(j, 2)
+            for j in self.targets[i]:
+                reach(j, 1)
+
+        hierarchy = [obj for obj in result if state[self.index[obj]] == 2]
+
+        return result, hierarchy
+
+    def roots(self, objects):
+        '''Objects without a parent among the given objects'''
+        members = {self.index[obj] for obj in objects}
+        return [obj for obj in objects
+                if self.parents[self.index[obj]] not in members]
+
+    def find_controller(self, objects):
+        '''Return the single root empty with children among objects, or None'''
+        candidates = [obj for obj in self.roots(objects)
+                      if obj.type == 'EMPTY' and self.children[self.index[obj]]]
+
+        return candidates[0] if len(candidates) == 1 else None
+
+
+def objects_to_assemble(graph, selected):
+    '''Every object the selection needs, its controller empty or None, and
+    the top level objects of the selected hierarchies, which go under a
+    new controller'''
+    objects, hierarchy = graph.parts(selected)
+    controller = graph.find_controller(hierarchy)
+
+    return set(objects), controller, graph.roots(hierarchy)
@@ -0,0 +1,18 @@
+"""Checks behind the operator polls.
+
+Polls run on every redraw, so these read Blender's own counters and
+pointers and never walk mesh elements or the selection.
+"""
+
+
+def has_selected_vertices(obj, mode):
+    '''True for a mesh in edit mode with at least one selected vertex.
+    total_vert_sel is kept up to date by edit mode'''
+    return obj is not None and obj.type == 'MESH' and mode == 'EDIT_MESH' \
+        and obj.data is not None and obj.data.total_vert_sel > 0
+
+
+def is_collection_instance(obj):
+    '''True for an empty that instances a collection'''
+    return obj is not None and obj.type == 'EMPTY' \
+        and obj.instance_type == 'COLLECTION' and obj.instance_collection is not None
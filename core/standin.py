@@ -0,0 +1,189 @@
+"""Stand-ins for the bpy types the core reads.
+
+Objects, modifiers, constraints, drivers and collections with just the
+attributes core.graph and core.bounds use, including the bl_rna pointer
+descriptions the dependency graph discovers targets through. Enough to
+run and time the core in a plain Python process.
+"""
+
+IDENTITY = ((1.0, 0.0, 0.0, 0.0),
+            (0.0, 1.0, 0.0, 0.0),
+            (0.0, 0.0, 1.0, 0.0),
+            (0.0, 0.0, 0.0, 1.0))
+
+# bound_box of the default cube, corner index = x * 4 + y * 2 + z
+CUBE_BOUND_BOX = tuple((x, y, z) for x in (-1.0, 1.0)
+                       for y in (-1.0, 1.0) for z in (-1.0, 1.0))
+
+
+class FixedType:
+    def __init__(self, identifier):
+        self.identifier = identifier
+
+
+class Property:
+    def __init__(self, identifier, fixed_type):
+        self.identifier = identifier
+        self.type = 'POINTER'
+        self.fixed_type = FixedType(fixed_type)
+
+
+class RNA:
+    '''The part of bl_rna the core reads: identifier and pointer properties'''
+
+    def __init__(self, identifier, objects=(), collections=()):
+        self.identifier = identifier
+        self.properties = [Property(name, 'Object') for name in objects] + \
+            [Property(name, 'Collection') for name in collections]
+
+
+class Object:
+    bl_rna = RNA('Object')
+
+    def __init__(self, name, type='MESH', data=None, parent=None,
+                 location=(0.0, 0.0, 0.0), bound_box=CUBE_BOUND_BOX):
+        self.name = name
+        self.type = type
+        self.data = data
+        self.parent = parent
+        self.modifiers = []
+        self.constraints = []
+        self.animation_data = None
+        self.instance_type = 'NONE'
+        self.instance_collection = None
+        self.bound_box = bound_box if type != 'EMPTY' else (
+            (0.0, 0.0, 0.0),) * 8
+        self.matrix_world = [list(row) for row in IDENTITY]
+        self.location = location
+
+    @property
+    def location(self):
+        return tuple(row[3] for row in self.matrix_world[:3])
+
+    @location.setter
+    def location(self, location):
+        for row, value in zip(self.matrix_world, location):
+            row[3] = float(value)
+
+    def __repr__(self):
+        return '<Object %r>' % self.name
+
+
+# Modifier and constraint type -> (Object pointers, Collection pointers)
+MODIFIER_POINTERS = {
+    'ARMATURE': (('object',), ()),
+    'ARRAY': (('offset_object', 'start_cap', 'end_cap'), ()),
+    'BOOLEAN': (('object',), ('collection',)),
+    'CURVE': (('object',), ()),
+    'MIRROR': (('mirror_object',), ()),
+    'NODES': ((), ()),
+    'SHRINKWRAP': (('target', 'auxiliary_target'), ()),
+}
+CONSTRAINT_POINTERS = {
+    'ARMATURE': ((), ()),
+    'CHILD_OF': (('target',), ()),
+    'COPY_LOCATION': (('target',), ()),
+    'COPY_TRANSFORMS': (('target',), ()),
+    'TRACK_TO': (('target',), ()),
+}
+
+_rna = {}
+
+
+def _struct_rna(kind, type, pointers):
+    identifier = type.title().replace('_', '') + kind
+    rna = _rna.get(identifier)
+
+    if rna is None:
+        rna = _rna[identifier] = RNA(identifier, *pointers.get(type, ((), ())))
+
+    return rna
+
+
+class Modifier:
+    '''A modifier, targets by pointer name, geometry nodes inputs as values()'''
+
+    def __init__(self, type, inputs=None, **targets):
+        self.type = type
+        self.bl_rna = _struct_rna('Modifier', type, MODIFIER_POINTERS)
+        for prop in self.bl_rna.properties:
+            setattr(self, prop.identifier, targets.get(prop.identifier))
+        self.inputs = dict(inputs or {})
+
+    def values(self):
+        return list(self.inputs.values())
+
+
+class ConstraintTarget:
+    def __init__(self, target):
+        self.target = target
+
+
+class Constraint:
+    '''A constraint, ARMATURE ones keep a list of targets'''
+
+    def __init__(self, type, targets=(), **pointers):
+        self.type = type
+        self.bl_rna = _struct_rna('Constraint', type, CONSTRAINT_POINTERS)
+        for prop in self.bl_rna.properties:
+            setattr(self, prop.identifier, pointers.get(prop.identifier))
+        if type == 'ARMATURE':
+            self.targets = [ConstraintTarget(t) for t in targets]
+
+
+class DriverTarget:
+    def __init__(self, id):
+        self.id = id
+
+
+class DriverVariable:
+    def __init__(self, targets):
+        self.targets = [DriverTarget(t) for t in targets]
+
+
+class Driver:
+    def __init__(self, variables):
+        self.variables = variables
+
+
+class FCurve:
+    def __init__(self, driver):
+        self.driver = driver
+
+
+class AnimationData:
+    def __init__(self):
+        self.drivers = []
+
+
+def add_driver(id_data, *targets):
+    '''Give id_data a driver with one variable reading the target IDs'''
+    if id_data.animation_data is None:
+        id_data.animation_data = AnimationData()
+
+    id_data.animation_data.drivers.append(
+        FCurve(Driver([DriverVariable(targets)])))
+
+
+class Collection:
+    def __init__(self, name, objects=(), children=()):
+        self.name = name
+        self.objects = list(objects)
+        self.children = list(children)
+
+    @property
+    def all_objects(self):
+        '''Objects of the collection and its children, each once'''
+        seen = {}
+        stack = [self]
+        while stack:
+            collection = stack.pop()
+            for obj in collection.objects:
+                seen.setdefault(obj, None)
+            stack.extend(reversed(collection.children))
+        return list(seen)
+
+
+class Scene:
+    def __init__(self, objects=()):
+        self.objects = list(objects)
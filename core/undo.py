@@ -0,0 +1,61 @@
+"""Undo history as printed by Blender.
+
+Python cannot read the undo stack, but WindowManager.print_undo_steps()
+prints it. These parse that output and find the step a bulk undo or
+redo lands on.
+"""
+import re
+
+# Output of BKE_undosys_print: a header with the step count, then one line
+# per step with flags, index, step pointer, type and name
+UNDO_HEADER_LINE = re.compile(r"^Undo (\d+) Steps \(")
+UNDO_STEP_LINE = re.compile(
+    r"^\[([* ])([# ])([M ])([S ])\] +(\d+) \{[^}]*\} type='[^']*', name='.*'$")
+
+
+def parse_undo_steps(text):
+    '''Parse print_undo_steps output, None when it does not add up'''
+    count = None
+    active = None
+    skips = []
+
+    for line in text.splitlines():
+        header = UNDO_HEADER_LINE.match(line)
+        if header:
+            if count is not None:
+                return None
+            count = int(header.group(1))
+            continue
+
+        match = UNDO_STEP_LINE.match(line)
+        if match is None:
+            continue
+        if count is None or int(match.group(5)) != len(skips):
+            return None
+        if match.group(1) == '*':
+            if active is not None:
+                return None
+            active = len(skips)
+        skips.append(match.group(4) == 'S')
+
+    if active is None or count != len(skips):
+        return None
+
+    return active, skips
+
+
+def history_target(active, skips, steps):
+    '''Index reached after steps undos (negative) or redos (positive), clamped'''
+    direction = 1 if steps > 0 else -1
+    target = active
+
+    for _ in range(abs(steps)):
+        nxt = target + direction
+        # Undo and redo pass over steps flagged to be skipped
+        while 0 <= nxt < len(skips) and skips[nxt]:
+            nxt += direction
+        if not 0 <= nxt < len(skips):
+            break
+        target = nxt
+
+    return target
@@ -0,0 +1,160 @@
+"""Scene relationship cache.
+
+Keeps one core.graph.DependencyGraph of the scene objects, patched from
+depsgraph updates so only changed objects are re-read, and the counters
+other caches use as keys.
+"""
+import bpy
+from bpy.app.handlers import persistent
+
+from .core.graph import DependencyGraph
+
+
+def build_dependency_graph(context):
+    '''Index every object of the scene'''
+    return DependencyGraph(context.scene.objects)
+
+
+# Scene relationship cache shared by all operators. Built lazily, then
+# patched from depsgraph updates so only changed objects are re-read.
+_graph = None
+_graph_scene = None
+_dirty = set()
+_check_members = False
+_stats = {'rebuilds': 0, 'patches': 0, 'patched_objects': 0}
+# Bumped on every file load or undo, when all cached ID references go stale
+file_generation = 0
+# Bumped on every depsgraph update, a cheap key for per-redraw caches
+update_count = 0
+# Object -> number of geometry updates seen, for caches of derived data
+_geometry_versions = {}
+
+
+def get_graph(context):
+    '''Return the cached dependency graph of the context scene'''
+    global _graph, _graph_scene, _check_members
+
+    scene = context.scene
+
+    if _graph is None or _graph_scene != scene.as_pointer():
+        _graph = build_dependency_graph(context)
+        _graph_scene = scene.as_pointer()
+        _dirty.clear()
+        _check_members = False
+        _stats['rebuilds'] += 1
+        return _graph
+
+    if not _dirty and not _check_members:
+        return _graph
+
+    _stats['patches'] += 1
+
+    for obj in _dirty:
+        try:
+            # Parts inside instanced collections update too, they are
+            # indexed but must not count as scene members
+            _graph.relink(obj, member=obj.name in scene.objects)
+        except ReferenceError:
+            _graph.remove(obj)
+        _stats['patched_objects'] += 1
+    _dirty.clear()
+
+    # Deleted objects send no update of their own, only their collections
+    # do. Diff the membership when the object count no longer adds up.
+    if _check_members and len(scene.objects) != len(_graph.members):
+        live = set(scene.objects)
+        for obj in [o for o, i in _graph.index.items()
+                    if i in _graph.members and o not in live]:
+            _graph.remove(obj)
+        for obj in live:
+            if obj not in _graph.index:
+                _graph.relink(obj)
+    _check_members = False
+
+    return _graph
+
+
+def invalidate_graph():
+    global _graph, _graph_scene, _check_members
+
+    _graph = None
+    _graph_scene = None
+    _dirty.clear()
+    _check_members = False
+
+
+def graph_stats():
+    stats = dict(_stats)
+    stats['objects'] = len(_graph) if _graph is not None else 0
+    stats['edges'] = _graph.edge_count if _graph is not None else 0
+    stats['dirty'] = len(_dirty)
+
+    return stats
+
+
+def draw_graph_stats(layout):
+    stats = graph_stats()
+    box = layout.box()
+    box.label(text="Relationship cache", icon='OUTLINER')
+    col = box.column(align=True)
+    col.label(text="%d objects, %d edges, %d dirty" % (
+        stats['objects'], stats['edges'], stats['dirty']))
+    col.label(text="%d rebuilds, %d patches of %d objects" % (
+        stats['rebuilds'], stats['patches'], stats['patched_objects']))
+
+
+def geometry_version(obj):
+    '''Counter that changes whenever the evaluated geometry of obj changed'''
+    return _geometry_versions.get(obj, 0)
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    global _check_members, update_count
+
+    update_count += 1
+
+    for update in depsgraph.updates:
+        id_data = update.id.original
+
+        if isinstance(id_data, bpy.types.Object):
+            if update.is_updated_geometry:
+                _geometry_versions[id_data] = \
+                    _geometry_versions.get(id_data, 0) + 1
+            if _graph is not None:
+                _dirty.add(id_data)
+        elif _graph is not None and \
+                isinstance(id_data, (bpy.types.Collection, bpy.types.Scene)):
+            _check_members = True
+
+
+@persistent
+def on_file_change(*args):
+    global file_generation
+
+    # Undo and file loads replace every ID, cached references are stale
+    invalidate_graph()
+    _geometry_versions.clear()
+    file_generation += 1
+
+
+handlers = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update),
+    (bpy.app.handlers.load_post, on_file_change),
+    (bpy.app.handlers.undo_post, on_file_change),
+    (bpy.app.handlers.redo_post, on_file_change),
+)
+
+
+def register():
+    for handler_list, func in handlers:
+        if func not in handler_list:
+            handler_list.append(func)
+
+
+def unregister():
+    for handler_list, func in handlers:
+        if func in handler_list:
+            handler_list.remove(func)
+
+    invalidate_graph()
@@ -0,0 +1,265 @@
+"""Operator and panel instrumentation.
+
+While enabled, poll, invoke and execute of every MTools operator and draw
+of every MTools panel are wrapped to record their wall time, and for
+invoke and execute the number of selected objects, into a fixed-size
+ring buffer and running totals per call. Disabling puts the original
+functions back on the classes, so there is no overhead when it is off.
+The buffer exports to the Chrome trace event format, which
+chrome://tracing and Perfetto open.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import bpy
+from bpy.props import BoolProperty, StringProperty
+from bpy.types import Operator, Panel, WindowManager
+
+from . import utils
+
+BUFFER_SIZE = 20000
+OPERATOR_METHODS = ('poll', 'invoke', 'execute')
+PANEL_METHODS = ('draw',)
+# Would only record themselves redrawing
+EXCLUDE = {'MTOOLS_PT_DevTools'}
+REDRAW_INTERVAL = 1.0
+
+# (name, phase, start ns, duration ns, selected objects or -1, thread id)
+events = deque(maxlen=BUFFER_SIZE)
+# (name, phase) -> [calls, total ns, max ns]
+totals = {}
+# (class, method name) -> the class attribute the wrapper replaced
+_originals = {}
+
+
+def record(name, phase, start, objects=-1):
+    duration = time.perf_counter_ns() - start
+    events.append((name, phase, start, duration, objects, threading.get_ident()))
+
+    stats = totals.get((name, phase))
+    if stats is None:
+        totals[(name, phase)] = [1, duration, duration]
+    else:
+        stats[0] += 1
+        stats[1] += duration
+        if duration > stats[2]:
+            stats[2] = duration
+
+
+def selected_count(context):
+    view_layer = getattr(context, 'view_layer', None)
+    return len(view_layer.objects.selected) if view_layer is not None else -1
+
+
+def wrap_poll(name, poll):
+    @functools.wraps(poll)
+    def wrapper(cls, context):
+        start = time.perf_counter_ns()
+        try:
+            return poll(cls, context)
+        finally:
+            record(name, 'poll', start)
+
+    return classmethod(wrapper)
+
+
+def wrap_method(name, phase, method, count_objects):
+    @functools.wraps(method)
+    def wrapper(self, context, *args):
+        start = time.perf_counter_ns()
+        try:
+            return method(self, context, *args)
+        finally:
+            record(name, phase, start,
+                   selected_count(context) if count_objects else -1)
+
+    return wrapper
+
+
+def addon_classes(base):
+    '''Registered subclasses of base defined in this add-on'''
+    found = []
+    seen = set()
+    stack = list(base.__subclasses__())
+
+    while stack:
+        cls = stack.pop()
+        # Panels also subclass the main panel, reaching them twice
+        if cls in seen:
+            continue
+        seen.add(cls)
+        stack.extend(cls.__subclasses__())
+        if cls.__module__.startswith(__package__ + '.') and cls.__module__ != __name__ \
+                and cls.__name__ not in EXCLUDE and getattr(cls, 'is_registered', False):
+            found.append(cls)
+
+    return found
+
+
+def enable():
+    if _originals:
+        return
+
+    for cls in addon_classes(Operator):
+        for attr in OPERATOR_METHODS:
+            original = cls.__dict__.get(attr)
+            if original is None:
+                continue
+            _originals[(cls, attr)] = original
+            if attr == 'poll':
+                setattr(cls, attr, wrap_poll(cls.bl_idname, original.__func__))
+            else:
+                setattr(cls, attr, wrap_method(cls.bl_idname, attr, original, True))
+
+    for cls in addon_classes(Panel):
+        for attr in PANEL_METHODS:
+            original = cls.__dict__.get(attr)
+            if original is not None:
+                _originals[(cls, attr)] = original
+                setattr(cls, attr, wrap_method(cls.__name__, attr, original, False))
+
+    if not bpy.app.timers.is_registered(redraw):
+        bpy.app.timers.register(redraw, first_interval=REDRAW_INTERVAL)
+
+
+def disable():
+    for (cls, attr), original in _originals.items():
+        setattr(cls, attr, original)
+    _originals.clear()
+
+    if bpy.app.timers.is_registered(redraw):
+        bpy.app.timers.unregister(redraw)
+
+
+def redraw():
+    '''Timer callback keeping the offenders list in the panel live'''
+    if not _originals:
+        return None
+
+    utils.tag_redraw_all()
+    return REDRAW_INTERVAL
+
+
+def reset():
+    events.clear()
+    totals.clear()
+
+
+def top_offenders(count=8):
+    '''(name, phase, calls, total ms, max ms) of the most expensive calls'''
+    rows = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+
+    return [(name, phase, calls, total / 1e6, peak / 1e6)
+            for (name, phase), (calls, total, peak) in rows[:count]]
+
+
+def chrome_trace():
+    '''The buffer as Chrome trace events, complete events in microseconds'''
+    pid = os.getpid()
+    trace = []
+
+    for name, phase, start, duration, objects, tid in events:
+        event = {'name': '%s.%s' % (name, phase), 'cat': phase, 'ph': 'X',
+                 'ts': start / 1000, 'dur': duration / 1000,
+                 'pid': pid, 'tid': tid}
+        if objects >= 0:
+            event['args'] = {'selected_objects': objects}
+        trace.append(event)
+
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def update_enabled(self, context):
+    if self.mtools_instrument:
+        enable()
+    else:
+        disable()
+
+
+class MTools_OT_InstrumentExport(Operator):
+    """Write the recorded calls as a Chrome trace, for chrome://tracing or Perfetto"""
+    bl_label = "Export trace"
+    bl_idname = "mops.instrument_export"
+
+    filepath: StringProperty(subtype='FILE_PATH', default="")
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        return len(events) > 0
+
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = os.path.join(
+                os.path.dirname(bpy.data.filepath) or bpy.app.tempdir, 'mtools_trace.json')
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        path = bpy.path.ensure_ext(bpy.path.abspath(self.filepath), '.json')
+
+        with open(path, 'w') as f:
+            json.dump(chrome_trace(), f)
+
+        self.report({'INFO'}, "Wrote %d events to %s" % (len(events), path))
+        return {'FINISHED'}
+
+
+class MTools_OT_InstrumentReset(Operator):
+    """Forget all recorded calls"""
+    bl_label = "Reset"
+    bl_idname = "mops.instrument_reset"
+
+    def execute(self, context):
+        reset()
+        return {'FINISHED'}
+
+
+def draw_instrumentation(layout, context):
+    col = layout.column(align=True)
+    col.prop(context.window_manager, 'mtools_instrument', toggle=True, icon='TIME')
+    row = col.row(align=True)
+    row.operator('mops.instrument_export', icon='EXPORT')
+    row.operator('mops.instrument_reset', icon='X')
+
+    offenders = top_offenders()
+    if not offenders:
+        return
+
+    box = layout.box()
+    box.label(text="%d calls, %d in buffer" % (
+        sum(stats[0] for stats in totals.values()), len(events)))
+    for name, phase, calls, total, peak in offenders:
+        split = box.split(factor=0.55)
+        split.label(text="%s %s" % (name, phase))
+        split.label(text="%.1f ms / %d, max %.1f" % (total, calls, peak))
+
+
+classes = (
+    MTools_OT_InstrumentExport,
+    MTools_OT_InstrumentReset,
+)
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+    WindowManager.mtools_instrument = BoolProperty(
+        name="Instrument operators",
+        default=False,
+        description="Time every MTools operator and panel call, costs nothing when off",
+        update=update_enabled)
+
+
+def unregister():
+    disable()
+    reset()
+    del WindowManager.mtools_instrument
+
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
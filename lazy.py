@@ -0,0 +1,35 @@
+"""Deferred imports.
+
+A module imported through lazy_import is only executed on its first
+attribute access. Enabling the add-on then only costs the operator and
+panel classes, while NumPy and the operator implementations load the
+first time an operator actually runs.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name, package=None):
+    '''The module name, executed on first attribute access. Relative names
+    need the package, like with importlib.import_module'''
+    name = importlib.util.resolve_name(name, package)
+
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError("No module named %r" % name, name=name)
+
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+
+    # Like a regular import, a submodule is an attribute of its package
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+
+    return module
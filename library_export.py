@@ -0,0 +1,121 @@
+"""Write assets to an external asset library.
+
+Only the given asset IDs and what they reference are written, with
+bpy.data.libraries.write, into one .blend inside the library directory.
+Many assets go out in a single write. A write never replaces a .blend the
+library already has, it takes a numbered name instead. Catalogs the
+assets use are added to the library's catalog file if it lacks them, and
+assets are pointed at the library's own UUID for a catalog path it
+already has.
+"""
+import os
+import tempfile
+import time
+
+import bpy
+
+from . import utils
+from .core import catalogs
+
+
+def asset_catalogs(context, assets):
+    '''(uuid, catalog path, simple name) of the catalogs the assets use'''
+    trie = utils.get_catalog_trie(context)
+    entries = []
+
+    for asset in assets:
+        uuid = asset.asset_data.catalog_id
+        path = trie.path(uuid)
+        if path:
+            node = trie.find(path)
+            entries.append((uuid, path, node.simple_name or path.replace('/', '-')))
+
+    return entries
+
+
+def unique_filepath(libpath, filename):
+    '''libpath/filename.blend, or filename_2.blend and up when that exists'''
+    name = bpy.path.clean_name(filename)
+    filepath = os.path.join(libpath, name + '.blend')
+    number = 1
+
+    while os.path.exists(filepath):
+        number += 1
+        filepath = os.path.join(libpath, '%s_%d.blend' % (name, number))
+
+    return filepath
+
+
+def write_assets(context, assets, libpath, filename, compress=False):
+    '''Write assets and their dependencies to a new .blend in libpath.
+
+    Returns (filepath, bytes, seconds). Earlier exports are kept, the file
+    is named after filename with a number added when that is taken. It is
+    written to a hidden .blend@ file next to its target first, which the
+    asset browser does not index, and moved into place.
+    '''
+    start = time.perf_counter()
+    filepath = unique_filepath(libpath, filename)
+
+    by_path = catalogs.merge_catalog_file(libpath, asset_catalogs(context, assets))
+
+    # Use the library's UUID where it already had the catalog path
+    trie = utils.get_catalog_trie(context)
+    restore = []
+    for asset in assets:
+        uuid = asset.asset_data.catalog_id
+        target = by_path.get(trie.path(uuid))
+        if target and target != uuid:
+            restore.append((asset, uuid))
+            asset.asset_data.catalog_id = target
+
+    fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.blend@', dir=libpath)
+    os.close(fd)
+    try:
+        bpy.data.libraries.write(tmp_path, set(assets), path_remap='RELATIVE_ALL',
+                                 fake_user=True, compress=compress)
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        for asset, uuid in restore:
+            asset.asset_data.catalog_id = uuid
+
+    return filepath, os.path.getsize(filepath), time.perf_counter() - start
+
+
+def full_save_cost():
+    '''(bytes, seconds) of saving the whole file, measured on a temporary copy'''
+    directory = tempfile.mkdtemp(prefix='mtools_fullsave_')
+    path = os.path.join(directory, 'full.blend')
+
+    try:
+        start = time.perf_counter()
+        bpy.ops.wm.save_as_mainfile(filepath=path, copy=True, check_existing=False)
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(directory)
+
+    return size, seconds
+
+
+def export_report(filepath, count, size, seconds, compare=False):
+    '''Report line for an export, optionally against a full save'''
+    text = "Wrote %d assets to %s: %.2f MiB in %.2f s" % (
+        count, os.path.basename(filepath), size / 1024 / 1024, seconds)
+
+    if compare:
+        full_size, full_seconds = full_save_cost()
+        text += " (full save %.2f MiB in %.2f s)" % (
+            full_size / 1024 / 1024, full_seconds)
+
+    return text
+
+
+def check_library_path(path):
+    '''Absolute library directory, or None when it does not exist'''
+    path = bpy.path.abspath(path)
+    return path if os.path.isdir(path) else None
@@ -0,0 +1,94 @@
+"""Scoped localization and orphan purge.
+
+Makes local only the linked IDs reachable from the given ones, instead of
+everything selected, and afterwards removes only the IDs an operation
+left without users. The linked closure comes from a single
+bpy.data.user_map call, which walks every ID of the file once, instead of
+a query per root.
+"""
+import bpy
+
+
+def linked_closure(roots):
+    '''Linked IDs reachable from the linked roots, users before what they use'''
+    roots = [r for r in roots if r.library is not None]
+    if not roots:
+        return []
+
+    # user_map answers who uses an ID, turn it around into what an ID uses.
+    # A linked ID may use IDs of any library, not only of its own
+    subset = [i for library in bpy.data.libraries for i in library.users_id]
+    uses = {}
+    for id_data, users in bpy.data.user_map(subset=subset).items():
+        for user in users:
+            uses.setdefault(user, []).append(id_data)
+
+    # Reverse post order, so every ID comes before the IDs it uses
+    order = []
+    seen = set()
+    for root in roots:
+        if root in seen:
+            continue
+        seen.add(root)
+        stack = [(root, iter(uses.get(root, ())))]
+        while stack:
+            id_data, children = stack[-1]
+            for child in children:
+                if child not in seen and child.library is not None:
+                    seen.add(child)
+                    stack.append((child, iter(uses.get(child, ()))))
+                    break
+            else:
+                stack.pop()
+                order.append(id_data)
+
+    return order[::-1]
+
+
+def collection_ids(collection):
+    '''A local collection and the IDs its content uses directly'''
+    ids = {collection}
+    ids.update(collection.children_recursive)
+
+    for obj in collection.all_objects:
+        ids.add(obj)
+        if obj.data is not None:
+            ids.add(obj.data)
+        for slot in obj.material_slots:
+            if slot.material is not None:
+                ids.add(slot.material)
+        if obj.instance_collection is not None:
+            ids.add(obj.instance_collection)
+
+    return ids
+
+
+def localize(roots):
+    '''Make the linked closure of roots local.
+
+    IDs are made local users first, so each ID.make_local call remaps the
+    already local users onto the local version. Returns {original:
+    local}, where local is the same ID when it was localized in place.
+    '''
+    local = {}
+
+    for id_data in linked_closure(roots):
+        local[id_data] = id_data.make_local()
+
+    return local
+
+
+def purge_orphans(candidates):
+    '''Remove the candidates without users, and the candidates that lose
+    their last user because of it. Returns the number of IDs removed.
+    '''
+    candidates = set(candidates)
+    removed = 0
+
+    while True:
+        dead = {i for i in candidates if i.users == 0}
+        if not dead:
+            return removed
+        candidates -= dead
+        bpy.data.batch_remove(dead)
+        removed += len(dead)
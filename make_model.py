@@ -1,18 +1,25 @@
 # frequently used imports in blender modules, delete what you don't use
 import bpy
-import os
-from pathlib import Path
 from mathutils import Vector
 
-from bpy.types import (
-    BoolProperty,
-    EnumProperty,
-    StringProperty,
-    Operator,
-)
+from bpy.props import BoolProperty, EnumProperty, StringProperty
+from bpy.types import Operator
 
+from . import dependencies
+from . import lazy
+from . import thumbnails
 from . import ui
 from . import utils
+from .core import graph as core_graph
+from .core import polls as core_polls
+
+# Only needed once an operator runs
+bounds = lazy.lazy_import('.bounds', __package__)
+library_export = lazy.lazy_import('.library_export', __package__)
+localize = lazy.lazy_import('.localize', __package__)
+realize = lazy.lazy_import('.realize', __package__)
+transforms = lazy.lazy_import('.transforms', __package__)
+core_bounds = lazy.lazy_import('.core.bounds', __package__)
 
 empty_locs = [
     ('AVG', 'Average', 'Roughly the center of your model'),
@@ -20,9 +27,16 @@ empty_locs = [
     ('WORLDORIGIN', 'World Origin', 'The place where it all began')
 ]
 
+group_modes = [
+    ('ROOT', 'Hierarchy', 'One model per top level parent'),
+    ('COLLECTION', 'Collection', 'One model per collection'),
+]
+
 class MTools_OT_MakeAsset(Operator):
+    """Mark the selected collection instances as assets, optionally writing them to a library"""
     bl_label = "Make asset"
     bl_idname = "mops.make_asset"
+    bl_options = {'REGISTER', 'UNDO'}
 
     catalog: StringProperty(
         name="Collection name",
@@ -33,25 +47,64 @@ class MTools_OT_MakeAsset(Operator):
         default=False,
         description="Rendering a preview"
     )
+    preview_backend: EnumProperty(
+        name="Preview renderer",
+        items=thumbnails.preview_backends,
+        description="How the asset preview is rendered",
+        default='AUTO'
+    )
     save_ext: BoolProperty(
         name="Save external",
         default=False,
-        description="Save the asset to an external .blend library"
+        description=("Save the asset to a new .blend in an external asset library. "
+                     "Existing .blend files are never added to, a taken name gets a number")
     )
     ext_path: StringProperty(
-        name="Collection name",
-        default="Choose a .blend library",
+        name="Library",
+        default="",
+        description="Asset library directory the .blend is written to",
         subtype='DIR_PATH'
     )
+    compare_full_save: BoolProperty(
+        name="Compare with full save",
+        default=False,
+        description="Also time a full save of the file, to report what the partial write saved"
+    )
 
     @classmethod
     def poll(cls, context):
         return context.mode == 'OBJECT' and context.selected_objects
 
+    def draw(self, context):
+        ui.draw_make_asset_panel(self, context, self.layout)
+
     def invoke(self, context, event):
-        return super().invoke(context, event)
+        utils.update_asset_catalogs(self, context)
+        return context.window_manager.invoke_props_dialog(self)
 
     def execute(self, context):
+        assets = [o for o in context.selected_objects if o.asset_data or (
+            o.instance_type == 'COLLECTION' and o.instance_collection)]
+
+        if not assets:
+            self.report({'WARNING'}, "Select assets or collection instances")
+            return {'CANCELLED'}
+
+        # Only registered once invoke filled in the catalogs
+        catalog = getattr(context.window_manager, 'mtools_catalogs', 'NONE')
+
+        for asset in assets:
+            if asset.asset_data is None:
+                asset.asset_mark()
+            assign_catalog(context, asset, catalog)
+            if self.render_preview:
+                thumbnails.render_preview(context, asset, self.preview_backend)
+
+        if self.save_ext:
+            # All of them in one write
+            filename = (bpy.path.display_name_from_filepath(bpy.data.filepath)
+                        or 'assets') + '_assets'
+            save_external(self, context, assets, filename)
 
         return {'FINISHED'}
 
@@ -62,8 +115,7 @@ class MTools_OT_UnpackAsset(Operator):
 
     @classmethod
     def poll(cls, context):
-        active = context.active_object
-        return active and active.type == 'EMPTY' and active.instance_collection and active.instance_type == 'COLLECTION'
+        return core_polls.is_collection_instance(context.active_object)
 
     def invoke(self, context, event):
         self.keep_empty = event.alt
@@ -75,11 +127,21 @@ class MTools_OT_UnpackAsset(Operator):
         instances = {active} | {
             obj for obj in context.selected_objects if obj.type == 'EMPTY' and obj.instance_collection}
 
-        if any((i.instance_collection.library for i in instances)):
-            bpy.ops.object.make_local(type='ALL')
+        # Only what the instanced collections use is made local
+        linked = {i.instance_collection for i in instances
+                  if i.instance_collection.library}
+        local = localize.localize(linked)
+
+        # Everything the unpacking can leave without users, nothing else.
+        # Collections other empties still instance keep their users.
+        graph = dependencies.get_graph(context)
+        candidates = set(local)
+        for collection in {i.instance_collection for i in instances}:
+            if set(graph.instances_of(collection)) <= instances:
+                candidates |= localize.collection_ids(collection)
 
-            for instance in instances:
-                instance.select_set(True)
+        # Shared by all instances, each collection is flattened once
+        self.realizer = realize.InstanceRealizer()
 
         for instance in instances:
             collection = instance.instance_collection
@@ -87,19 +149,26 @@ class MTools_OT_UnpackAsset(Operator):
             root_children = self.assemble_instance_collection(
                 context, instance, collection)
 
-            for child in root_children:
-                utils.parent(child, instance)
+            transforms.parent_objects(
+                root_children, [instance] * len(root_children))
 
-                instance.select_set(True)
-                context.view_layer.objects.active = instance
+            instance.instance_type = 'NONE'
+            instance.instance_collection = None
 
-        bpy.ops.outliner.orphans_purge(
-            do_local_ids=True,
-            do_linked_ids=True,
-            do_recursive=True)
+            instance.select_set(True)
+            context.view_layer.objects.active = instance
+
+        localize.purge_orphans(candidates)
 
         return {'FINISHED'}
 
+    def assemble_instance_collection(self, context, instance, collection):
+        '''Realize the collection next to the instance, returns the top level parts'''
+        target = instance.users_collection[0] if instance.users_collection \
+            else context.collection
+
+        return self.realizer.realize(instance, collection, target)
+
 
 class MTools_OT_MakeModel(Operator):
     bl_label = "Create assembly model"
@@ -147,16 +216,29 @@ class MTools_OT_MakeModel(Operator):
         default=False,
         description="Rendering a preview"
     )
+    preview_backend: EnumProperty(
+        name="Preview renderer",
+        items=thumbnails.preview_backends,
+        description="How the asset preview is rendered",
+        default='AUTO'
+    )
     save_ext: BoolProperty(
         name="Save external",
         default=False,
-        description="Save the asset to an external .blend library"
+        description=("Save the asset to a new .blend in an external asset library. "
+                     "Existing .blend files are never added to, a taken name gets a number")
     )
     ext_path: StringProperty(
-        name="Collection name",
-        default="Choose a .blend library",
+        name="Library",
+        default="",
+        description="Asset library directory the .blend is written to",
         subtype='DIR_PATH'
     )
+    compare_full_save: BoolProperty(
+        name="Compare with full save",
+        default=False,
+        description="Also time a full save of the file, to report what the partial write saved"
+    )
     # mod_size: FloatVectorProperty(
     #     name="Size of complete model",
     #     default=False
@@ -214,7 +296,7 @@ class MTools_OT_MakeModel(Operator):
                 emboss=False)
             if uiprops.show_asset_panel:
                 # self.draw_asset_panel(context, box)
-                ui.draw_make_asset_panel(context, box)
+                ui.draw_make_asset_panel(self, context, box)
 
     def invoke(self, context, event):
         utils.update_asset_catalogs(self, context)
@@ -222,22 +304,11 @@ class MTools_OT_MakeModel(Operator):
 
     def execute(self, context):
         name = self.mod_name.strip()
-        coll = self.col_name()
-        empty_loc = self.empty_loc()
-        ass = self.is_asset()
-        ass_cat = self.catalog()
-        ass_pre = self.render_preview()
-        ass_save = self.save_ext()
-        ass_save_path = self.ext_path()
-        vl = context.view_layer
-        # mod_size = self.mod_size()
-        cat = self.catalog()
 
         if name:
             #### First we assemble the model ###
             # Get all the objects we have to include
-            sel_objs, controller = \
-                self.get_objects_to_assemble(self, context)
+            sel_objs, controller, roots = self.get_objects_to_assemble(context)
             # If nothing is selected, terminate
             if len(sel_objs) == 0:
                 utils.popup_message(
@@ -247,39 +318,29 @@ class MTools_OT_MakeModel(Operator):
                     {'INFO'},
                     "Cancelled operation. No objects were selected")
                 return {'CANCELLED'}
+            coll = get_model_collection(context, self.col_name)
             # Check if there is a parent empty controller, if not: create one
             if not controller:
-                controller = bpy.data.objects.new(
-                    name=self.mod_name, object_data=None)
-                controller.empty_display_type = 'CUBE'
-                controller.empty_display_size = 0.5
-                context.scene.objects.link(controller)
-                controller.show_axis = True
-                controller.show_name = True
-                controller.show_in_front
-                # ... and set als parent to the other objects
-                for o in sel_objs:
-                    o.parent = controller
-                    o.transform_apply(
-                        location=False, rotation=True, scale=True)
+                controller = create_controller(
+                    name, self.get_empty_location(context, sel_objs))
+                coll.objects.link(controller)
+                # ... and set it as parent of the top level parts, shared
+                # targets like cutters stay where they are
+                transforms.parent_objects(
+                    roots, [controller] * len(roots), context.view_layer)
             # Put all objects in chosen collection
-            for o in sel_objs:
-                context.collection[coll].link(o)
+            link_objects(coll, sel_objs)
             # Make asset
             if self.is_asset:
+                # Only registered once invoke filled in the catalogs
+                cat = getattr(context.window_manager, 'mtools_catalogs', 'NONE')
                 asset = self.create_asset(context, name, sel_objs, coll, cat)
             # Render preview thumbnail of the asseet
-            thumbpath = os.path.join(utils.get_path(), 'resources', 'thumb.png')
-            self.render_viewport(context, thumbpath)
-            thumb = bpy.data.images.load(filepath=thumbpath)
-            asset.preview_ensure()
-            asset.preview.image_size = thumb.size
-            # CodeManX is a legend
-            asset.preview.image_pixels_float[:] = thumb.pixels
-
-            bpy.data.images.remove(thumb)
-            bpy.data.images.remove(bpy.data.images['Render Result'])
-            os.unlink(thumbpath)
+            if self.is_asset and self.render_preview:
+                thumbnails.render_preview(context, asset, self.preview_backend)
+            # Write only the asset and what it uses to the library
+            if self.is_asset and self.save_ext:
+                save_external(self, context, [asset], name)
             return {'FINISHED'}
 
         else:
@@ -306,35 +367,11 @@ class MTools_OT_MakeModel(Operator):
 
     def get_objects_to_assemble(self, context):
         '''Function to gather all assembly parts, non selected objects included'''
-        sel = context.selected_objects
-        objects = set()
-
-        for obj in sel:
-            objects.add(obj)
-            # Also add non-selected parent objects
-            if obj.parent and obj.parent not in sel:
-                objects.add(obj.parent)
-                if obj.parent.type == 'EMPTY':
-                    # Identify parented empty as controller
-                    controller = obj
-            # Check if objects have booleans and include
-            booleans = [mod for mod in obj.modifiers if mod.type == 'BOOLEAN']
-
-            for mod in booleans:
-                if mod.object and mod.object not in sel:
-                    objects.add(mod.object)
-
-            mirrors = [mod for mod in obj.modifiers if mod.type == 'MIRROR']
-            # Same for mirror modifiers
-            for mod in mirrors:
-                if mod.mirror_object and mod.mirror_object not in sel:
-                    objects.add(mod.mirror_object)
-        # And also add non selected child objects of included parent
-        for obj in context.visible_objects:
-            if obj not in objects and obj.parent and obj.parent in objects:
-                objects.add(obj)
-
-        return objects, controller
+        # Shared scene cache, only objects changed since the last call are re-read
+        self.dependency_graph = dependencies.get_graph(context)
+
+        return core_graph.objects_to_assemble(
+            self.dependency_graph, context.selected_objects)
 
     def create_asset(self, context, name, objects, collection, catalog):
 
@@ -345,76 +382,213 @@ class MTools_OT_MakeModel(Operator):
         # Copy the model to the new collection,
         for o in objects:
             copy = o.copy()
-            asscoll.link(copy)
-        # Make an instance and add the copied model
+            asscoll.objects.link(copy)
+        # Make an instance of the copied model, the asset mark keeps it
+        # alive without linking it into its own collection
         instance = bpy.data.objects.new(name, object_data=None)
         instance.instance_collection = asscoll
         instance.instance_type = 'COLLECTION'
-        asscoll.objects.link(instance)
         # Mark the instance as asset
         instance.asset_mark()
         # If given, assign the asset to a catalog
-        if catalog != 'NONE':
-            instance.asset_data.catalog_id = self.catalogs[catalog]['uuid']
+        assign_catalog(context, instance, catalog)
 
         collection.children.unlink(asscoll)
 
         return instance
 
-    def render_viewport(self, context, filepath):
+    def get_empty_location(self, context, objects):
+        return get_empty_location(context, objects, self.empty_loc)
+
+
+class MTools_OT_MakeModels(Operator):
+    """Turn every hierarchy or collection in the selection into its own model"""
+    bl_label = "Create assembly models"
+    bl_idname = "mops.make_models"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    group_by: EnumProperty(
+        name="Group by",
+        items=group_modes,
+        description="How the selection is split into models",
+        default='ROOT'
+    )
+    empty_loc: EnumProperty(
+        name="Controller Location",
+        items=empty_locs,
+        description="Location of the empty controllers",
+        default='AVGFLOOR'
+    )
+    col_name: StringProperty(
+        name="Collection name",
+        default="Models"
+    )
 
-        resolution = (
-            context.scene.render.resolution_x,
-            context.scene.render.resolution_y)
-        file_format = context.scene.render.image_settings.file_format
-        lens = context.space_data.lens
-        show_overlays = context.space_data.overlay.show_overlays
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and context.selected_objects
 
-        context.scene.render.resolution_x = 128
-        context.scene.render.resolution_y = 128
-        context.scene.render.image_settings.file_format = 'JPEG'
+    def execute(self, context):
+        timer = utils.Stopwatch()
+
+        graph = dependencies.get_graph(context)
+        groups = self.get_groups(graph, context.selected_objects)
+        timer.lap('gather')
+
+        # Hierarchies that already hang under a controller keep it
+        models = []
+        model_roots = []
+        for name, objects, hierarchy in groups:
+            models.append(
+                (name, objects, graph.find_controller(hierarchy)))
+            model_roots.append(graph.roots(hierarchy))
+
+        locations = [get_empty_location(context, objects, self.empty_loc)
+                     for name, objects, controller in models
+                     if controller is None]
+        timer.lap('locate')
+
+        coll = get_model_collection(context, self.col_name)
+        new_controllers = []
+        locations = iter(locations)
+        for i, (name, objects, controller) in enumerate(models):
+            if controller is None:
+                controller = create_controller(name, next(locations))
+                new_controllers.append(controller)
+                models[i] = (name, objects, controller)
+        link_objects(coll, new_controllers)
+        timer.lap('controllers')
+
+        created = set(new_controllers)
+        children = []
+        parents = []
+        for (name, objects, controller), roots in zip(models, model_roots):
+            if controller in created:
+                children.extend(roots)
+                parents.extend([controller] * len(roots))
+        transforms.parent_objects(children, parents, context.view_layer)
+        timer.lap('parent')
+
+        link_objects(coll, [o for name, objects, controller in models
+                            for o in objects])
+        timer.lap('link')
+
+        count = sum(len(objects) for name, objects, controller in models)
+        print('MTools: made %d models from %d objects in %.1f ms (%s)' % (
+            len(models), count, timer.total * 1000, timer.summary()))
+        self.report({'INFO'}, "Made %d models from %d objects in %.0f ms" % (
+            len(models), count, timer.total * 1000))
 
-        context.space_data.lens = self.thumbnail_lens
+        return {'FINISHED'}
 
-        if show_overlays:
-            context.space_data.overlay.show_overlays = False
+    def get_groups(self, graph, selected):
+        '''Split the selection into (name, objects, hierarchy) groups, each
+        object in one group, hierarchy the objects that are not only targets'''
+        keys = {}
+        seeds = {}
 
-        bpy.ops.render.opengl()
+        for obj in selected:
+            if self.group_by == 'COLLECTION':
+                collection = obj.users_collection[0] if obj.users_collection else None
+                key = collection.name if collection else obj.name
+            else:
+                key = obj
+                while key.parent is not None:
+                    key = key.parent
+                key = keys.setdefault(key, key.name)
+            seeds.setdefault(key, []).append(obj)
 
-        thumb = bpy.data.images.get('Render Result')
+        claimed = set()
+        groups = []
+        for name, objs in seeds.items():
+            closure, hierarchy = graph.parts(objs)
+            objects = [o for o in closure if o not in claimed]
+            hierarchy = [o for o in hierarchy if o not in claimed]
+            claimed.update(objects)
+            if objects:
+                groups.append((name, objects, hierarchy))
 
-        if thumb:
-            thumb.save_render(filepath=filepath)
+        return groups
 
-        context.scene.render.resolution_x = resolution[0]
-        context.scene.render.resolution_y = resolution[1]
-        context.space_data.lens = lens
 
-        context.scene.render.image_settings.file_format = file_format
+def get_empty_location(context, objects, empty_loc):
 
-        if show_overlays and self.toggle_overlays:
-            context.space_data.overlay.show_overlays = True
+    loc = None
 
-    def get_empty_location(self, context, objects):
+    if empty_loc in ['AVG', 'AVGFLOOR']:
+        model_bounds = bounds.object_bounds(objects)
+        # The floor needs the real lowest vertex, bound boxes of rotated
+        # parts reach below it. Only its height, x and y stay with AVG so
+        # dense parts don't pull the controller over.
+        floor_bounds = None
+        if empty_loc == 'AVGFLOOR':
+            floor_bounds = bounds.object_bounds(
+                objects, 'VERTICES', context.evaluated_depsgraph_get())
 
-        rootobjs = [obj for obj in objects if not obj.type == 'EMPTY']
+        loc = core_bounds.empty_location(model_bounds, empty_loc, floor_bounds)
 
-        if self.empty_loc in ['AVG', 'AVGFLOOR']:
-            loc = utils.average_locations(
-                [obj.matrix_world.decompose()[0] for obj in rootobjs])
+    return Vector(loc) if loc is not None else Vector((0, 0, 0))
 
-            if self.empty_loc == 'AVGFLOOR':
-                loc[2] = 0
 
-        else:
-            loc = Vector((0, 0, 0))
+def assign_catalog(context, asset, catalog):
+    if catalog != 'NONE':
+        catalog_id = utils.get_catalog_trie(context).uuid(catalog)
+        if catalog_id:
+            asset.asset_data.catalog_id = catalog_id
+
+
+def save_external(operator, context, assets, filename):
+    '''Write assets to the operator's library directory and report on it'''
+    libpath = library_export.check_library_path(operator.ext_path)
+
+    if libpath is None:
+        operator.report({'WARNING'}, "Choose an existing asset library directory")
+        return False
+
+    filepath, size, seconds = library_export.write_assets(
+        context, assets, libpath, filename)
+    operator.report({'INFO'}, library_export.export_report(
+        filepath, len(assets), size, seconds, operator.compare_full_save))
+
+    return True
+
+
+def create_controller(name, location):
+    controller = bpy.data.objects.new(name=name, object_data=None)
+    controller.empty_display_type = 'CUBE'
+    controller.empty_display_size = 0.5
+    controller.show_axis = True
+    controller.show_name = True
+    controller.show_in_front = True
+    controller.location = location
 
-        return loc    
+    return controller
+
+
+def get_model_collection(context, name):
+    coll = bpy.data.collections.get(name)
+
+    if coll is None:
+        coll = bpy.data.collections.new(name)
+        context.scene.collection.children.link(coll)
+
+    return coll
+
+
+def link_objects(collection, objects):
+    '''Link objects to a collection, skipping the ones already in it'''
+    present = set(collection.objects)
+
+    for o in objects:
+        if o not in present:
+            collection.objects.link(o)
+            present.add(o)
 
 classes = (
     MTools_OT_MakeAsset,
     MTools_OT_UnpackAsset,
     MTools_OT_MakeModel,
+    MTools_OT_MakeModels,
 )
 
 def register():
@@ -424,7 +598,7 @@ def register():
 
 
 def unregister():
-
+    utils.cancel_catalog_scan()
 
     for cls in classes:
         bpy.utils.unregister_class(cls)
\ No newline at end of file
@@ -1,9 +1,11 @@
 import bpy
-from bpy.types import (
-    BoolProperty,
-    EnumProperty,
-    Operator,
-)
+from bpy.props import BoolProperty, EnumProperty
+from bpy.types import Operator
+
+from . import lazy
+from .core import polls as core_polls
+
+mesh_split = lazy.lazy_import('.mesh_split', __package__)
 
 
 class MTools_OT_SeparateSelectObject(Operator):
@@ -44,32 +46,37 @@ class MTools_OT_SeparateSelectObject(Operator):
 
     @classmethod
     def poll(cls, context):
-        obj = context.active_object
-        mesh = obj.data
-        return obj is not None and obj.type in 'MESH' \
-            and any(v.select for v in mesh.vertices)
+        return core_polls.has_selected_vertices(context.active_object, context.mode)
 
     # ? Add functionality to work with curve separation?
     def execute(self, context):
-        start_sel = context.selected_objects
         obj = context.active_object
-        mesh = obj.data
-        mesh.separate(type=self.separate_method)
-        end_sel = context.selected_objects
-        new_objs = [o for o in end_sel if o not in start_sel]
-        if self.make_new_obj_active and new_objs:
-            obj.editmode_toggle()
+        # Every mesh in multi-object edit mode, each mesh only once
+        objects = context.objects_in_mode_unique_data or [obj]
+
+        if self.separate_method in mesh_split.part_labels and \
+                all(mesh_split.can_split(o) for o in objects):
+            new_objs = mesh_split.split_objects(objects, self.separate_method)
+        else:
+            start_sel = set(context.selected_objects)
+            bpy.ops.mesh.separate(type=self.separate_method)
+            new_objs = [o for o in context.selected_objects if o not in start_sel]
+
+        make_active = self.make_new_obj_active and new_objs
+        if make_active:
+            bpy.ops.object.mode_set(mode='OBJECT')
             obj = new_objs[0]
             context.view_layer.objects.active = obj
-            if not self.set_mode_to_object:
-                obj.editmode_toggle()
         # Deselect all other objects but the new created object
-        bpy.ops.object.select_all(action='DESELECT')
+        for o in context.selected_objects:
+            o.select_set(False)
         obj.select_set(True)
+        if make_active and not self.set_mode_to_object:
+            bpy.ops.object.mode_set(mode='EDIT')
 
         self.report(
             {'INFO'},
-            f"Separate {self.separate_method[2]}."
+            f"Separate {self.separate_method.lower()}: {len(new_objs)} new objects."
         )
 
         return {'FINISHED'}
@@ -1,53 +1,249 @@
-# frequently used imports in blender modules, delete what you don't use
+"""Procedural quad meshes built as NumPy arrays.
+
+Grids, tiled floors, stair runs and panel arrays are made of two
+primitives, a subdivided plane and a batch of boxes. Vertices, edges,
+faces and the face to edge table are computed in NumPy and loaded with
+foreach_set, so no Python loop runs per vertex.
+"""
+import time
+from collections import namedtuple
+
 import bpy
-import os
-from pathlib import Path
-
-from bpy.types import (
-    IntProperty,
-    FloatProperty,
-    EnumProperty,
-    StringProperty,
-    Operator,
-    
-)
+from bpy.props import EnumProperty, FloatProperty, IntProperty
+from bpy.types import Operator
+
+from . import lazy
+
+np = lazy.lazy_import('numpy')
+
+# co (n, 3) float32, edges (e, 2), faces (f, 4) vertex indices and
+# face_edges (f, 4) edge indices, the edge from face corner k to k + 1
+MeshData = namedtuple('MeshData', ('co', 'edges', 'faces', 'face_edges'))
+
+generator_shapes = [
+    ('GRID', 'Grid', 'A subdivided plane', 'MESH_GRID', 0),
+    ('FLOOR', 'Tiled floor', 'Separate floor tiles with grout gaps', 'MESH_PLANE', 1),
+    ('STAIRS', 'Stairs', 'A straight run of solid steps', 'SORT_ASC', 2),
+    ('PANELS', 'Panel array', 'Wall panels on the XZ plane', 'SNAP_FACE', 3),
+]
+
+# Unit box corners, corner index = x * 4 + y * 2 + z, faces wound outwards
+# Plain tuples, so importing the module does not load NumPy
+BOX_CORNERS = tuple((x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1))
+BOX_FACES = ((0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1),
+             (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3))
+# Sorted unique face edges, and per face corner k the edge to corner k + 1
+BOX_EDGES = ((0, 1), (0, 2), (0, 4), (1, 3), (1, 5), (2, 3),
+             (2, 6), (3, 7), (4, 5), (4, 6), (5, 7), (6, 7))
+BOX_FACE_EDGES = ((0, 3, 5, 1), (9, 11, 10, 8), (2, 8, 4, 0),
+                  (5, 7, 11, 6), (1, 6, 9, 2), (4, 10, 7, 3))
+
+
+def grid(count_x, count_y, size_x=1.0, size_y=1.0):
+    '''count_x by count_y quads centered on the origin, on the XY plane'''
+    nx, ny = count_x + 1, count_y + 1
+
+    x = np.linspace(-size_x / 2, size_x / 2, nx, dtype=np.float32)
+    y = np.linspace(-size_y / 2, size_y / 2, ny, dtype=np.float32)
+    co = np.zeros((ny, nx, 3), dtype=np.float32)
+    co[..., 0] = x
+    co[..., 1] = y[:, None]
+
+    v = np.arange(nx * ny).reshape(ny, nx)
+    faces = np.stack((v[:-1, :-1], v[:-1, 1:], v[1:, 1:], v[1:, :-1]), axis=-1)
+
+    # Edges along x first, then edges along y
+    along_x = np.stack((v[:, :-1], v[:, 1:]), axis=-1).reshape(-1, 2)
+    along_y = np.stack((v[:-1], v[1:]), axis=-1).reshape(-1, 2)
+    ex = np.arange(len(along_x)).reshape(ny, count_x)
+    ey = np.arange(len(along_y)).reshape(count_y, nx) + len(along_x)
+    face_edges = np.stack((ex[:-1], ey[:, 1:], ex[1:], ey[:, :-1]), axis=-1)
+
+    return MeshData(co.reshape(-1, 3), np.concatenate((along_x, along_y)),
+                    faces.reshape(-1, 4), face_edges.reshape(-1, 4))
+
+
+def boxes(minimum, maximum):
+    '''One closed box per row of the (n, 3) minimum and maximum corners'''
+    minimum = np.asarray(minimum, dtype=np.float32).reshape(-1, 3)
+    maximum = np.asarray(maximum, dtype=np.float32).reshape(-1, 3)
+    n = len(minimum)
+
+    corners = np.array(BOX_CORNERS, dtype=np.float32)
+    co = minimum[:, None] + corners[None] * (maximum - minimum)[:, None]
+    vert_offset = (np.arange(n) * 8)[:, None, None]
+    edge_offset = (np.arange(n) * len(BOX_EDGES))[:, None, None]
+
+    return MeshData(co.reshape(-1, 3),
+                    (np.array(BOX_EDGES)[None] + vert_offset).reshape(-1, 2),
+                    (np.array(BOX_FACES)[None] + vert_offset).reshape(-1, 4),
+                    (np.array(BOX_FACE_EDGES)[None] + edge_offset).reshape(-1, 4))
+
+
+def _cells(count_x, count_y, size_x, size_y, gap):
+    '''Lower left corners of a centered count_x by count_y layout of cells'''
+    i, j = np.meshgrid(np.arange(count_x), np.arange(count_y))
+    x = i.ravel() * (size_x + gap) - (count_x * (size_x + gap) - gap) / 2
+    y = j.ravel() * (size_y + gap) - (count_y * (size_y + gap) - gap) / 2
+
+    return x, y
+
+
+def tiled_floor(count_x, count_y, tile_size=0.5, gap=0.005, thickness=0.01):
+    '''Square tiles with gaps between them, their top at z = 0'''
+    x, y = _cells(count_x, count_y, tile_size, tile_size, gap)
+    minimum = np.stack((x, y, np.full_like(x, -thickness)), axis=-1)
+
+    return boxes(minimum, minimum + (tile_size, tile_size, thickness))
+
 
-class ADDON_OT_SomeOperation(Operator):
-    """Description goes here"""
-    bl_idname = "addon.some_operation"
-    bl_label = "Some Operation"
+def stairs(steps, width=1.0, depth=0.3, height=0.18):
+    '''A straight run of solid steps climbing along +y'''
+    i = np.arange(steps)
+    minimum = np.stack((np.full(steps, -width / 2), i * depth, np.zeros(steps)), axis=-1)
+    maximum = np.stack((np.full(steps, width / 2), (i + 1) * depth, (i + 1) * height),
+                       axis=-1)
+
+    return boxes(minimum, maximum)
+
+
+def panel_array(count_x, count_y, panel_width=0.6, panel_height=1.2,
+                gap=0.01, thickness=0.02):
+    '''Wall panels on the XZ plane, standing on z = 0'''
+    x, z = _cells(count_x, count_y, panel_width, panel_height, gap)
+    z = z - z.min()
+    minimum = np.stack((x, np.zeros_like(x), z), axis=-1)
+
+    return boxes(minimum, minimum + (panel_width, thickness, panel_height))
+
+
+def load_mesh(mesh, data):
+    '''Write MeshData into an empty mesh with foreach_set'''
+    faces = len(data.faces)
+
+    mesh.vertices.add(len(data.co))
+    mesh.edges.add(len(data.edges))
+    mesh.loops.add(faces * 4)
+    mesh.polygons.add(faces)
+
+    mesh.vertices.foreach_set('co', data.co.ravel())
+    mesh.edges.foreach_set('vertices', data.edges.astype(np.int32).ravel())
+    mesh.loops.foreach_set('vertex_index', data.faces.astype(np.int32).ravel())
+    mesh.loops.foreach_set('edge_index', data.face_edges.astype(np.int32).ravel())
+    mesh.polygons.foreach_set('loop_start', np.arange(0, faces * 4, 4, dtype=np.int32))
+    if not bpy.types.MeshPolygon.bl_rna.properties['loop_total'].is_readonly:
+        mesh.polygons.foreach_set('loop_total', np.full(faces, 4, dtype=np.int32))
+
+    mesh.update()
+
+    return mesh
+
+
+def build_shape(shape, count_x, count_y, size, gap, thickness, height):
+    if shape == 'GRID':
+        return grid(count_x, count_y, size * count_x, size * count_y)
+    if shape == 'FLOOR':
+        return tiled_floor(count_x, count_y, size, gap, thickness)
+    if shape == 'STAIRS':
+        return stairs(count_y, size * count_x, size, height)
+    return panel_array(count_x, count_y, size, height, gap, thickness)
+
+
+class MTools_OT_GenerateMesh(Operator):
+    """Generate a grid, tiled floor, stair run or panel array at the 3D cursor"""
+    bl_label = "Generate mesh"
+    bl_idname = "mops.generate_mesh"
     bl_options = {'REGISTER', 'UNDO'}
 
+    shape: EnumProperty(
+        name="Shape",
+        items=generator_shapes,
+        default='GRID'
+    )
+    count_x: IntProperty(
+        name="Count X",
+        default=10,
+        min=1,
+        description="Quads, tiles or panels along x. For stairs, the width in units of Size"
+    )
+    count_y: IntProperty(
+        name="Count Y",
+        default=10,
+        min=1,
+        description="Quads or tiles along y, rows of panels, or the number of steps"
+    )
+    size: FloatProperty(
+        name="Size",
+        default=0.5,
+        min=0.0001,
+        unit='LENGTH',
+        description="Quad, tile or panel width, or step depth"
+    )
+    gap: FloatProperty(
+        name="Gap",
+        default=0.005,
+        min=0.0,
+        unit='LENGTH'
+    )
+    thickness: FloatProperty(
+        name="Thickness",
+        default=0.02,
+        min=0.0001,
+        unit='LENGTH'
+    )
+    height: FloatProperty(
+        name="Height",
+        default=0.18,
+        min=0.0001,
+        unit='LENGTH',
+        description="Step height or panel height"
+    )
+
     @classmethod
-    def poll(cls,context):
-        # Check things first, like:
-        return context.mode == 'OBJECT' and context.selected_objects
+    def poll(cls, context):
+        return context.mode == 'OBJECT'
 
-    def draw(self, context):
-        # If the operator has its own layout
-        self.layout.label(text="Hello")
+    def execute(self, context):
+        start = time.perf_counter()
+        data = build_shape(self.shape, self.count_x, self.count_y, self.size,
+                           self.gap, self.thickness, self.height)
+        built = time.perf_counter()
 
-    def invoke(self, context, event):
-        return context.window_manager.invoke_props_dialog(self)
+        name = self.bl_rna.properties['shape'].enum_items[self.shape].name
+        mesh = load_mesh(bpy.data.meshes.new(name), data)
+        obj = bpy.data.objects.new(name, mesh)
+        obj.location = context.scene.cursor.location
+        context.collection.objects.link(obj)
 
-    def execute(self, context):
-        # do something interesting
+        for o in context.selected_objects:
+            o.select_set(False)
+        obj.select_set(True)
+        context.view_layer.objects.active = obj
+
+        end = time.perf_counter()
+        self.report({'INFO'}, "%s: %d vertices, %d faces, arrays %.1f ms, load %.1f ms" % (
+            name, len(data.co), len(data.faces),
+            (built - start) * 1000, (end - built) * 1000))
 
         return {'FINISHED'}
-    
+
+
+def draw_generator(layout):
+    col = layout.column(align=True)
+    for identifier, name, description, icon, number in generator_shapes:
+        col.operator('mops.generate_mesh', text=name, icon=icon).shape = identifier
+
 
 classes = (
-    ADDON_OT_SomeOperation,
+    MTools_OT_GenerateMesh,
 )
 
+
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
-    
 
 
 def unregister():
-
-
     for cls in classes:
-        bpy.utils.unregister_class(cls)
\ No newline at end of file
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,367 @@
+"""Data oriented mesh splitting.
+
+Reads a mesh once into NumPy arrays with foreach_get, gives every polygon
+a part label and writes each part straight into a new mesh with
+foreach_set. Positions, edges, UVs and other generic attributes,
+material indices, smooth, seam and sharp flags and custom normals are
+kept. Objects in edit mode are synced with update_from_editmode, read
+through a copy of their mesh and their remaining part is put back
+through bmesh, so no mode switch is needed.
+"""
+import bmesh
+import bpy
+import numpy as np
+
+# Attribute data type -> (foreach_get key, components, dtype)
+ATTRIBUTE_LAYOUT = {
+    'FLOAT': ('value', 1, np.float32),
+    'INT': ('value', 1, np.int32),
+    'INT8': ('value', 1, np.int32),
+    'BOOLEAN': ('value', 1, bool),
+    'FLOAT2': ('vector', 2, np.float32),
+    'INT32_2D': ('value', 2, np.int32),
+    'FLOAT_VECTOR': ('vector', 3, np.float32),
+    'FLOAT_COLOR': ('color', 4, np.float32),
+    'BYTE_COLOR': ('color', 4, np.float32),
+    'QUATERNION': ('value', 4, np.float32),
+}
+
+# Copied through the RNA properties below, not as generic attributes
+SKIP_ATTRIBUTES = {'position', 'material_index', 'sharp_face', 'sharp_edge'}
+
+# (domain, collection, property, dtype)
+RNA_PROPERTIES = (
+    ('POINT', 'vertices', 'select', bool),
+    ('EDGE', 'edges', 'select', bool),
+    ('EDGE', 'edges', 'use_seam', bool),
+    ('EDGE', 'edges', 'use_edge_sharp', bool),
+    ('FACE', 'polygons', 'select', bool),
+    ('FACE', 'polygons', 'material_index', np.int32),
+    ('FACE', 'polygons', 'use_smooth', bool),
+)
+
+
+def _get(collection, attr, count, dtype, components=1):
+    values = np.empty(count * components, dtype=dtype)
+    collection.foreach_get(attr, values)
+
+    return values.reshape(-1, components) if components > 1 else values
+
+
+def _poly_loops(loop_start, loop_total, polys):
+    '''Loop indices of the given polygons, in that order'''
+    totals = loop_total[polys]
+    offsets = np.cumsum(totals) - totals
+
+    return np.repeat(loop_start[polys] - offsets, totals) + np.arange(totals.sum())
+
+
+class MeshArrays:
+    '''Everything the splitter needs from a mesh, read once'''
+
+    def __init__(self, mesh):
+        nv, ne = len(mesh.vertices), len(mesh.edges)
+        nl, npoly = len(mesh.loops), len(mesh.polygons)
+
+        self.mesh = mesh
+        self.co = _get(mesh.vertices, 'co', nv, np.float32, 3)
+        self.edge_verts = _get(mesh.edges, 'vertices', ne, np.int32, 2)
+        self.loop_verts = _get(mesh.loops, 'vertex_index', nl, np.int32)
+        self.loop_edges = _get(mesh.loops, 'edge_index', nl, np.int32)
+        self.loop_start = _get(mesh.polygons, 'loop_start', npoly, np.int32)
+        self.loop_total = _get(mesh.polygons, 'loop_total', npoly, np.int32)
+
+        sizes = {'POINT': nv, 'EDGE': ne, 'FACE': npoly, 'CORNER': nl}
+        self.properties = [
+            (domain, collection, prop,
+             _get(getattr(mesh, collection), prop, sizes[domain], dtype))
+            for domain, collection, prop, dtype in RNA_PROPERTIES]
+
+        self.attributes = []
+        for attr in mesh.attributes:
+            layout = ATTRIBUTE_LAYOUT.get(attr.data_type)
+            if layout is None or attr.name.startswith('.') or \
+                    attr.name in SKIP_ATTRIBUTES or attr.domain not in sizes:
+                continue
+            key, components, dtype = layout
+            self.attributes.append((
+                attr.name, attr.domain, attr.data_type, key,
+                _get(attr.data, key, sizes[attr.domain], dtype, components)))
+
+        active_uv = mesh.uv_layers.active
+        self.active_uv = active_uv.name if active_uv else None
+
+        self.normals = None
+        if mesh.has_custom_normals:
+            # Split normals need computing before Blender 4.1
+            if hasattr(mesh, 'calc_normals_split'):
+                mesh.calc_normals_split()
+            self.normals = _get(mesh.loops, 'normal', nl, np.float32, 3)
+
+    @property
+    def vertex_count(self):
+        return len(self.co)
+
+    def values(self, collection, prop):
+        '''The array read for one of the RNA_PROPERTIES'''
+        return next(v for _, c, p, v in self.properties
+                    if c == collection and p == prop)
+
+
+def connected_components(count, edges):
+    '''Label the vertices by connected component, with vectorized union-find.
+
+    Every edge hooks the root of its larger label under the smaller one,
+    then pointer jumping flattens the trees; this repeats until no edge
+    joins two different roots. Returns labels numbered 0..n-1, ordered by
+    the lowest vertex index of each component.
+    '''
+    labels = np.arange(count)
+    a, b = edges[:, 0], edges[:, 1]
+
+    while True:
+        la, lb = labels[a], labels[b]
+        crossing = la != lb
+        if not crossing.any():
+            break
+        la, lb = la[crossing], lb[crossing]
+        low = np.minimum(la, lb)
+        # Duplicate targets keep one of their values, any of them is progress
+        labels[np.maximum(la, lb)] = low
+
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+    return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+
+def loose_part_labels(arrays):
+    '''One part per connected piece, loose vertices and edges included'''
+    vert_labels = connected_components(arrays.vertex_count, arrays.edge_verts)
+    poly_labels = vert_labels[arrays.loop_verts[arrays.loop_start]]
+
+    return poly_labels, vert_labels
+
+
+def material_part_labels(arrays):
+    '''One part per material index in use, loose geometry stays in part 0'''
+    indices = arrays.values('polygons', 'material_index')
+    poly_labels = np.unique(indices, return_inverse=True)[1].reshape(-1)
+
+    return poly_labels, np.zeros(arrays.vertex_count, dtype=np.int64)
+
+
+def selected_part_labels(arrays):
+    '''Unselected geometry is part 0, selected geometry part 1'''
+    poly_labels = arrays.values('polygons', 'select').astype(np.int64)
+    vert_labels = arrays.values('vertices', 'select').astype(np.int64)
+
+    return poly_labels, vert_labels
+
+
+part_labels = {
+    'LOOSE': loose_part_labels,
+    'MATERIAL': material_part_labels,
+    'SELECTED': selected_part_labels,
+}
+
+
+class MeshParts:
+    '''Index arrays that cut MeshArrays into labelled parts.
+
+    poly_labels gives the part of every polygon, -1 drops it. vert_labels
+    optionally gives the part of the vertices and edges not used by any
+    polygon; without it those are dropped. Vertices and edges shared by
+    polygons of several parts are copied into each of them. All index
+    arrays are sorted by part, so filling one part only touches its slice.
+    '''
+
+    def __init__(self, arrays, poly_labels, vert_labels=None):
+        a = self.arrays = arrays
+        nv, ne = arrays.vertex_count, len(a.edge_verts)
+        poly_labels = np.asarray(poly_labels, dtype=np.int64)
+
+        self.count = int(poly_labels.max(initial=-1)) + 1
+        if vert_labels is not None:
+            vert_labels = np.asarray(vert_labels, dtype=np.int64)
+            self.count = max(self.count, int(vert_labels.max(initial=-1)) + 1)
+
+        loop_labels = np.full(len(a.loop_verts), -1, dtype=np.int64)
+        loop_labels[_poly_loops(a.loop_start, a.loop_total,
+                                np.arange(len(poly_labels)))] = \
+            np.repeat(poly_labels, a.loop_total)
+        used = loop_labels >= 0
+
+        vert_keys = [loop_labels[used] * nv + a.loop_verts[used]]
+        edge_keys = [loop_labels[used] * ne + a.loop_edges[used]]
+
+        if vert_labels is not None:
+            # Edges without polygons follow their vertices
+            in_face = np.zeros(ne, dtype=bool)
+            in_face[a.loop_edges] = True
+            v0, v1 = vert_labels[a.edge_verts[:, 0]], vert_labels[a.edge_verts[:, 1]]
+            edges = np.flatnonzero(~in_face & (v0 >= 0) & (v0 == v1))
+            edge_keys.append(v0[edges] * ne + edges)
+            vert_keys.append(v0[edges] * nv + a.edge_verts[edges, 0])
+            vert_keys.append(v0[edges] * nv + a.edge_verts[edges, 1])
+
+            # Vertices of dropped edges count as loose, they are not lost
+            referenced = np.zeros(nv, dtype=bool)
+            referenced[a.loop_verts] = True
+            referenced[a.edge_verts[edges].ravel()] = True
+            loose = np.flatnonzero(~referenced & (vert_labels >= 0))
+            vert_keys.append(vert_labels[loose] * nv + loose)
+
+        parts = np.arange(self.count + 1)
+
+        self.vert_keys = np.unique(np.concatenate(vert_keys))
+        self.vert_src = self.vert_keys % nv
+        self.vert_bounds = np.searchsorted(self.vert_keys // nv, parts)
+
+        edge_keys = np.unique(np.concatenate(edge_keys))
+        edge_part = edge_keys // ne
+        self.edge_src = edge_keys % ne
+        self.edge_bounds = np.searchsorted(edge_part, parts)
+        self.edge_verts = self._local_verts(
+            edge_part[:, None], a.edge_verts[self.edge_src])
+
+        order = np.argsort(poly_labels, kind='stable')
+        self.poly_src = order[poly_labels[order] >= 0]
+        poly_part = poly_labels[self.poly_src]
+        self.poly_bounds = np.searchsorted(poly_part, parts)
+
+        totals = a.loop_total[self.poly_src]
+        ends = np.cumsum(totals)
+        self.loop_src = _poly_loops(a.loop_start, a.loop_total, self.poly_src)
+        self.loop_bounds = np.concatenate(((0,), ends))[self.poly_bounds]
+        self.loop_start = ends - totals - self.loop_bounds[poly_part]
+
+        loop_part = np.repeat(poly_part, totals)
+        self.loop_verts = self._local_verts(loop_part, a.loop_verts[self.loop_src])
+        self.loop_edges = np.searchsorted(
+            edge_keys, loop_part * ne + a.loop_edges[self.loop_src]) - \
+            self.edge_bounds[loop_part]
+
+    def _local_verts(self, part, verts):
+        '''Source vertex indices of the given parts to indices within the part'''
+        keys = part * self.arrays.vertex_count + verts
+        return np.searchsorted(self.vert_keys, keys) - self.vert_bounds[part]
+
+    def fill(self, mesh, part, materials=True):
+        '''Write one part into an empty mesh'''
+        a = self.arrays
+        vs, ve = self.vert_bounds[part:part + 2]
+        es, ee = self.edge_bounds[part:part + 2]
+        ps, pe = self.poly_bounds[part:part + 2]
+        ls, le = self.loop_bounds[part:part + 2]
+        src = {
+            'POINT': self.vert_src[vs:ve],
+            'EDGE': self.edge_src[es:ee],
+            'FACE': self.poly_src[ps:pe],
+            'CORNER': self.loop_src[ls:le],
+        }
+
+        mesh.vertices.add(ve - vs)
+        mesh.edges.add(ee - es)
+        mesh.loops.add(le - ls)
+        mesh.polygons.add(pe - ps)
+
+        mesh.vertices.foreach_set('co', a.co[src['POINT']].ravel())
+        mesh.edges.foreach_set('vertices', self.edge_verts[es:ee].astype(np.int32).ravel())
+        mesh.loops.foreach_set('vertex_index', self.loop_verts[ls:le].astype(np.int32))
+        mesh.loops.foreach_set('edge_index', self.loop_edges[ls:le].astype(np.int32))
+        mesh.polygons.foreach_set('loop_start', self.loop_start[ps:pe].astype(np.int32))
+        if not bpy.types.MeshPolygon.bl_rna.properties['loop_total'].is_readonly:
+            mesh.polygons.foreach_set('loop_total', a.loop_total[src['FACE']])
+
+        for domain, collection, prop, values in a.properties:
+            getattr(mesh, collection).foreach_set(prop, values[src[domain]])
+
+        for name, domain, data_type, key, values in a.attributes:
+            attr = mesh.attributes.get(name) or \
+                mesh.attributes.new(name, data_type, domain)
+            attr.data.foreach_set(key, values[src[domain]].ravel())
+
+        if a.active_uv and a.active_uv in mesh.uv_layers:
+            mesh.uv_layers.active = mesh.uv_layers[a.active_uv]
+
+        if materials:
+            for material in a.mesh.materials:
+                mesh.materials.append(material)
+
+        mesh.update()
+
+        if a.normals is not None:
+            if hasattr(mesh, 'use_auto_smooth'):
+                mesh.use_auto_smooth = True
+            mesh.normals_split_custom_set(a.normals[src['CORNER']])
+
+        return mesh
+
+
+def can_split(obj):
+    '''Shape keys and vertex groups are not carried over, leave those to Blender'''
+    return obj.type == 'MESH' and obj.data.shape_keys is None \
+        and not obj.vertex_groups
+
+
+def replace_geometry(obj, parts, part):
+    '''Make one part the geometry of obj, also while it is in edit mode'''
+    mesh = obj.data
+
+    if obj.mode == 'EDIT':
+        temp = parts.fill(bpy.data.meshes.new(mesh.name), part, materials=False)
+        bm = bmesh.from_edit_mesh(mesh)
+        bm.clear()
+        bm.from_mesh(temp)
+        bmesh.update_edit_mesh(mesh)
+        bpy.data.meshes.remove(temp)
+    else:
+        mesh.clear_geometry()
+        parts.fill(mesh, part, materials=False)
+
+
+def split_object(obj, method):
+    '''Split obj into its parts, obj keeps part 0. Returns the new objects'''
+    mesh = obj.data
+    if obj.mode == 'EDIT':
+        obj.update_from_editmode()
+        # Attributes of a mesh in edit mode are the BMesh layers, which
+        # have no data to foreach_get from Blender 5 on
+        mesh = mesh.copy()
+
+    arrays = MeshArrays(mesh)
+    if mesh is not obj.data:
+        arrays.mesh = obj.data
+        bpy.data.meshes.remove(mesh)
+    parts = MeshParts(arrays, *part_labels[method](arrays))
+
+    if parts.count < 2:
+        return []
+
+    collections = obj.users_collection
+    new_objects = []
+
+    for part in range(1, parts.count):
+        new_obj = obj.copy()
+        new_obj.data = parts.fill(bpy.data.meshes.new(obj.data.name), part)
+        for collection in collections:
+            collection.objects.link(new_obj)
+        new_objects.append(new_obj)
+
+    replace_geometry(obj, parts, 0)
+
+    return new_objects
+
+
+def split_objects(objects, method):
+    '''Split every object, returns all new objects'''
+    new_objects = []
+
+    for obj in objects:
+        new_objects.extend(split_object(obj, method))
+
+    return new_objects
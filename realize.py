@@ -0,0 +1,123 @@
+"""Realization of collection instances.
+
+The instanced collection is flattened once into a template: the objects
+to copy, the index of the realized object each one hangs under and its
+matrix in instance space. Nested instances are flattened the same way,
+once per collection, and composed into their parents with one batched
+matrix product per use. Realizing an instance then copies the template's
+objects, sharing their data, and places them all from one array.
+"""
+from collections import namedtuple
+
+import numpy as np
+from mathutils import Matrix
+
+from . import transforms
+
+# sources: objects to copy, parents: index into sources or -1 for the top
+# level, matrices: (n, 4, 4) in instance space, instancers: nested
+# instance empties, realized as plain empties
+Template = namedtuple('Template', 'sources parents matrices instancers')
+
+
+def is_instancer(obj):
+    return obj.instance_type == 'COLLECTION' and obj.instance_collection is not None
+
+
+class InstanceRealizer:
+    '''Realizes collection instances, flattening each collection once'''
+
+    def __init__(self):
+        self.templates = {}
+        self._visiting = set()
+
+    def template(self, collection):
+        '''The flattened content of a collection, cached'''
+        cached = self.templates.get(collection)
+        if cached is not None:
+            return cached
+
+        self._visiting.add(collection)
+
+        objects = list(collection.all_objects)
+        index = {obj: i for i, obj in enumerate(objects)}
+        parents = np.array([index.get(o.parent, -1) for o in objects], dtype=np.int64)
+        matrices = transforms.read_matrices(collection.all_objects)
+        # Instances show the collection moved by minus its instance offset
+        matrices[:, :3, 3] -= np.array(collection.instance_offset)
+
+        # A collection instancing itself, directly or further down, stops
+        # at the empty that closes the loop
+        nested = [(i, o.instance_collection) for i, o in enumerate(objects)
+                  if is_instancer(o) and o.instance_collection not in self._visiting]
+
+        sources = [objects]
+        parent_parts = [parents]
+        matrix_parts = [matrices]
+        instancers = np.zeros(len(objects), dtype=bool)
+        instancers[[i for i, c in nested]] = True
+        instancer_parts = [instancers]
+        size = len(objects)
+
+        for i, child in nested:
+            sub = self.template(child)
+            sources.append(sub.sources)
+            parent_parts.append(np.where(sub.parents < 0, i, sub.parents + size))
+            matrix_parts.append(matrices[i] @ sub.matrices)
+            instancer_parts.append(sub.instancers)
+            size += len(sub.sources)
+
+        self._visiting.discard(collection)
+
+        template = Template(
+            [obj for part in sources for obj in part],
+            np.concatenate(parent_parts),
+            np.concatenate(matrix_parts),
+            np.concatenate(instancer_parts))
+        self.templates[collection] = template
+
+        return template
+
+    def realize(self, instance, collection, target):
+        '''Copy the content of collection where instance shows it.
+
+        The copies are linked duplicates, linked to target and parented like
+        in the collection, nested instance empties become plain empties over
+        their realized content. Returns the top level copies.
+        '''
+        template = self.template(collection)
+        count = len(template.sources)
+
+        if not count:
+            return []
+
+        world = np.array(instance.matrix_world) @ template.matrices
+        parents = template.parents
+        has_parent = parents >= 0
+
+        # With an identity parent inverse, basis is the parent's world
+        # inverted times the own world
+        basis = world.copy()
+        basis[has_parent] = transforms.inverted_safe(
+            world[parents[has_parent]]) @ world[has_parent]
+
+        copies = [obj.copy() for obj in template.sources]
+        link = target.objects.link
+        identity = Matrix()
+
+        for copy, parent, matrix, instancer in zip(
+                copies, parents, basis, template.instancers):
+            link(copy)
+            copy.parent = copies[parent] if parent >= 0 else None
+            copy.matrix_parent_inverse = identity
+            # Top level parts get their world matrix set, so it can be
+            # read back before the next depsgraph update
+            if parent >= 0:
+                copy.matrix_basis = Matrix(matrix)
+            else:
+                copy.matrix_world = Matrix(matrix)
+            if instancer:
+                copy.instance_type = 'NONE'
+                copy.instance_collection = None
+
+        return [c for c, root in zip(copies, ~has_parent) if root]
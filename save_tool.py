@@ -1,53 +1,300 @@
-# frequently used imports in blender modules, delete what you don't use
-import bpy
+"""Change-aware autosave.
+
+A bpy.app.timers callback writes a numbered copy of the file with
+save_as_mainfile(copy=True), but only when the file is dirty and the
+depsgraph update counter or the undo generation moved since the last
+copy. Old copies are pruned, every save is timed and logged, and the
+measured time and size with and without compression are kept so the
+user can pick the setting that suits the file.
+"""
+import contextlib
 import os
-from pathlib import Path
-
-from bpy.types import (
-    IntProperty,
-    FloatProperty,
-    EnumProperty,
-    StringProperty,
-    Operator,
-    
-)
+import re
+import tempfile
+import time
+from collections import deque
+
+import bpy
+from bpy.props import BoolProperty, IntProperty, PointerProperty, StringProperty
+from bpy.types import Operator, PropertyGroup, WindowManager
+
+from . import dependencies
+
+LOG_FILENAME = 'autosave.log'
+
+# Most recent saves, newest last: (time, path, seconds, bytes, compress)
+save_log = deque(maxlen=20)
+# compress -> (seconds, bytes) of the last save or measurement with it
+compression_stats = {}
+# (file generation, depsgraph update count) at the last save
+_last_saved = None
+
+
+def version_dir(settings):
+    '''Directory of the numbered copies, next to the file unless set'''
+    if settings.directory:
+        return bpy.path.abspath(settings.directory)
+
+    if bpy.data.filepath:
+        return os.path.splitext(bpy.data.filepath)[0] + '_versions'
+
+    return os.path.join(tempfile.gettempdir(), 'mtools_autosave')
+
+
+def file_stem():
+    return bpy.path.display_name_from_filepath(bpy.data.filepath) or 'untitled'
+
+
+def list_versions(directory, stem):
+    '''Sorted (number, path) of the copies of a file'''
+    pattern = re.compile(r'^%s\.(\d+)\.blend$' % re.escape(stem))
+    versions = []
+
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return versions
+
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            versions.append((int(match.group(1)), os.path.join(directory, name)))
+
+    return sorted(versions)
+
+
+def prune_versions(directory, stem, keep):
+    '''Delete all but the newest keep copies, returns the deleted paths'''
+    versions = list_versions(directory, stem)
+    pruned = []
+
+    for number, path in versions[:max(0, len(versions) - keep)]:
+        try:
+            os.remove(path)
+            pruned.append(path)
+        except OSError:
+            pass
+
+    return pruned
+
+
+def needs_save():
+    '''True when there is something new since the last copy.
+
+    is_dirty stays set after a copy save, so the depsgraph update counter
+    and the undo/load generation tell whether anything changed since.
+    '''
+    if not bpy.data.is_dirty:
+        return False
+
+    return _last_saved != (dependencies.file_generation, dependencies.update_count)
+
+
+def _window_override():
+    '''Operators called from a timer need a window in the context'''
+    windows = bpy.context.window_manager.windows
+
+    if not windows:
+        return contextlib.nullcontext()
+
+    return bpy.context.temp_override(window=windows[0])
+
+
+def save_copy(path, compress):
+    '''Write a copy of the open file, returns (seconds, bytes)'''
+    start = time.perf_counter()
+    with _window_override():
+        bpy.ops.wm.save_as_mainfile(filepath=path, copy=True, compress=compress,
+                                    check_existing=False)
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+    compression_stats[compress] = (seconds, size)
+
+    return seconds, size
+
 
-class ADDON_OT_SomeOperation(Operator):
-    """Description goes here"""
-    bl_idname = "addon.some_operation"
-    bl_label = "Some Operation"
-    bl_options = {'REGISTER', 'UNDO'}
+def log_save(directory, path, seconds, size, compress):
+    entry = (time.time(), path, seconds, size, compress)
+    save_log.append(entry)
 
-    @classmethod
-    def poll(cls,context):
-        # Check things first, like:
-        return context.mode == 'OBJECT' and context.selected_objects
+    line = '%s\t%s\t%.3f s\t%d bytes\t%s' % (
+        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry[0])), path,
+        seconds, size, 'compressed' if compress else 'uncompressed')
+    print('MTools autosave: ' + line)
 
-    def draw(self, context):
-        # If the operator has its own layout
-        self.layout.label(text="Hello")
+    try:
+        with open(os.path.join(directory, LOG_FILENAME), 'a') as f:
+            f.write(line + '\n')
+    except OSError:
+        pass
 
-    def invoke(self, context, event):
-        return context.window_manager.invoke_props_dialog(self)
+
+def save_version(settings):
+    '''Write the next numbered copy and prune old ones, returns its path'''
+    global _last_saved
+
+    directory = version_dir(settings)
+    stem = file_stem()
+    os.makedirs(directory, exist_ok=True)
+
+    versions = list_versions(directory, stem)
+    number = versions[-1][0] + 1 if versions else 1
+    path = os.path.join(directory, '%s.%04d.blend' % (stem, number))
+
+    # Taken before saving, changes made while it writes still count
+    state = (dependencies.file_generation, dependencies.update_count)
+    seconds, size = save_copy(path, settings.compress)
+    _last_saved = state
+
+    log_save(directory, path, seconds, size, settings.compress)
+    prune_versions(directory, stem, settings.keep)
+
+    return path
+
+
+def autosave_tick():
+    '''Timer callback, returns the seconds until the next check or None to stop'''
+    settings = bpy.context.window_manager.mtools_autosave
+
+    if not settings.enabled:
+        return None
+
+    rendering = hasattr(bpy.app, 'is_job_running') and bpy.app.is_job_running('RENDER')
+    if needs_save() and not rendering:
+        try:
+            save_version(settings)
+        except (OSError, RuntimeError) as e:
+            print('MTools autosave failed: %s' % e)
+
+    return float(settings.interval)
+
+
+def update_enabled(self, context):
+    registered = bpy.app.timers.is_registered(autosave_tick)
+
+    if self.enabled and not registered:
+        bpy.app.timers.register(autosave_tick, first_interval=self.interval,
+                                persistent=True)
+    elif not self.enabled and registered:
+        bpy.app.timers.unregister(autosave_tick)
+
+
+class MTools_AutosaveSettings(PropertyGroup):
+    enabled: BoolProperty(
+        name="Autosave",
+        default=False,
+        description="Save numbered copies of the file when it changed",
+        update=update_enabled
+    )
+    interval: IntProperty(
+        name="Interval",
+        default=120,
+        min=5,
+        subtype='TIME',
+        description="Seconds between checks for changes"
+    )
+    keep: IntProperty(
+        name="Keep",
+        default=10,
+        min=1,
+        description="Number of copies to keep, older ones are deleted"
+    )
+    compress: BoolProperty(
+        name="Compress",
+        default=False,
+        description="Smaller copies, usually slower to write. Measure to compare"
+    )
+    directory: StringProperty(
+        name="Directory",
+        default="",
+        subtype='DIR_PATH',
+        description="Where to keep the copies, next to the file when empty"
+    )
+
+
+class MTools_OT_AutosaveNow(Operator):
+    """Save a numbered copy of the file now"""
+    bl_label = "Save version"
+    bl_idname = "mops.autosave_now"
 
     def execute(self, context):
-        # do something interesting
+        path = save_version(context.window_manager.mtools_autosave)
+        entry = save_log[-1]
+        self.report({'INFO'}, "Saved %s in %.2f s, %.1f MiB" % (
+            os.path.basename(path), entry[2], entry[3] / 1024 / 1024))
+
+        return {'FINISHED'}
+
+
+class MTools_OT_AutosaveMeasure(Operator):
+    """Save temporary copies with and without compression and compare time and size"""
+    bl_label = "Measure compression"
+    bl_idname = "mops.autosave_measure"
+
+    def execute(self, context):
+        directory = tempfile.mkdtemp(prefix='mtools_measure_')
+
+        try:
+            for compress in (False, True):
+                path = os.path.join(directory, 'measure%d.blend' % compress)
+                save_copy(path, compress)
+                os.remove(path)
+        finally:
+            os.rmdir(directory)
+
+        (t_raw, s_raw), (t_zip, s_zip) = compression_stats[False], compression_stats[True]
+        self.report({'INFO'}, "Uncompressed %.2f s %.1f MiB, compressed %.2f s %.1f MiB" % (
+            t_raw, s_raw / 1024 / 1024, t_zip, s_zip / 1024 / 1024))
 
         return {'FINISHED'}
-    
+
+
+def draw_autosave(layout, context):
+    settings = context.window_manager.mtools_autosave
+
+    col = layout.column(align=True)
+    col.prop(settings, 'enabled', toggle=True, icon='FILE_TICK')
+    col.prop(settings, 'interval')
+    col.prop(settings, 'keep')
+    col.prop(settings, 'directory', text="")
+
+    box = layout.box()
+    box.prop(settings, 'compress')
+    for compress in (False, True):
+        stats = compression_stats.get(compress)
+        if stats is not None:
+            box.label(text="%s: %.2f s, %.1f MiB" % (
+                "Compressed" if compress else "Uncompressed",
+                stats[0], stats[1] / 1024 / 1024))
+    box.operator('mops.autosave_measure', icon='TIME')
+
+    layout.operator('mops.autosave_now', icon='FILE_BLEND')
+    if save_log:
+        stamp, path, seconds, size, compress = save_log[-1]
+        layout.label(text="Last: %s, %s, %.2f s" % (
+            time.strftime('%H:%M:%S', time.localtime(stamp)),
+            os.path.basename(path), seconds))
+
 
 classes = (
-    ADDON_OT_SomeOperation,
+    MTools_AutosaveSettings,
+    MTools_OT_AutosaveNow,
+    MTools_OT_AutosaveMeasure,
 )
 
+
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
-    
+
+    WindowManager.mtools_autosave = PointerProperty(type=MTools_AutosaveSettings)
 
 
 def unregister():
+    if bpy.app.timers.is_registered(autosave_tick):
+        bpy.app.timers.unregister(autosave_tick)
 
+    del WindowManager.mtools_autosave
 
     for cls in classes:
-        bpy.utils.unregister_class(cls)
\ No newline at end of file
+        bpy.utils.unregister_class(cls)
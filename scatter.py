@@ -0,0 +1,304 @@
+"""Mass scattering of collection instances.
+
+Point sets (a grid, random samples on a mesh surface or the vertices of
+a mesh) and the per-instance transforms are computed in NumPy. The
+instances are either one empty per point, created into a fresh
+collection and given their matrices in a single foreach_set, or a single
+point cloud mesh that instances the collection on its vertices.
+"""
+import math
+
+import bpy
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty
+from bpy.types import Operator
+
+from . import lazy
+from . import utils
+from .core import polls as core_polls
+
+np = lazy.lazy_import('numpy')
+transforms = lazy.lazy_import('.transforms', __package__)
+
+scatter_modes = [
+    ('EMPTIES', 'Empties', 'One collection instance empty per point, '
+     'full per-instance transforms and easy to edit by hand'),
+    ('VERTS', 'Vertex instancing', 'One point cloud mesh instancing the collection '
+     'on its vertices, the densest and lightest option. '
+     'Vertex instancing ignores rotation and scale'),
+]
+
+point_sources = [
+    ('GRID', 'Grid', 'A regular grid around the 3D cursor'),
+    ('SURFACE', 'Surface', 'Random points on the faces of the selected mesh'),
+    ('VERTICES', 'Vertices', 'The vertices of the selected mesh'),
+]
+
+
+def grid_points(count_x, count_y, spacing, center=(0, 0, 0)):
+    '''(n, 3) points of a centered grid on the XY plane, normals all +Z'''
+    x = (np.arange(count_x) - (count_x - 1) / 2) * spacing
+    y = (np.arange(count_y) - (count_y - 1) / 2) * spacing
+    points = np.zeros((count_y, count_x, 3))
+    points[..., 0] = x
+    points[..., 1] = y[:, None]
+    points = points.reshape(-1, 3) + np.array(center)
+
+    normals = np.zeros_like(points)
+    normals[:, 2] = 1.0
+
+    return points, normals
+
+
+def _world(mesh_co, normals, matrix):
+    '''Local points and normals to world space'''
+    matrix = np.array(matrix)
+    points = mesh_co @ matrix[:3, :3].T + matrix[:3, 3]
+    normals = normals @ np.linalg.inv(matrix[:3, :3])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+
+    return points, normals
+
+
+def surface_points(obj, count, seed, depsgraph):
+    '''count random points spread evenly over the evaluated faces of obj'''
+    mesh = obj.evaluated_get(depsgraph).data
+    mesh.calc_loop_triangles()
+
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get('vertices', tris)
+
+    corners = co.reshape(-1, 3)[tris.reshape(-1, 3)].astype(np.float64)
+    if not len(corners):
+        return np.zeros((0, 3)), np.zeros((0, 3))
+
+    cross = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = np.linalg.norm(cross, axis=1)
+    if areas.sum() <= 0:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(areas), size=count, p=areas / areas.sum())
+    # Uniform barycentric coordinates
+    r1 = np.sqrt(rng.random(count))
+    r2 = rng.random(count)
+    a, b, c = corners[picked, 0], corners[picked, 1], corners[picked, 2]
+    points = (1 - r1)[:, None] * a + (r1 * (1 - r2))[:, None] * b + (r1 * r2)[:, None] * c
+
+    return _world(points, cross[picked], obj.matrix_world)
+
+
+def vertex_points(obj, depsgraph):
+    '''The evaluated vertices of obj and their normals'''
+    mesh = obj.evaluated_get(depsgraph).data
+
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    normals = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('normal', normals)
+
+    return _world(co.reshape(-1, 3).astype(np.float64),
+                  normals.reshape(-1, 3).astype(np.float64), obj.matrix_world)
+
+
+def align_z(normals):
+    '''(n, 3, 3) rotations taking +Z onto each unit normal'''
+    n = len(normals)
+    x, y, z = normals[:, 0], normals[:, 1], normals[:, 2]
+
+    # Rodrigues around z x normal, with 1 / (1 + cos) folded in
+    k = 1.0 / np.maximum(1.0 + z, 1e-12)
+    rotations = np.empty((n, 3, 3))
+    rotations[:, 0, 0] = 1 - x * x * k
+    rotations[:, 0, 1] = -x * y * k
+    rotations[:, 0, 2] = x
+    rotations[:, 1, 0] = -x * y * k
+    rotations[:, 1, 1] = 1 - y * y * k
+    rotations[:, 1, 2] = y
+    rotations[:, 2, 0] = -x
+    rotations[:, 2, 1] = -y
+    rotations[:, 2, 2] = z
+
+    # Normals pointing straight down, turn half around x instead
+    down = z < -1 + 1e-6
+    rotations[down] = np.diag((1.0, -1.0, -1.0))
+
+    return rotations
+
+
+def instance_matrices(points, normals=None, rotation=math.pi, scale_min=1.0,
+                      scale_max=1.0, seed=0):
+    '''(n, 4, 4) matrices: random turn around the local Z up to +- rotation,
+    random uniform scale, optionally standing on the normals'''
+    n = len(points)
+    rng = np.random.default_rng(seed)
+    angles = rng.uniform(-rotation, rotation, n)
+    scales = rng.uniform(scale_min, scale_max, n)
+
+    cos, sin = np.cos(angles), np.sin(angles)
+    spin = np.zeros((n, 3, 3))
+    spin[:, 0, 0] = cos
+    spin[:, 0, 1] = -sin
+    spin[:, 1, 0] = sin
+    spin[:, 1, 1] = cos
+    spin[:, 2, 2] = 1.0
+
+    if normals is not None:
+        spin = align_z(normals) @ spin
+
+    matrices = np.zeros((n, 4, 4))
+    matrices[:, :3, :3] = spin * scales[:, None, None]
+    matrices[:, :3, 3] = points
+    matrices[:, 3, 3] = 1.0
+
+    return matrices
+
+
+def scatter_empties(collection, target, matrices, name):
+    '''One instance empty per matrix, in a new collection under target'''
+    scatter = bpy.data.collections.new(name)
+    target.children.link(scatter)
+    link = scatter.objects.link
+
+    # A fresh collection makes every link a cheap append
+    for i in range(len(matrices)):
+        obj = bpy.data.objects.new('%s.%06d' % (name, i), None)
+        obj.instance_type = 'COLLECTION'
+        obj.instance_collection = collection
+        link(obj)
+
+    transforms.write_matrices(scatter.objects, matrices)
+
+    return scatter
+
+
+def scatter_verts(collection, target, points, name):
+    '''One point cloud mesh whose vertices instance the collection'''
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(points))
+    mesh.vertices.foreach_set('co', points.astype(np.float32).ravel())
+    mesh.update()
+
+    cloud = bpy.data.objects.new(name, mesh)
+    cloud.instance_type = 'VERTS'
+    target.objects.link(cloud)
+
+    # Vertex instancing repeats the children of the cloud
+    child = bpy.data.objects.new(name + ' instance', None)
+    child.instance_type = 'COLLECTION'
+    child.instance_collection = collection
+    child.parent = cloud
+    target.objects.link(child)
+
+    return cloud
+
+
+class MTools_OT_Scatter(Operator):
+    """Scatter instances of the active collection instance or asset over a grid, a surface or vertices"""
+    bl_label = "Scatter instances"
+    bl_idname = "mops.scatter"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    mode: EnumProperty(
+        name="Mode",
+        items=scatter_modes,
+        default='EMPTIES'
+    )
+    source: EnumProperty(
+        name="Points",
+        items=point_sources,
+        default='GRID'
+    )
+    count: IntProperty(
+        name="Count",
+        default=1000,
+        min=1,
+        description="Number of surface samples"
+    )
+    count_x: IntProperty(name="Count X", default=100, min=1)
+    count_y: IntProperty(name="Count Y", default=100, min=1)
+    spacing: FloatProperty(name="Spacing", default=2.0, min=0.0, unit='LENGTH')
+    rotation: FloatProperty(
+        name="Random rotation",
+        default=math.pi,
+        min=0.0,
+        max=math.pi,
+        subtype='ANGLE'
+    )
+    scale_min: FloatProperty(name="Scale min", default=1.0, min=0.0)
+    scale_max: FloatProperty(name="Scale max", default=1.0, min=0.0)
+    align_to_normal: BoolProperty(
+        name="Align to normal",
+        default=False,
+        description="Stand the instances on the surface or vertex normals"
+    )
+    seed: IntProperty(name="Seed", default=0, min=0)
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and \
+            core_polls.is_collection_instance(context.active_object)
+
+    def execute(self, context):
+        timer = utils.Stopwatch()
+        memory = utils.memory_usage()
+
+        asset = context.active_object
+        collection = asset.instance_collection
+        depsgraph = context.evaluated_depsgraph_get()
+
+        if self.source == 'GRID':
+            points, normals = grid_points(self.count_x, self.count_y, self.spacing,
+                                          context.scene.cursor.location)
+        else:
+            surface = next((o for o in context.selected_objects
+                            if o.type == 'MESH' and o != asset), None)
+            if surface is None:
+                self.report({'WARNING'}, "Select a mesh to scatter on")
+                return {'CANCELLED'}
+            if self.source == 'SURFACE':
+                points, normals = surface_points(surface, self.count, self.seed, depsgraph)
+            else:
+                points, normals = vertex_points(surface, depsgraph)
+
+        name = '%s scatter' % asset.name
+        target = context.collection
+        timer.lap("points")
+
+        if self.mode == 'EMPTIES':
+            matrices = instance_matrices(
+                points, normals if self.align_to_normal else None, self.rotation,
+                self.scale_min, max(self.scale_min, self.scale_max), self.seed)
+            timer.lap("transforms")
+            scatter_empties(collection, target, matrices, name)
+            timer.lap("objects")
+        else:
+            scatter_verts(collection, target, points, name)
+            timer.lap("mesh")
+
+        context.view_layer.update()
+        timer.lap("update")
+
+        used = utils.memory_usage()
+        self.report({'INFO'}, "%d instances (%s) in %.0f ms: %s%s" % (
+            len(points), self.mode.lower(), timer.total * 1000, timer.summary(),
+            ", %+.1f MiB" % ((used - memory) / 1024 / 1024)
+            if memory is not None and used is not None else ""))
+
+        return {'FINISHED'}
+
+
+classes = (
+    MTools_OT_Scatter,
+)
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+
+def unregister():
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
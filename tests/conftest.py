@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The add-on package itself imports bpy, the core is imported on its own
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,72 @@
+import numpy as np
+
+from core import bounds
+from core.standin import Object
+
+
+def test_point_stats():
+    points = np.array([(0.0, 0.0, 0.0), (2.0, 4.0, -2.0)])
+
+    row = bounds.point_stats(points)
+
+    assert row.tolist() == [2.0, 4.0, -2.0, 2.0, 0.0, 0.0, -2.0, 2.0, 4.0, 0.0]
+    assert bounds.point_stats(np.empty((0, 3))) is None
+
+
+def test_corner_stats_matches_point_stats_of_world_points():
+    rng = np.random.default_rng(1)
+    matrices = np.tile(np.identity(4), (3, 1, 1))
+    matrices[:, :3, :3] = rng.normal(size=(3, 3, 3))
+    matrices[:, :3, 3] = rng.normal(size=(3, 3))
+    corners = rng.normal(size=(3, 8, 3))
+
+    rows = bounds.corner_stats(matrices, corners)
+
+    for row, matrix, points in zip(rows, matrices, corners):
+        assert np.allclose(row, bounds.point_stats(bounds.to_world(points, matrix)))
+
+
+def test_combine():
+    rows = np.array([bounds.point_stats(np.array([(0.0, 0.0, 0.0), (2.0, 2.0, 2.0)])),
+                     bounds.point_stats(np.array([(4.0, 0.0, -1.0)]))])
+
+    result = bounds.combine(rows)
+
+    assert np.allclose(result.centroid, (2.0, 2 / 3, 1 / 3))
+    assert result.minimum.tolist() == [0.0, 0.0, -1.0]
+    assert result.maximum.tolist() == [4.0, 2.0, 2.0]
+    assert np.allclose(result.floor, (2.0, 2 / 3, -1.0))
+    assert bounds.combine(np.empty((0, 10))) is None
+
+
+def test_object_bounds_skips_empties():
+    objects = [Object('a'), Object('b', location=(4, 0, 0)),
+               Object('handle', type='EMPTY', location=(100, 100, 100))]
+
+    result = bounds.object_bounds(objects)
+
+    assert result.centroid.tolist() == [2.0, 0.0, 0.0]
+    assert result.minimum.tolist() == [-1.0, -1.0, -1.0]
+    assert result.maximum.tolist() == [5.0, 1.0, 1.0]
+    assert bounds.object_bounds(objects[2:]) is None
+
+
+def test_empty_location():
+    model_bounds = bounds.object_bounds([Object('a'), Object('b', location=(4, 0, 2))])
+    # A lower floor, like from vertices reaching below the bound boxes
+    floor_bounds = bounds.Bounds(np.array((9.0, 9.0, 9.0)), np.array((9.0, 9.0, -3.0)),
+                                 np.array((9.0, 9.0, 9.0)), None)
+
+    assert bounds.empty_location(model_bounds, 'AVG').tolist() == [2.0, 0.0, 1.0]
+    assert bounds.empty_location(model_bounds, 'AVGFLOOR').tolist() == [2.0, 0.0, -1.0]
+    # Only the height comes from the floor bounds
+    assert bounds.empty_location(
+        model_bounds, 'AVGFLOOR', floor_bounds).tolist() == [2.0, 0.0, -3.0]
+    assert bounds.empty_location(model_bounds, 'WORLDORIGIN') is None
+    assert bounds.empty_location(None, 'AVG') is None
+
+
+def test_average_locations():
+    assert bounds.average_locations([]).tolist() == [0.0, 0.0, 0.0]
+    assert bounds.average_locations([(0, 0, 0, 1), (2, 4, 6, 1)]).tolist() == [1.0, 2.0, 3.0]
+    assert bounds.average_locations([(0, 0, 0), (2, 4, 6)], size=2).tolist() == [1.0, 2.0]
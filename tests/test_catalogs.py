@@ -0,0 +1,189 @@
+import os
+import threading
+
+from core import catalogs
+
+
+def write_catalogs(libpath, lines):
+    os.makedirs(libpath, exist_ok=True)
+    with open(os.path.join(libpath, catalogs.CATALOG_FILENAME), 'w') as f:
+        f.write(catalogs.CATALOG_HEADER + ''.join(line + '\n' for line in lines))
+
+
+def test_parse_catalog_file(tmp_path):
+    write_catalogs(tmp_path, ['u1:Props:Props', 'u2:Props/Chairs:Props-Chairs',
+                              'not a catalog line', '#u3:Commented:Out'])
+
+    entries = catalogs.parse_catalog_file(tmp_path / catalogs.CATALOG_FILENAME)
+
+    assert entries == [['u1', 'Props', 'Props'], ['u2', 'Props/Chairs', 'Props-Chairs']]
+
+
+def test_merge_catalog_file_creates_the_file(tmp_path):
+    by_path = catalogs.merge_catalog_file(str(tmp_path), [('u1', 'Props', 'Props')])
+
+    assert by_path == {'Props': 'u1'}
+    assert catalogs.parse_catalog_file(
+        tmp_path / catalogs.CATALOG_FILENAME) == [['u1', 'Props', 'Props']]
+    assert os.listdir(tmp_path) == [catalogs.CATALOG_FILENAME]
+
+
+def test_merge_catalog_file_keeps_existing_paths(tmp_path):
+    write_catalogs(tmp_path, ['lib:Props:Props'])
+
+    by_path = catalogs.merge_catalog_file(
+        str(tmp_path), [('mine', 'Props', 'Props'), ('u2', 'Walls', 'Walls')])
+
+    # The library's own UUID wins for a path it already has
+    assert by_path == {'Props': 'lib', 'Walls': 'u2'}
+    assert catalogs.parse_catalog_file(tmp_path / catalogs.CATALOG_FILENAME) == [
+        ['lib', 'Props', 'Props'], ['u2', 'Walls', 'Walls']]
+
+
+def test_trie():
+    trie = catalogs.CatalogTrie()
+    trie.insert('u1', 'Props/Chairs', 'Props-Chairs', 'lib', '/lib')
+    trie.insert('u2', 'Props/Tables/Round', 'Props-Tables-Round')
+    trie.insert('u3', 'Walls', 'Walls')
+    # Duplicate paths keep the first entry
+    trie.insert('u4', 'Walls', 'Other')
+
+    assert len(trie) == 3
+    assert 'Props/Chairs' in trie
+    # Intermediate components are nodes, but no catalogs
+    assert 'Props' not in trie
+    assert trie.find('Props') is not None
+    assert trie.uuid('Walls') == 'u3'
+    assert trie.uuid('Missing') is None
+    assert trie.path('u2') == 'Props/Tables/Round'
+    assert trie.path('u4') is None
+    assert trie.find('Props/Chairs').libname == 'lib'
+    assert [node.name for node in trie.children()] == ['Props', 'Walls']
+    assert [node.name for node in trie.children('Props')] == ['Chairs', 'Tables']
+    assert [node.path for node in trie.walk('Props')] == ['Props/Chairs', 'Props/Tables/Round']
+    assert [node.uuid for node in trie.walk()] == ['u1', 'u2', 'u3']
+    assert list(trie.walk('Missing')) == []
+
+
+def test_index_rereads_only_changed_libraries(tmp_path):
+    lib1 = str(tmp_path / 'lib1')
+    lib2 = str(tmp_path / 'lib2')
+    write_catalogs(lib1, ['u1:Props:Props'])
+    write_catalogs(lib2, ['u2:Walls:Walls'])
+    libraries = [('one', lib1), ('two', lib2)]
+    index = catalogs.CatalogIndex()
+
+    assert index.update(libraries)
+    assert index.stats() == {'libraries': 2, 'hits': 0, 'misses': 2}
+
+    assert not index.update(libraries)
+    assert index.stats()['hits'] == 2
+
+    # A different size changes the signature whatever the mtime resolution
+    write_catalogs(lib2, ['u2:Walls:Walls', 'u3:Floors:Floors'])
+    assert index.update(libraries)
+    assert index.stats() == {'libraries': 2, 'hits': 3, 'misses': 3}
+    assert sorted(index.catalogs(libraries)) == ['Floors', 'Props', 'Walls']
+
+    # Libraries no longer registered are dropped
+    assert index.update(libraries[:1])
+    assert list(index.libraries) == [lib1]
+
+
+def test_index_catalogs_first_library_wins(tmp_path):
+    lib1 = str(tmp_path / 'lib1')
+    lib2 = str(tmp_path / 'lib2')
+    write_catalogs(lib1, ['u1:Props:Props'])
+    write_catalogs(lib2, ['u2:Props:Props', 'u3:Walls:Walls'])
+    libraries = [('one', lib1), ('two', lib2)]
+
+    all_catalogs = catalogs.library_catalogs(catalogs.CatalogIndex(), libraries)
+
+    assert all_catalogs['Props'] == {'uuid': 'u1', 'simple_name': 'Props',
+                                     'libname': 'one', 'libpath': lib1}
+    assert all_catalogs['Walls']['libname'] == 'two'
+
+
+def test_index_caches_merged_results(tmp_path):
+    lib = str(tmp_path / 'lib')
+    write_catalogs(lib, ['u1:Props:Props'])
+    libraries = [('lib', lib)]
+    index = catalogs.CatalogIndex()
+    index.update(libraries)
+
+    assert index.catalogs(libraries) is index.catalogs(libraries)
+    trie = index.trie(libraries)
+    assert index.trie(libraries) is trie
+    assert trie.uuid('Props') == 'u1'
+
+    write_catalogs(lib, ['u1:Props:Props', 'u2:Walls:Walls'])
+    index.update(libraries)
+    assert index.trie(libraries) is not trie
+    assert 'Walls' in index.catalogs(libraries)
+
+
+def test_index_cache_on_disk(tmp_path):
+    lib = str(tmp_path / 'lib')
+    cache_dir = str(tmp_path / 'cache')
+    os.makedirs(cache_dir)
+    write_catalogs(lib, ['u1:Props:Props'])
+    libraries = [('lib', lib)]
+
+    catalogs.CatalogIndex(cache_dir).update(libraries)
+    index = catalogs.CatalogIndex(cache_dir)
+
+    assert not index.update(libraries)
+    assert index.stats() == {'libraries': 1, 'hits': 1, 'misses': 0}
+    assert list(index.catalogs(libraries)) == ['Props']
+
+
+def test_index_ignores_other_versions(tmp_path):
+    cache_dir = str(tmp_path)
+    with open(os.path.join(cache_dir, catalogs.INDEX_FILENAME), 'w') as f:
+        f.write('{"version": 0, "libraries": {"/lib": {}}}')
+
+    index = catalogs.CatalogIndex(cache_dir)
+    index.load()
+
+    assert index.libraries == {}
+
+
+def test_scan(tmp_path):
+    lib = str(tmp_path / 'lib')
+    write_catalogs(lib, ['u1:Props:Props'])
+    libraries = [('lib', lib), ('missing', str(tmp_path / 'missing'))]
+    scan = catalogs.CatalogScan(catalogs.CatalogIndex(), libraries)
+
+    scan.start()
+    while not scan.done:
+        scan.poll()
+
+    assert sorted(scan.finished) == sorted(path for name, path in libraries)
+    assert list(scan.index.catalogs(libraries)) == ['Props']
+
+
+def test_scan_times_out_on_daemon_threads(tmp_path, monkeypatch):
+    release = threading.Event()
+    workers = []
+
+    def hanging_read(libpath, known_signature=catalogs.UNKNOWN):
+        workers.append(threading.current_thread())
+        release.wait(5)
+        return None, []
+
+    monkeypatch.setattr(catalogs, 'read_library', hanging_read)
+    libpath = str(tmp_path)
+    scan = catalogs.CatalogScan(catalogs.CatalogIndex(), [('hung', libpath)], timeout=0)
+
+    try:
+        scan.start()
+        while not workers:
+            pass
+        scan.poll()
+
+        assert scan.done
+        assert scan.timed_out == [libpath]
+        # A hung mount must not keep the interpreter from exiting
+        assert workers[0].daemon
+    finally:
+        release.set()
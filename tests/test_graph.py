@@ -0,0 +1,217 @@
+from types import SimpleNamespace
+
+from core import graph, standin
+from core.standin import Collection, Constraint, Modifier, Object
+
+
+def names(objects):
+    return sorted(obj.name for obj in objects)
+
+
+def make_models():
+    '''Model "a" with a boolean cutter from a shared cutter empty and a
+    shrinkwrap onto the ground, whose parent has an unrelated child'''
+    root = Object('root', type='EMPTY')
+    a1 = Object('a1', parent=root)
+    a2 = Object('a2', parent=root)
+    cutters = Object('Cutters', type='EMPTY')
+    c = Object('c', parent=cutters)
+    c2 = Object('c2', parent=cutters)
+    ground_root = Object('groundRoot', type='EMPTY')
+    ground = Object('ground', parent=ground_root)
+    unrelated = Object('unrelated', parent=ground_root)
+    a1.modifiers.append(Modifier('BOOLEAN', object=c))
+    a2.modifiers.append(Modifier('SHRINKWRAP', target=ground))
+
+    objects = [root, a1, a2, cutters, c, c2, ground_root, ground, unrelated]
+    return {obj.name: obj for obj in objects}, graph.DependencyGraph(objects)
+
+
+def test_closure_takes_the_whole_selected_hierarchy():
+    objs, dependency_graph = make_models()
+
+    closure = dependency_graph.closure([objs['a1']])
+
+    assert {'root', 'a1', 'a2'} <= set(names(closure))
+    assert closure[0] is objs['a1']
+
+
+def test_closure_takes_targets_with_their_parents_but_not_their_children():
+    objs, dependency_graph = make_models()
+
+    closure = dependency_graph.closure([objs['a1']])
+
+    assert names(closure) == ['Cutters', 'a1', 'a2', 'c', 'ground', 'groundRoot', 'root']
+
+
+def test_closure_upgrades_a_dependency_reached_through_a_hierarchy():
+    objs, dependency_graph = make_models()
+
+    # c2 is selected itself, so the whole cutter hierarchy comes along
+    closure = dependency_graph.closure([objs['a1'], objs['c2']])
+
+    assert {'Cutters', 'c', 'c2'} <= set(names(closure))
+    assert 'unrelated' not in names(closure)
+
+
+def test_closure_without_children():
+    objs, dependency_graph = make_models()
+
+    closure = dependency_graph.closure([objs['a1']], children=False)
+
+    assert names(closure) == ['Cutters', 'a1', 'c', 'root']
+
+
+def test_closure_follows_targets_of_targets():
+    a = Object('a')
+    b = Object('b')
+    c = Object('c')
+    a.constraints.append(Constraint('COPY_LOCATION', target=b))
+    b.modifiers.append(Modifier('MIRROR', mirror_object=c))
+
+    dependency_graph = graph.DependencyGraph([a, b, c])
+
+    assert names(dependency_graph.closure([a])) == ['a', 'b', 'c']
+    assert names(dependency_graph.closure([c])) == ['c']
+
+
+def test_closure_survives_cycles():
+    objects = [Object('part%d' % i) for i in range(5)]
+    for i, obj in enumerate(objects):
+        obj.modifiers.append(Modifier('BOOLEAN', object=objects[(i + 1) % 5]))
+        obj.modifiers.append(Modifier('MIRROR', mirror_object=objects[i - 1]))
+
+    dependency_graph = graph.DependencyGraph(objects)
+
+    assert len(dependency_graph.closure(objects[:1])) == 5
+
+
+def test_targets_from_collections_nodes_drivers_and_armatures():
+    cutter = Object('cutter')
+    node_input = Object('node_input')
+    driver = Object('driver')
+    data_driver = Object('data_driver')
+    bone = Object('bone', type='ARMATURE')
+    obj = Object('obj', data=SimpleNamespace(animation_data=None))
+
+    obj.modifiers.append(Modifier('BOOLEAN', collection=Collection('cuts', [cutter])))
+    obj.modifiers.append(Modifier('NODES', inputs={'Socket_1': node_input, 'Socket_2': 1.0}))
+    obj.constraints.append(Constraint('ARMATURE', targets=[bone]))
+    standin.add_driver(obj, driver)
+    standin.add_driver(obj.data, data_driver)
+
+    dependency_graph = graph.DependencyGraph([obj])
+
+    assert names(dependency_graph.dependencies(obj)) == [
+        'bone', 'cutter', 'data_driver', 'driver', 'node_input']
+
+
+def test_targets_outside_the_object_list_are_indexed():
+    outside = Object('outside')
+    obj = Object('obj')
+    obj.modifiers.append(Modifier('CURVE', object=outside))
+
+    dependency_graph = graph.DependencyGraph([obj])
+
+    assert outside in dependency_graph
+    assert dependency_graph.members == {dependency_graph.index[obj]}
+    assert names(dependency_graph.closure([obj])) == ['obj', 'outside']
+
+
+def test_relink_and_remove():
+    a = Object('a')
+    b = Object('b')
+    c = Object('c')
+    modifier = Modifier('BOOLEAN', object=b)
+    a.modifiers.append(modifier)
+    dependency_graph = graph.DependencyGraph([a, b, c])
+
+    modifier.object = c
+    dependency_graph.relink(a)
+    assert dependency_graph.dependencies(a) == [c]
+
+    dependency_graph.remove(c)
+    assert c not in dependency_graph
+    assert dependency_graph.dependencies(a) == []
+    assert len(dependency_graph) == 2
+
+
+def test_relink_as_non_member():
+    a = Object('a')
+    part = Object('part')
+    dependency_graph = graph.DependencyGraph([a])
+
+    dependency_graph.relink(part, member=False)
+
+    assert part in dependency_graph
+    assert dependency_graph.index[part] not in dependency_graph.members
+
+
+def test_instances_of():
+    collection = Collection('asset')
+    instance = Object('instance', type='EMPTY')
+    instance.instance_type = 'COLLECTION'
+    instance.instance_collection = collection
+    dependency_graph = graph.DependencyGraph([instance])
+
+    assert dependency_graph.instances_of(collection) == [instance]
+
+    instance.instance_type = 'NONE'
+    dependency_graph.relink(instance)
+    assert dependency_graph.instances_of(collection) == []
+
+
+def test_roots_and_find_controller():
+    objs, dependency_graph = make_models()
+    model = [objs['root'], objs['a1'], objs['a2']]
+
+    assert dependency_graph.roots(model) == [objs['root']]
+    assert dependency_graph.find_controller(model) is objs['root']
+    # Two candidate empties, neither is the controller
+    assert dependency_graph.find_controller(model + [objs['Cutters'], objs['c']]) is None
+    # A mesh at the top is not a controller
+    assert dependency_graph.find_controller([objs['a1']]) is None
+
+
+def test_parts_split_hierarchy_from_targets():
+    objs, dependency_graph = make_models()
+
+    closure, hierarchy = dependency_graph.parts([objs['a1']])
+
+    assert closure == dependency_graph.closure([objs['a1']])
+    assert names(hierarchy) == ['a1', 'a2', 'root']
+
+
+def test_objects_to_assemble():
+    objs, dependency_graph = make_models()
+
+    objects, controller, roots = graph.objects_to_assemble(dependency_graph, [objs['a2']])
+
+    assert isinstance(objects, set)
+    assert names(objects) == ['Cutters', 'a1', 'a2', 'c', 'ground', 'groundRoot', 'root']
+    # Cutters and groundRoot are only there for their targets
+    assert controller is objs['root']
+    assert roots == [objs['root']]
+
+    objects, controller, roots = graph.objects_to_assemble(
+        dependency_graph, [objs['unrelated']])
+    assert names(objects) == ['ground', 'groundRoot', 'unrelated']
+    assert controller is objs['groundRoot']
+
+
+def test_shared_cutter_parent_is_not_a_root():
+    # A model without controller, its parts cut by a shared cutter empty
+    cutters = Object('Cutters', type='EMPTY')
+    cutter = Object('cutter', parent=cutters)
+    part = Object('part')
+    other = Object('other')
+    for obj in (part, other):
+        obj.modifiers.append(Modifier('BOOLEAN', object=cutter))
+    dependency_graph = graph.DependencyGraph([cutters, cutter, part, other])
+
+    objects, controller, roots = graph.objects_to_assemble(dependency_graph, [part])
+
+    assert names(objects) == ['Cutters', 'cutter', 'part']
+    assert controller is None
+    # Only the part goes under the new controller, the cutters stay shared
+    assert roots == [part]
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from core import polls
+from core.standin import Collection, Object
+
+
+class Vertices:
+    '''Mesh vertices that count every access to their elements'''
+
+    def __init__(self, count):
+        self.count = count
+        self.reads = 0
+
+    def __len__(self):
+        self.reads += 1
+        return self.count
+
+    def __iter__(self):
+        for i in range(self.count):
+            self.reads += 1
+            yield SimpleNamespace(select=True)
+
+    def __getitem__(self, i):
+        self.reads += 1
+        return SimpleNamespace(select=True)
+
+
+def edit_mesh(count, selected):
+    vertices = Vertices(count)
+    obj = Object('mesh', data=SimpleNamespace(vertices=vertices, total_vert_sel=selected))
+    return obj, vertices
+
+
+def test_has_selected_vertices_never_reads_vertices():
+    # The cost stays the same from a handful to millions of vertices
+    for count in (8, 2000000):
+        obj, vertices = edit_mesh(count, selected=count // 2)
+
+        assert polls.has_selected_vertices(obj, 'EDIT_MESH')
+        assert vertices.reads == 0
+
+
+def test_has_selected_vertices():
+    obj = edit_mesh(8, selected=0)[0]
+
+    assert not polls.has_selected_vertices(obj, 'EDIT_MESH')
+    assert not polls.has_selected_vertices(edit_mesh(8, 3)[0], 'OBJECT')
+    assert not polls.has_selected_vertices(None, 'EDIT_MESH')
+    assert not polls.has_selected_vertices(Object('mesh'), 'EDIT_MESH')
+    assert not polls.has_selected_vertices(Object('empty', type='EMPTY'), 'EDIT_MESH')
+
+
+def test_is_collection_instance():
+    instance = Object('instance', type='EMPTY')
+    assert not polls.is_collection_instance(instance)
+
+    instance.instance_type = 'COLLECTION'
+    assert not polls.is_collection_instance(instance)
+
+    instance.instance_collection = Collection('asset')
+    assert polls.is_collection_instance(instance)
+    assert not polls.is_collection_instance(None)
@@ -0,0 +1,44 @@
+from core import undo
+
+HISTORY = """Undo 4 Steps (*: active, #=applied, M=memfile-active, S=skip):
+[ #M ]   0 {0x55d1e0} type='Global Undo', name='Original'
+[  M ]   1 {0x55d1e8} type='Global Undo', name='Move'
+[  MS]   2 {0x55d1f0} type='Global Undo', name='Select'
+[*#M ]   3 {0x55d1f8} type='Global Undo', name='Rotate'
+"""
+
+
+def test_parse_undo_steps():
+    assert undo.parse_undo_steps(HISTORY) == (3, [False, False, True, False])
+
+
+def test_parse_undo_steps_ignores_whole_foreign_lines():
+    # Another thread printing between two steps
+    text = HISTORY.replace('[  M ]   1', 'Catalogs: 3 libraries read\n[  M ]   1')
+
+    assert undo.parse_undo_steps(text) == (3, [False, False, True, False])
+
+
+def test_parse_undo_steps_rejects_what_does_not_add_up():
+    lines = HISTORY.splitlines()
+
+    # Output cut into by another thread
+    assert undo.parse_undo_steps(HISTORY.replace("name='Move'", "nam")) is None
+    assert undo.parse_undo_steps(HISTORY.replace('Undo 4', 'Undo 5')) is None
+    assert undo.parse_undo_steps('\n'.join(lines[1:])) is None
+    assert undo.parse_undo_steps(HISTORY + HISTORY) is None
+    assert undo.parse_undo_steps(HISTORY.replace('[ #M ]', '[*#M ]')) is None
+    assert undo.parse_undo_steps(HISTORY.replace('[*#M ]', '[ #M ]')) is None
+    assert undo.parse_undo_steps('') is None
+
+
+def test_history_target_skips_and_clamps():
+    active, skips = undo.parse_undo_steps(HISTORY)
+
+    # Step 2 is flagged to be skipped
+    assert undo.history_target(active, skips, -1) == 1
+    assert undo.history_target(active, skips, -2) == 0
+    assert undo.history_target(active, skips, -10) == 0
+    assert undo.history_target(0, skips, 1) == 1
+    assert undo.history_target(1, skips, 1) == 3
+    assert undo.history_target(active, skips, 5) == 3
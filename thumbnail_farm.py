@@ -0,0 +1,428 @@
+"""Headless thumbnail farm for existing assets.
+
+Splits the assets of the current file across a pool of ``blender -b``
+worker processes that render on the CPU with thumbnails.render_cpu. The
+workers stream their pixel buffers back over stdout, one marker line per
+asset, and the farm writes them into the asset previews of the source
+file. Every result is also kept in a journal next to the .blend, so a
+crashed run picks up where it stopped. Journal entries belong to a run
+key, the saved file and the render settings. The previews of a finished
+run only live in memory until the file is saved, so its journal is
+deleted from a save_post handler, after which a later run always renders
+again. Loading another file first keeps the journal.
+"""
+import base64
+import hashlib
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import bpy
+from bpy.app.handlers import persistent
+from bpy.props import BoolProperty, IntProperty
+from bpy.types import Operator
+
+from . import lazy
+from . import thumbnails
+
+np = lazy.lazy_import('numpy')
+
+FRAME_MARKER = 'MTOOLS_THUMB '
+JOURNAL_FILENAME = 'journal.jsonl'
+
+# blend path -> journal of a finished run whose previews are not saved yet
+_unsaved_journals = {}
+
+
+def find_assets(only_missing=True):
+    '''Names of the asset objects of the file, optionally only those without preview'''
+    names = []
+
+    for obj in bpy.data.objects:
+        if obj.asset_data is None or obj.library is not None:
+            continue
+        if only_missing and obj.preview is not None and \
+                obj.preview.image_size[0] > 0:
+            continue
+        names.append(obj.name)
+
+    return names
+
+
+def journal_dir(blend_path):
+    return os.path.splitext(blend_path)[0] + '_mtools_thumbs'
+
+
+def run_key(blend_path, size, samples):
+    '''What a run renders from, the file as saved and the render settings'''
+    st = os.stat(blend_path)
+    return '%d:%d:%d:%d' % (st.st_mtime_ns, st.st_size, size, samples)
+
+
+class Journal:
+    '''Finished assets of a farm run, one JSON line and one pixel file each.
+
+    Only entries written under the same run key count, results of a run on
+    an older save of the file or with other settings are ignored.
+    '''
+
+    def __init__(self, directory, run):
+        self.directory = directory
+        self.run = run
+        self.path = os.path.join(directory, JOURNAL_FILENAME)
+        os.makedirs(directory, exist_ok=True)
+
+    def entries(self):
+        entries = {}
+
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The last line of a crashed run may be cut short
+                        continue
+                    if entry.get('run') == self.run:
+                        entries[entry['name']] = entry
+        except OSError:
+            pass
+
+        return entries
+
+    def pixels(self, entry):
+        try:
+            return np.fromfile(os.path.join(self.directory, entry['file']),
+                               dtype=np.float32)
+        except OSError:
+            return None
+
+    def add(self, name, size, seconds, pixels):
+        filename = hashlib.sha1(
+            (self.run + name).encode('utf-8')).hexdigest()[:16] + '.f32'
+        pixels.tofile(os.path.join(self.directory, filename))
+
+        entry = {'run': self.run, 'name': name, 'size': size,
+                 'seconds': seconds, 'file': filename}
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        return entry
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _read_worker(process, results):
+    '''Reader thread, turns a worker's marker lines into result dicts'''
+    for raw in process.stdout:
+        line = raw.decode('utf-8', 'replace')
+        if not line.startswith(FRAME_MARKER):
+            continue
+        try:
+            header, payload = line[len(FRAME_MARKER):].rstrip('\n').split(' ', 1)
+            result = json.loads(header)
+            if payload != '-':
+                result['pixels'] = np.frombuffer(
+                    base64.b64decode(payload), dtype=np.float32)
+        except ValueError:
+            continue
+        results.put(result)
+
+    process.wait()
+    results.put({'exit': process.returncode})
+
+
+class ThumbnailFarm:
+    '''Drive a pool of worker processes and collect their previews'''
+
+    def __init__(self, names, blend_path, workers=4, size=thumbnails.PREVIEW_SIZE,
+                 samples=8):
+        self.blend_path = blend_path
+        self.size = size
+        self.samples = samples
+        self.journal = Journal(journal_dir(blend_path),
+                               run_key(blend_path, size, samples))
+        self.names = list(names)
+        self.workers = max(1, min(workers, len(self.names)))
+        self.results = queue.Queue()
+        self.processes = []
+        self.done = 0
+        self.failed = []
+        self.timings = {}
+        self.running = 0
+        self.started = None
+
+    @property
+    def total(self):
+        return len(self.names)
+
+    def resume(self):
+        '''Apply journaled results of an earlier run, return the names still to do'''
+        entries = self.journal.entries()
+        todo = []
+
+        for name in self.names:
+            entry = entries.get(name)
+            pixels = self.journal.pixels(entry) \
+                if entry and entry['size'] == self.size else None
+            if pixels is not None and len(pixels) == self.size * self.size * 4:
+                self.apply(name, pixels)
+                self.timings[name] = entry['seconds']
+                self.done += 1
+            else:
+                todo.append(name)
+
+        return todo
+
+    def start(self):
+        self.started = time.perf_counter()
+        todo = self.resume()
+
+        if not todo:
+            return
+
+        addon_dir = os.path.dirname(os.path.abspath(__file__))
+        expr = ('import sys; sys.path.insert(0, %r); '
+                'import %s.thumbnail_farm as farm; farm.worker_main()') % (
+                    os.path.dirname(addon_dir), os.path.basename(addon_dir))
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        for i in range(min(self.workers, len(todo))):
+            chunk = todo[i::self.workers]
+            args = [bpy.app.binary_path, '-b', '--factory-startup',
+                    self.blend_path, '--threads', str(threads),
+                    '--python-expr', expr, '--',
+                    '--size', str(self.size), '--samples', str(self.samples),
+                    '--names', json.dumps(chunk)]
+            process = subprocess.Popen(
+                args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            threading.Thread(target=_read_worker, args=(process, self.results),
+                             daemon=True).start()
+            self.processes.append(process)
+            self.running += 1
+
+    def apply(self, name, pixels):
+        obj = bpy.data.objects.get(name)
+        if obj is not None:
+            thumbnails.set_preview(obj, pixels, self.size)
+
+    def poll(self):
+        '''Apply finished assets, must run on the main thread. Returns True while busy'''
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if 'exit' in result:
+                self.running -= 1
+                continue
+
+            name = result['name']
+            pixels = result.get('pixels')
+            if result.get('error') or pixels is None or \
+                    len(pixels) != self.size * self.size * 4:
+                self.failed.append(name)
+                print('MTools: thumbnail of %s failed: %s' % (
+                    name, result.get('error', 'bad pixel data')))
+                continue
+
+            self.journal.add(name, self.size, result['seconds'], pixels)
+            self.apply(name, pixels)
+            self.timings[name] = result['seconds']
+            self.done += 1
+            print('MTools: thumbnail %d/%d %s in %.2f s' % (
+                self.done, self.total, name, result['seconds']))
+
+        return self.running > 0
+
+    def cancel(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+
+    def finish(self):
+        '''Drop the journal of a run that went through once its file is
+        saved, until then the previews only exist in memory'''
+        _unsaved_journals[self.blend_path] = self.journal
+
+    def run(self):
+        '''Blocking run, for use from a script in background mode. Call
+        finish() and save the file afterwards'''
+        self.start()
+        while self.poll():
+            time.sleep(0.1)
+        self.poll()
+
+        return self.summary()
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return '%d/%d previews, %d failed, %.1f s total, %.2f s per asset' % (
+            self.done, self.total, len(self.failed), elapsed,
+            sum(self.timings.values()) / max(1, len(self.timings)))
+
+
+def worker_main():
+    '''Entry point of a worker process, renders the assets named on the command line'''
+    import argparse
+
+    argv = sys.argv[sys.argv.index('--') + 1:]
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=thumbnails.PREVIEW_SIZE)
+    parser.add_argument('--samples', type=int, default=8)
+    parser.add_argument('--names', required=True)
+    args = parser.parse_args(argv)
+
+    out = sys.stdout
+    for name in json.loads(args.names):
+        start = time.perf_counter()
+        header = {'name': name}
+        payload = '-'
+        try:
+            pixels = thumbnails.render_cpu(
+                bpy.data.objects[name], args.size, samples=args.samples)
+            payload = base64.b64encode(pixels.tobytes()).decode('ascii')
+        except Exception as e:
+            header['error'] = str(e)
+        header['seconds'] = time.perf_counter() - start
+        # One line per asset, so Blender's own output can't split a frame
+        out.write('\n%s%s %s\n' % (FRAME_MARKER, json.dumps(header), payload))
+        out.flush()
+
+
+class MTools_OT_ThumbnailFarm(Operator):
+    """Render missing asset previews in parallel background Blender processes"""
+    bl_label = "Render asset previews"
+    bl_idname = "mops.thumbnail_farm"
+
+    workers: IntProperty(
+        name="Workers",
+        default=4,
+        min=1,
+        description="Number of background Blender processes"
+    )
+    samples: IntProperty(
+        name="Samples",
+        default=8,
+        min=1,
+        description="Cycles samples per preview"
+    )
+    only_missing: BoolProperty(
+        name="Only missing",
+        default=True,
+        description="Skip assets that already have a preview"
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return bool(bpy.data.filepath)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        if bpy.data.is_dirty:
+            # Workers read the file from disk
+            bpy.ops.wm.save_mainfile()
+
+        names = find_assets(self.only_missing)
+        if not names:
+            self.report({'INFO'}, "No assets need a preview")
+            return {'CANCELLED'}
+
+        self.farm = ThumbnailFarm(names, bpy.data.filepath,
+                                  workers=self.workers, samples=self.samples)
+
+        if bpy.app.background:
+            self.report({'INFO'}, self.farm.run())
+            self.farm.finish()
+            bpy.ops.wm.save_mainfile()
+            return {'FINISHED'}
+
+        self.farm.start()
+
+        wm = context.window_manager
+        wm.progress_begin(0, self.farm.total)
+        self._timer = wm.event_timer_add(0.25, window=context.window)
+        wm.modal_handler_add(self)
+
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.farm.cancel()
+            return self.finish(context, {'CANCELLED'})
+
+        if event.type == 'TIMER':
+            busy = self.farm.poll()
+            context.window_manager.progress_update(self.farm.done)
+            context.workspace.status_text_set(
+                "Asset previews: %d/%d (Esc to cancel)" % (
+                    self.farm.done, self.farm.total))
+            if not busy:
+                return self.finish(context, {'FINISHED'})
+
+        return {'PASS_THROUGH'}
+
+    def finish(self, context, result):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+        # A cancelled run keeps its journal to resume from
+        if result == {'FINISHED'}:
+            self.farm.finish()
+        self.report({'INFO'}, self.farm.summary())
+
+        return result
+
+
+@persistent
+def on_save_post(*args):
+    # The previews of a finished run are on disk now
+    journal = _unsaved_journals.pop(bpy.data.filepath, None)
+    if journal is not None:
+        journal.clear()
+
+
+@persistent
+def on_load_post(*args):
+    # Unsaved previews are gone, their journals stay to resume from
+    _unsaved_journals.clear()
+
+
+handlers = (
+    (bpy.app.handlers.save_post, on_save_post),
+    (bpy.app.handlers.load_post, on_load_post),
+)
+
+classes = (
+    MTools_OT_ThumbnailFarm,
+)
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+    for handler_list, func in handlers:
+        if func not in handler_list:
+            handler_list.append(func)
+
+
+def unregister():
+    for handler_list, func in handlers:
+        if func in handler_list:
+            handler_list.remove(func)
+
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
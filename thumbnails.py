@@ -0,0 +1,193 @@
+"""In-memory asset preview rendering.
+
+Renders a thumbnail straight into a preallocated float32 NumPy buffer and
+hands it to the preview with foreach_set, no image file in between.
+
+'VIEWPORT' draws the current 3D view offscreen and needs a GPU.
+'CPU' renders the asset in a temporary scene with Cycles on the CPU (or
+Workbench) and reads the pixels back from the compositor Viewer node, so
+it also works in ``blender -b`` on render nodes without a GPU.
+"""
+import math
+
+import bpy
+from mathutils import Matrix, Vector
+
+from . import lazy
+
+np = lazy.lazy_import('numpy')
+bounds = lazy.lazy_import('.bounds', __package__)
+
+PREVIEW_SIZE = 128
+
+preview_backends = [
+    ('AUTO', 'Auto', 'Viewport when there is a 3D view, CPU otherwise'),
+    ('VIEWPORT', 'Viewport', 'Draw the current 3D view, needs a GPU'),
+    ('CPU', 'CPU', 'Render with Cycles on the CPU, works without a GPU'),
+]
+
+# size -> preallocated RGBA float32 buffer
+_buffers = {}
+
+
+def pixel_buffer(size):
+    buf = _buffers.get(size)
+
+    if buf is None:
+        buf = _buffers[size] = np.empty(size * size * 4, dtype=np.float32)
+
+    return buf
+
+
+def linear_to_srgb(pixels):
+    '''Apply the sRGB transfer curve to the RGB channels, in place'''
+    rgb = pixels.reshape(-1, 4)[:, :3]
+    np.clip(rgb, 0.0, 1.0, out=rgb)
+    low = rgb <= 0.0031308
+    rgb[:] = np.where(low, rgb * 12.92, 1.055 * np.power(rgb, 1 / 2.4) - 0.055)
+
+    return pixels
+
+
+def set_preview(id_data, pixels, size=PREVIEW_SIZE):
+    id_data.preview_ensure()
+    preview = id_data.preview
+    preview.image_size = (size, size)
+    preview.image_pixels_float.foreach_set(pixels)
+
+
+def _perspective(lens, near, far, sensor=72.0):
+    '''Square projection matrix matching a viewport lens'''
+    f = 2 * lens / sensor
+
+    return Matrix((
+        (f, 0, 0, 0),
+        (0, f, 0, 0),
+        (0, 0, (far + near) / (near - far), 2 * far * near / (near - far)),
+        (0, 0, -1, 0),
+    ))
+
+
+def render_viewport(context, size=PREVIEW_SIZE):
+    '''Draw the 3D view of the context area offscreen, returns the pixel buffer'''
+    # Only needed here, and not usable in background mode anyway
+    import gpu
+
+    space = context.space_data
+    region = next(r for r in context.area.regions if r.type == 'WINDOW')
+    r3d = space.region_3d
+
+    if r3d.is_perspective:
+        projection = _perspective(space.lens, space.clip_start, space.clip_end)
+    else:
+        projection = r3d.window_matrix
+
+    show_overlays = space.overlay.show_overlays
+    space.overlay.show_overlays = False
+
+    offscreen = gpu.types.GPUOffScreen(size, size)
+    try:
+        with offscreen.bind():
+            framebuffer = gpu.state.active_framebuffer_get()
+            framebuffer.clear(color=(0.0, 0.0, 0.0, 0.0))
+            offscreen.draw_view3d(
+                context.scene, context.view_layer, space, region,
+                r3d.view_matrix, projection,
+                do_color_management=True, draw_background=False)
+            buf = gpu.types.Buffer('FLOAT', size * size * 4)
+            framebuffer.read_color(0, 0, size, size, 4, 0, 'FLOAT', data=buf)
+    finally:
+        offscreen.free()
+        space.overlay.show_overlays = show_overlays
+
+    pixels = pixel_buffer(size)
+    try:
+        pixels[:] = np.frombuffer(buf, dtype=np.float32)
+    except TypeError:
+        pixels[:] = buf.to_list()
+
+    return pixels
+
+
+def _frame_camera(camera, objects):
+    '''Point the camera at the objects from the front right, filling the frame'''
+    model_bounds = bounds.object_bounds(objects)
+
+    if model_bounds is None:
+        center, radius = Vector((0, 0, 0)), 1.0
+    else:
+        center = (model_bounds.minimum + model_bounds.maximum) / 2
+        radius = max((model_bounds.maximum - model_bounds.minimum).length / 2, 0.01)
+
+    direction = Vector((1.0, -1.0, 0.8)).normalized()
+    distance = radius / math.sin(camera.data.angle / 2)
+    camera.location = center + direction * distance
+    camera.rotation_euler = (-direction).to_track_quat('-Z', 'Y').to_euler()
+    camera.data.clip_start = distance / 100
+    camera.data.clip_end = distance + radius * 2
+
+
+def render_cpu(asset, size=PREVIEW_SIZE, engine='CYCLES', samples=8):
+    '''Render an object, usually a collection instance, in a throwaway scene'''
+    scene = bpy.data.scenes.new('MTools Thumbnail')
+    camera_data = bpy.data.cameras.new('MTools Thumbnail Camera')
+    camera = bpy.data.objects.new('MTools Thumbnail Camera', camera_data)
+    world = bpy.data.worlds.new('MTools Thumbnail World')
+
+    try:
+        scene.collection.objects.link(asset)
+        scene.collection.objects.link(camera)
+        scene.camera = camera
+        scene.world = world
+        world.color = (0.8, 0.8, 0.8)
+
+        render = scene.render
+        render.engine = 'CYCLES' if engine == 'CYCLES' else 'BLENDER_WORKBENCH'
+        render.resolution_x = render.resolution_y = size
+        render.resolution_percentage = 100
+        render.film_transparent = True
+        if engine == 'CYCLES':
+            scene.cycles.device = 'CPU'
+            scene.cycles.samples = samples
+            scene.cycles.use_denoising = False
+
+        parts = asset.instance_collection.all_objects \
+            if asset.instance_collection else [asset]
+        _frame_camera(camera, parts)
+
+        # Render Result pixels are not readable from Python, a Viewer node's are
+        scene.use_nodes = True
+        tree = scene.node_tree
+        layers = tree.nodes.get('Render Layers') or tree.nodes.new('CompositorNodeRLayers')
+        viewer = tree.nodes.new('CompositorNodeViewer')
+        tree.links.new(layers.outputs['Image'], viewer.inputs['Image'])
+
+        bpy.ops.render.render(scene=scene.name)
+
+        image = bpy.data.images['Viewer Node']
+        pixels = pixel_buffer(size)
+        image.pixels.foreach_get(pixels)
+    finally:
+        bpy.data.objects.remove(camera)
+        bpy.data.cameras.remove(camera_data)
+        bpy.data.scenes.remove(scene)
+        bpy.data.worlds.remove(world)
+
+    return linear_to_srgb(pixels)
+
+
+def render_preview(context, asset, backend='AUTO', size=PREVIEW_SIZE):
+    '''Render and store the preview of an asset, returns the backend used'''
+    if backend == 'AUTO':
+        has_view = not bpy.app.background and context.area is not None \
+            and context.area.type == 'VIEW_3D'
+        backend = 'VIEWPORT' if has_view else 'CPU'
+
+    if backend == 'VIEWPORT':
+        pixels = render_viewport(context, size)
+    else:
+        pixels = render_cpu(asset, size)
+
+    set_preview(asset, pixels, size)
+
+    return backend
@@ -0,0 +1,123 @@
+"""Batched transform helpers.
+
+Reads object matrices into NumPy arrays, does the matrix math for all
+objects at once and writes the results back in a single pass. Used where
+utils.parent/unparent would otherwise run per object.
+"""
+import bpy
+import numpy as np
+from mathutils import Matrix
+
+
+def read_matrices(objects, attr='matrix_world'):
+    '''Return an (n, 4, 4) array of a matrix attribute, row major like mathutils'''
+    if hasattr(objects, 'foreach_get'):
+        flat = np.empty(len(objects) * 16, dtype=np.float32)
+        objects.foreach_get(attr, flat)
+        # foreach_get hands out Blender's column major memory layout
+        return flat.reshape(-1, 4, 4).transpose(0, 2, 1).astype(np.float64)
+
+    matrices = np.empty((len(objects), 4, 4), dtype=np.float64)
+    for i, obj in enumerate(objects):
+        matrices[i] = getattr(obj, attr)
+
+    return matrices
+
+
+def write_matrices(objects, matrices, attr='matrix_world'):
+    '''Write an (n, 4, 4) row major array back to a matrix attribute'''
+    if hasattr(objects, 'foreach_set'):
+        flat = matrices.transpose(0, 2, 1).astype(np.float32).ravel()
+        objects.foreach_set(attr, flat)
+        return
+
+    for obj, matrix in zip(objects, matrices):
+        setattr(obj, attr, Matrix(matrix))
+
+
+def inverted_safe(matrices):
+    '''Batch inverse, falling back to the pseudo inverse for singular matrices
+    the way Matrix.inverted_safe() does for zero scaled axes'''
+    result = np.empty_like(matrices)
+    invertible = np.abs(np.linalg.det(matrices)) > 1e-12
+
+    if invertible.any():
+        result[invertible] = np.linalg.inv(matrices[invertible])
+    if not invertible.all():
+        result[~invertible] = np.linalg.pinv(matrices[~invertible])
+
+    return result
+
+
+def data_rows(objects):
+    '''Rows of objects in bpy.data.objects, for a foreach_get/foreach_set
+    over every object of the file'''
+    uids = np.empty(len(bpy.data.objects), dtype=np.int32)
+    bpy.data.objects.foreach_get('session_uid', uids)
+    order = np.argsort(uids)
+    wanted = np.fromiter((obj.session_uid for obj in objects), dtype=np.int32,
+                         count=len(objects))
+    rows = order[np.searchsorted(uids, wanted, sorter=order).clip(0, len(uids) - 1)]
+
+    if not np.array_equal(uids[rows], wanted):
+        raise ValueError("Objects missing from bpy.data.objects")
+
+    return rows
+
+
+def parent_objects(objects, parents, view_layer=None):
+    '''Parent objects[i] to parents[i], keeping world transforms.
+
+    A parent of None clears the parent. All parent inverses are computed in
+    one batch from the world matrices before anything is written, so the
+    result does not depend on the order of objects. Pass a view_layer to
+    refresh world matrices of objects moved earlier in the same operator.
+
+    An object without a parent keeps its basis like with utils.parent, its
+    parent inverse alone cancels out the new parent. Those parent inverses
+    go in with one foreach_get/foreach_set over bpy.data.objects, as the
+    objects may be any list. Only objects that already had a parent get
+    their basis set to their world matrix, per object. foreach_set takes
+    no pointers, so parents are always set per object.
+    '''
+    objects = list(objects)
+    parents = list(parents)
+
+    if not objects:
+        return
+
+    if view_layer is not None:
+        view_layer.update()
+
+    unique_parents = list({p: None for p in parents if p is not None})
+    slot = {p: i for i, p in enumerate(unique_parents)}
+    parent_inverses = inverted_safe(read_matrices(unique_parents)) \
+        if unique_parents else np.empty((0, 4, 4))
+
+    # Objects leaving a parent need their world matrix as their new basis
+    moved = [i for i, obj in enumerate(objects) if obj.parent is not None]
+    world = read_matrices([objects[i] for i in moved])
+
+    for obj, parent in zip(objects, parents):
+        obj.parent = parent
+
+    parented = [i for i, p in enumerate(parents) if p is not None]
+    if parented:
+        # Rewriting the raw matrices of the other objects leaves them as they are
+        inverses = np.empty(len(bpy.data.objects) * 16, dtype=np.float32)
+        bpy.data.objects.foreach_get('matrix_parent_inverse', inverses)
+        inverses = inverses.reshape(-1, 4, 4)
+        rows = data_rows([objects[i] for i in parented])
+        slots = [slot[parents[i]] for i in parented]
+        # Back to Blender's column major layout
+        inverses[rows] = parent_inverses[slots].transpose(0, 2, 1)
+        bpy.data.objects.foreach_set('matrix_parent_inverse', inverses.ravel())
+
+    for i, matrix in zip(moved, world):
+        objects[i].matrix_basis = Matrix(matrix)
+
+
+def unparent_objects(objects, view_layer=None):
+    '''Clear the parent of every object, keeping world transforms'''
+    objects = list(objects)
+    parent_objects(objects, [None] * len(objects), view_layer)
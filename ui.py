@@ -1,6 +1,12 @@
 import bpy
 from bpy.types import  Panel
 
+from . import checkpoints
+from . import dependencies
+from . import instrument
+from . import mesh_generator
+from . import save_tool
+
 
 def draw_make_asset_panel(self, context, layout):
     split = layout.split(factor=0.1)
@@ -16,6 +22,7 @@ def draw_make_asset_panel(self, context, layout):
     col.prop(self, "save_ext", text="Save to external .blend library")
     if self.save_ext:
         col.prop(self, "ext_path")
+        col.prop(self, "compare_full_save")
 
 
 def draw_make_model_panel():
@@ -36,33 +43,37 @@ class MTOOLS_PT_BulkUndo(MTOOLS_PT_MainPanel, Panel):
         layout = self.layout
         row = layout.row(align=True)
         row.label(icon='LOOP_BACK')
-        undo_Tools = row.operator('mtools.bulk_undo', text='3')
+        undo_Tools = row.operator('mops.bulk_undo', text='3')
         undo_Tools.undo_steps = 3
 
-        undo_5 = row.operator('mtools.bulk_undo', text='5')
+        undo_5 = row.operator('mops.bulk_undo', text='5')
         undo_5.undo_steps = 5
 
-        undo_10 = row.operator('mtools.bulk_undo', text='10')
+        undo_10 = row.operator('mops.bulk_undo', text='10')
         undo_10.undo_steps = 10
 
-        undo_20 = row.operator('mtools.bulk_undo', text='20')
+        undo_20 = row.operator('mops.bulk_undo', text='20')
         undo_20.undo_steps = 20
 
         row = layout.row(align=True)
         row.label(icon='LOOP_FORWARDS')
 
-        redo_Tools = row.operator('mtools.bulk_redo', text='3')
+        redo_Tools = row.operator('mops.bulk_redo', text='3')
         redo_Tools.redo_steps = 3
 
-        redo_5 = row.operator('mtools.bulk_redo', text='5')
+        redo_5 = row.operator('mops.bulk_redo', text='5')
         redo_5.redo_steps = 5
 
-        redo_10 = row.operator('mtools.bulk_redo', text='10')
+        redo_10 = row.operator('mops.bulk_redo', text='10')
         redo_10.redo_steps = 10
 
-        redo_20 = row.operator('mtools.bulk_redo', text='20')
+        redo_20 = row.operator('mops.bulk_redo', text='20')
         redo_20.redo_steps = 20
 
+        box = layout.box()
+        box.label(text="Checkpoints", icon='BOOKMARKS')
+        checkpoints.draw_checkpoints(box, context)
+
 class MTOOLS_PT_MakeModel(MTOOLS_PT_MainPanel, Panel):
     bl_label = "Assembly Tools"
     bl_options = {"DEFAULT_CLOSED"}
@@ -70,13 +81,17 @@ class MTOOLS_PT_MakeModel(MTOOLS_PT_MainPanel, Panel):
     @classmethod
     def poll(cls, context):
         obj = context.active_object
-        return obj is not None and obj.type == "MESH" and obj.mode in {"OBJECT", "EDIT"}
+        # Empties too, asset instances are what unpack and scatter work on
+        return obj is not None and obj.type in {"MESH", "EMPTY"} \
+            and obj.mode in {"OBJECT", "EDIT"}
 
     def draw(self, context):
         layout = self.layout
         col = layout.column(align=True)
         col.operator("mops.make_model", text="Make a model",
                      icon='STICKY_UVS_LOC')
+        col.operator("mops.make_models", text="Make models from selection",
+                     icon='OUTLINER_OB_GROUP_INSTANCE')
         col.separator
         box = col.box()
         box.label(text="Model options:")
@@ -130,6 +145,10 @@ class MTOOLS_PT_MakeModel(MTOOLS_PT_MainPanel, Panel):
                  )
         col.operator("mops.unpack_asset",
                      text="Asset > Model", icon='ASSET_MANAGER')
+        col.operator("mops.scatter",
+                     text="Scatter instances", icon='PARTICLES')
+        col.operator("mops.thumbnail_farm",
+                     text="Render asset previews", icon='RENDER_STILL')
 
 class MTOOLS_PT_MeshActions(MTOOLS_PT_MainPanel, Panel):
     bl_label = "Mesh Operations"
@@ -172,8 +191,8 @@ class MTOOLS_PT_MeshGenerator(MTOOLS_PT_MainPanel, Panel):
     def draw(self, context):
         layout = self.layout
         box = layout.box()
-        col = box.column()
-        col.label(text="Nothing here yet")
+        box.label(text="Add at the 3D cursor:")
+        mesh_generator.draw_generator(box)
 
 
 class MTOOLS_PT_SaveTool(MTOOLS_PT_MainPanel, Panel):
@@ -181,10 +200,7 @@ class MTOOLS_PT_SaveTool(MTOOLS_PT_MainPanel, Panel):
     bl_options = {"DEFAULT_CLOSED"}
 
     def draw(self, context):
-        layout = self.layout
-        box = layout.box()
-        col = box.column()
-        col.label(text="Nothing here yet")
+        save_tool.draw_autosave(self.layout, context)
 
 
 class MTOOLS_PT_ViewOps(MTOOLS_PT_MainPanel, Panel):
@@ -267,6 +283,8 @@ class MTOOLS_PT_DevTools(MTOOLS_PT_MainPanel, Panel):
         layout = self.layout
         col = layout.column()
         col.operator("script.reload", text="Reload scripts")
+        dependencies.draw_graph_stats(layout)
+        instrument.draw_instrumentation(layout, context)
 
 
 classes = (
@@ -1,45 +1,82 @@
 import bpy
 import os
+import time
 from mathutils import Vector
 from bpy.types import WindowManager
 
-def get_catalogs(context, debug=False):
+from . import lazy
+
+catalogs = lazy.lazy_import('.core.catalogs', __package__)
+core_bounds = lazy.lazy_import('.core.bounds', __package__)
+
+_catalog_index = None
+_catalog_scan = None
+
+
+def get_catalog_index():
+    global _catalog_index
+
+    if _catalog_index is None:
+        cache_dir = bpy.utils.user_resource(
+            'CONFIG', path='mtools', create=True)
+        _catalog_index = catalogs.CatalogIndex(cache_dir)
 
+    return _catalog_index
+
+def get_asset_libraries(context):
     asset_libraries = context.preferences.filepaths.asset_libraries
-    all_catalogs = []
+    return [(lib.name, lib.path) for lib in asset_libraries]
+
+def get_catalogs(context, debug=False):
+    return catalogs.library_catalogs(
+        get_catalog_index(), get_asset_libraries(context), debug)
+
+def get_catalog_trie(context):
+    libraries = get_asset_libraries(context)
+
+    index = get_catalog_index()
+    # A background scan keeps the index fresh, don't stat every library again
+    if _catalog_scan is None:
+        index.update(libraries)
+
+    return index.trie(libraries)
 
-    for lib in asset_libraries:
-        libname = lib.name
-        libpath = lib.path
+def scan_asset_catalogs(context, timeout=10.0):
+    '''Start reading all asset libraries in the background'''
+    global _catalog_scan
 
-        cat_path = os.path.join(libpath, 'blender_assets.cats.txt')
+    if _catalog_scan is not None and not _catalog_scan.done:
+        return _catalog_scan
 
-        if os.path.exists(cat_path):
-            if debug:
-                print(libname, cat_path)
+    _catalog_scan = catalogs.CatalogScan(
+        get_catalog_index(), get_asset_libraries(context), timeout=timeout)
+    _catalog_scan.start()
 
-            with open(cat_path) as f:
-                lines = f.readlines()
+    if not bpy.app.timers.is_registered(poll_catalog_scan):
+        bpy.app.timers.register(poll_catalog_scan, first_interval=0.1)
 
-            for line in lines:
-                if line != '\n' and not any([line.startswith(skip) for skip in [
-                                            '#', 'VERSION']]) and len(line.split(':')) == 3:
-                    all_catalogs.append(
-                        line[:-1].split(':') + [libname, libpath])
+    return _catalog_scan
 
-    catalogs = {}
+def poll_catalog_scan():
+    '''Timer callback merging finished libraries into the catalog enum'''
+    scan = _catalog_scan
 
-    for uuid, catalog, simple_name, libname, libpath in all_catalogs:
-        if catalog not in catalogs:
-            catalogs[catalog] = {'uuid': uuid,
-                                 'simple_name': simple_name,
-                                 'libname': libname,
-                                 'libpath': libpath}
+    if scan is None:
+        return None
 
-    if debug:
-        print(catalogs)
+    if scan.poll():
+        set_catalog_enum(scan.index.catalogs(scan.libraries))
+        tag_redraw_all()
 
-    return catalogs
+    return None if scan.done else 0.1
+
+def cancel_catalog_scan():
+    global _catalog_scan
+
+    if bpy.app.timers.is_registered(poll_catalog_scan):
+        bpy.app.timers.unregister(poll_catalog_scan)
+
+    _catalog_scan = None
 
 def parent(obj, parentobj):
     if obj.parent:
@@ -63,6 +100,15 @@ def get_name():
 def get_prefs():
     return bpy.context.preferences.addons[get_name()].preferences
 
+def preferred_catalog(all_catalogs):
+    '''The preferred default catalog if the add-on has one and it exists, else NONE'''
+    try:
+        preferred = get_prefs().preferred_default_catalog
+    except (KeyError, AttributeError):
+        return 'NONE'
+
+    return preferred if preferred in all_catalogs else 'NONE'
+
 def popup_message(message, title="Info", icon="INFO"):
     def draw_message(self, context):
         if isinstance(message, list):
@@ -73,23 +119,69 @@ def popup_message(message, title="Info", icon="INFO"):
 
     bpy.context.window_manager.popup_menu(draw_message, title=title, icon=icon)
 
-def average_locations(locationslist, size=3):
-    avg = Vector.Fill(size)
+class Stopwatch:
+    '''Named phase timings for operator reports'''
+
+    def __init__(self):
+        self.phases = []
+        self.start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.start
+
+    def summary(self):
+        return ', '.join('%s %.1f ms' % (name, t * 1000) for name, t in self.phases)
+
+def memory_usage():
+    '''Resident memory of the Blender process in bytes, None where unknown'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current, in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
 
-    for n in locationslist:
-        avg += n
+def average_locations(locationslist, size=3):
+    return Vector(core_bounds.average_locations(locationslist, size))
 
-    return avg / len(locationslist)
+def tag_redraw_all():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            area.tag_redraw()
 
-def update_asset_catalogs(self, context):
-    self.catalogs = get_catalogs(context, debug=False)
+def set_catalog_enum(all_catalogs):
+    wm = bpy.context.window_manager
+    current = getattr(wm, 'mtools_catalogs', None)
 
     items = [('NONE', 'None', '')]
 
-    for catalog in self.catalogs:
+    for catalog in all_catalogs:
         items.append((catalog, catalog, ""))
 
-    default = get_prefs().preferred_default_catalog if get_prefs(
-    ).preferred_default_catalog in self.catalogs else 'NONE'
+    default = preferred_catalog(all_catalogs)
     WindowManager.mtools_catalogs = bpy.props.EnumProperty(
-        name="Asset Categories", items=items, default=default)
\ No newline at end of file
+        name="Asset Categories", items=items, default=default)
+
+    # The enum is stored as an index, keep the choice when items shift
+    if current in all_catalogs:
+        wm.mtools_catalogs = current
+
+def update_asset_catalogs(self, context):
+    # Show what the index already knows, libraries fill in as they respond
+    scan = scan_asset_catalogs(context)
+    self.catalogs = scan.index.catalogs(scan.libraries)
+
+    set_catalog_enum(self.catalogs)